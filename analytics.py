@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+def calculate_data_quality(df):
+    """Calcule la qualité des données basée sur la complétude et la fraîcheur"""
+    if df.empty:
+        return 0, "Aucune donnée", "data-quality-poor"
+    
+    # Calcul de la complétude
+    total_cells = len(df) * len(df.columns)
+    missing_cells = df.isnull().sum().sum()
+    completeness = ((total_cells - missing_cells) / total_cells) * 100
+    
+    # Classification de la qualité
+    if completeness >= 98:
+        return completeness, "Excellente", "data-quality-excellent"
+    elif completeness >= 90:
+        return completeness, "Bonne", "data-quality-good"
+    elif completeness >= 70:
+        return completeness, "Moyenne", "data-quality-medium"
+    else:
+        return completeness, "Faible", "data-quality-poor"
+
+def format_number(num, prefix="", suffix=""):
+    """Formate les grands nombres avec des suffixes appropriés"""
+    if pd.isna(num) or num is None:
+        return "N/A"
+    
+    if abs(num) >= 1e12: # Trillions
+        return f"{prefix}{num/1e12:.2f}T{suffix}"
+    elif abs(num) >= 1e9: # Billions
+        return f"{prefix}{num/1e9:.2f}Md{suffix}"
+    elif abs(num) >= 1e6: # Millions
+        return f"{prefix}{num/1e6:.2f}M{suffix}"
+    elif abs(num) >= 1e3: # Thousands
+        return f"{prefix}{num/1e3:.2f}K{suffix}"
+    else:
+        return f"{prefix}{num:.2f}{suffix}"
+
+# Suppression de la fonction format_percentage car sa logique est désormais intégrée au styler de Pandas.
+
+def last_valid_positions(matrix):
+    """Position de la dernière valeur renseignée de chaque colonne (-1 si aucune)"""
+    valid = matrix.notna().to_numpy()
+    positions = len(valid) - 1 - valid[::-1].argmax(axis=0)
+    return np.where(valid.any(axis=0), positions, -1)
+
+def build_overview_table(panel, ticker_names=None):
+    """Tableau de synthèse des performances (onglet Vue d'Ensemble), une ligne par ticker.
+
+    Agrégation colonne par colonne des matrices temps x ticker du panneau (une
+    passe pour tous les tickers); les valeurs restent numériques, la mise en forme
+    est laissée à l'affichage.
+    """
+    ticker_names = ticker_names or {}
+    if panel.bars.empty or len(panel) == 0:
+        return pd.DataFrame()
+    
+    close = panel.field('Close').astype(np.float64)
+    first_open = panel.field('Open').astype(np.float64).bfill().iloc[0]
+    last_close = close.ffill().iloc[-1]
+    price_change = last_close - first_open
+    # Variation relative indéfinie pour une ouverture nulle
+    percentage_change = price_change / first_open.where(first_open != 0) * 100
+    volume = panel.field('Volume').astype(np.float64).mean() if 'Volume' in panel.bars.columns.get_level_values('Field') else np.nan
+    
+    last_positions = last_valid_positions(close)
+    last_dates = pd.Series(
+        np.where(last_positions >= 0, close.index[np.maximum(last_positions, 0)].strftime('%Y-%m-%d'), 'N/A'),
+        index=close.columns
+    )
+    
+    metadata = panel.metadata.reindex(close.columns)
+    tickers = close.columns.to_series()
+    df_overview = pd.DataFrame({
+        'Entreprise': metadata['Company_Name'].fillna(tickers.map(lambda t: ticker_names.get(t, t))),
+        'Ticker': tickers,
+        'Secteur': metadata['Sector'].fillna('Non spécifié'),
+        'Dernier Prix': last_close,
+        'Changement': price_change,
+        'Changement %': percentage_change,
+        'Volume Moyen': volume,
+        'Capitalisation Boursière': pd.to_numeric(metadata['Market_Cap'], errors='coerce'),
+        'Devise': metadata['Currency'].fillna('EUR'),
+        'Date Dernière Donnée': last_dates
+    })
+    # Tickers du panneau dont aucune clôture n'est disponible
+    return df_overview[last_positions >= 0].reset_index(drop=True)
+
+def format_market_caps(df_overview):
+    """Capitalisations du tableau de synthèse avec leur devise (ex: "12.30Md EUR"), "N/A" si inconnues"""
+    return pd.Series(
+        [format_number(cap, suffix=f" {currency}")
+         for cap, currency in zip(df_overview['Capitalisation Boursière'], df_overview['Devise'])],
+        index=df_overview.index, dtype=object
+    )
+
+def build_comparison_matrix(panel, ticker_names=None, fill=True, resample=None):
+    """Évolution normalisée (%) des cours de clôture, matrice temps x entreprise.
+
+    Calcul en une passe sur la matrice des clôtures du panneau, dont l'index
+    (fuseau Europe/Paris) est commun à toutes les places. resample (ex: '1h', '1D')
+    regroupe les barres sur une grille calendaire commune (dernière clôture de
+    chaque période); fill prolonge la dernière clôture connue d'un ticker sur les
+    barres où seuls d'autres tickers ont coté, sans prolonger avant sa première
+    ni après sa dernière barre.
+    """
+    ticker_names = ticker_names or {}
+    if panel.bars.empty or 'Close' not in panel.bars.columns.get_level_values('Field'):
+        return pd.DataFrame()
+    close = panel.field('Close').astype(np.float64)
+    if resample:
+        close = close.resample(resample).last()
+    close = close.dropna(how='all')
+    if fill:
+        close = close.ffill(limit_area='inside')
+
+    # Base de chaque ticker: sa première clôture disponible
+    base = close.bfill().iloc[0] if not close.empty else pd.Series(dtype=np.float64)
+    comparison = (close / base - 1) * 100
+    # Ticker de base nulle: évolution fixée à 0 (comme une série constante)
+    comparison = comparison.mask(close.notna() & (base == 0), 0.0)
+    comparison = comparison.dropna(axis=1, how='all')
+    comparison.columns = [ticker_names.get(t, t) for t in comparison.columns]
+    comparison.columns.name = None
+    return comparison
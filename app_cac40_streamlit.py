@@ -1,17 +1,34 @@
+import time
+# Début de l'exécution du script: durée des imports et de la barre latérale (onglet Diagnostics)
+script_started = time.perf_counter()
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 # Assurez-vous que ce fichier est bien dans le même répertoire que app.py
-from get_cac40_tickers import get_cac40_tickers 
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import plotly.express as px # Importé ici car utilisé dans plusieurs onglets
-import time
+from get_cac40_tickers import get_cac40_tickers, get_constituent_registry
+from constituent_registry import period_window_start
+from bar_store import BarStore
+from company_metadata import MetadataCache
+from market_panel import MarketPanel
+from refresh_scheduler import RefreshScheduler
+from shared_data import SharedMarketData
+from async_fetch import AsyncFetcher
+from market_data import DEFAULT_PROVIDER, DEFAULT_PROVIDER_SPEC, parse_provider_spec, provider_from_spec
+from collection import StreamingCollection, collect_data_shared, refresh_panel_metadata
+from analytics import calculate_data_quality, build_overview_table, format_market_caps
+from constituents import ConstituentIndex
+from charts import (WEBGL_POINT_THRESHOLD, FigureCache, build_candlestick_figure, build_indicators_figure, build_comparison_figure,
+                    build_market_cap_figure, build_sector_pie_figure, has_indicator_panels)
+from metrics import REGISTRY, StageTimings
+from downsampling import DEFAULT_MAX_POINTS, slice_range
+from snapshot_store import DEFAULT_MAX_AGE, SnapshotStore
+import os
+import uuid
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 import warnings
 warnings.filterwarnings('ignore')
+imports_done = time.perf_counter()
 
 # --- Configuration de la page ---
 st.set_page_config(
@@ -21,434 +38,309 @@ st.set_page_config(
     page_icon="📈"
 )
 
-# --- CSS Personnalisé avancé ---
-st.markdown("""
-    <style>
-    /* Masquer les éléments Streamlit par défaut */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-
-    /* Importation des polices Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@400;500;600&display=swap');
-
-    /* Variables CSS pour cohérence */
-    :root {
-        --primary-color: #2563eb;
-        --secondary-color: #1e40af;
-        --success-color: #059669;
-        --warning-color: #d97706;
-        --error-color: #dc2626;
-        --background-color: #f8fafc;
-        --card-background: #ffffff;
-        --text-primary: #1e293b;
-        --text-secondary: #64748b;
-        --border-color: #e2e8f0;
-        --shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-        --shadow-lg: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-    }
-
-    /* Style global */
-    .stApp {
-        font-family: 'Inter', sans-serif;
-        background-color: var(--background-color);
-        color: var(--text-primary);
-    }
-
-    h1, h2, h3, h4, h5, h6 {
-        font-weight: 600;
-        color: var(--text-primary);
-        letter-spacing: -0.025em;
-        margin-bottom: 1rem;
-    }
-
-    h1 {
-        background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        font-size: 2.5rem;
-        font-weight: 700;
-    }
-
-    /* Conteneurs de métriques */
-    .metric-container {
-        background: var(--card-background);
-        padding: 1.5rem;
-        border-radius: 12px;
-        box-shadow: var(--shadow);
-        border: 1px solid var(--border-color);
-        text-align: center;
-        transition: all 0.2s ease;
-        height: 120px;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-    }
-    
-    .metric-container:hover {
-        transform: translateY(-2px);
-        box-shadow: var(--shadow-lg);
-    }
-
-    .metric-value {
-        font-size: 2rem;
-        font-weight: 700;
-        color: var(--primary-color);
-        font-family: 'JetBrains Mono', monospace;
-        margin-bottom: 0.5rem;
-    }
-
-    .metric-label {
-        font-size: 0.875rem;
-        color: var(--text-secondary);
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        font-weight: 500;
-    }
-
-    /* Indicateurs de statut */
-    .status-indicator {
-        display: inline-flex;
-        align-items: center;
-        padding: 0.5rem 1rem;
-        border-radius: 20px;
-        font-size: 0.875rem;
-        font-weight: 500;
-        margin: 0.25rem 0.25rem 0.25rem 0;
-        gap: 0.5rem;
-    }
-
-    .status-success {
-        background-color: rgba(5, 150, 105, 0.1);
-        color: var(--success-color);
-        border: 1px solid rgba(5, 150, 105, 0.2);
-    }
-
-    .status-warning {
-        background-color: rgba(217, 119, 6, 0.1);
-        color: var(--warning-color);
-        border: 1px solid rgba(217, 119, 6, 0.2);
-    }
-
-    .status-error {
-        background-color: rgba(220, 38, 38, 0.1);
-        color: var(--error-color);
-        border: 1px solid rgba(220, 38, 38, 0.2);
-    }
-
-    /* Onglets améliorés */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        margin-bottom: 2rem;
-        border-bottom: 2px solid var(--border-color);
-        padding: 0;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        height: 48px;
-        padding: 0 24px;
-        border-radius: 8px 8px 0 0;
-        background-color: transparent;
-        color: var(--text-secondary);
-        font-weight: 500;
-        border: none;
-        border-bottom: 3px solid transparent;
-        transition: all 0.2s ease;
-        font-size: 1rem;
-    }
-
-    .stTabs [data-baseweb="tab"]:hover {
-        background-color: rgba(37, 99, 235, 0.05);
-        color: var(--primary-color);
-    }
-
-    .stTabs [data-baseweb="tab"][aria-selected="true"] {
-        background-color: var(--card-background);
-        color: var(--primary-color);
-        border-bottom: 3px solid var(--primary-color);
-        font-weight: 600;
-        box-shadow: var(--shadow);
-    }
-
-    /* Boutons améliorés */
-    .stButton > button {
-        background: linear-gradient(135deg, var(--primary-color), var(--secondary-color));
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 500;
-        box-shadow: var(--shadow);
-        transition: all 0.2s ease;
-        font-family: 'Inter', sans-serif;
-        font-size: 0.95rem;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-1px);
-        box-shadow: 0 8px 16px -4px rgba(37, 99, 235, 0.3);
-    }
-
-    .stButton > button:active {
-        transform: translateY(0);
-    }
+# --- CSS Personnalisé avancé (static/app.css) ---
+APP_CSS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")
 
-    /* Conteneurs personnalisés */
-    .custom-container {
-        background: var(--card-background);
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        box-shadow: var(--shadow);
-        border: 1px solid var(--border-color);
-    }
-
-    .info-card {
-        background: linear-gradient(135deg, rgba(37, 99, 235, 0.05), rgba(30, 64, 175, 0.05));
-        border: 1px solid rgba(37, 99, 235, 0.2);
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-    }
+@st.cache_resource
+def get_app_css():
+    """Contenu et version (date de modification) de la feuille de style, lus une fois par processus"""
+    with open(APP_CSS_FILE, encoding="utf-8") as f:
+        return f.read(), int(os.path.getmtime(APP_CSS_FILE))
 
-    /* Indicateurs de qualité des données */
-    .data-quality-excellent { color: var(--success-color); font-weight: 700; }
-    .data-quality-good { color: #16a34a; font-weight: 600; }
-    .data-quality-medium { color: var(--warning-color); font-weight: 600; }
-    .data-quality-poor { color: var(--error-color); font-weight: 600; }
+def inject_app_css():
+    css, css_version = get_app_css()
+    if st.get_option("server.enableStaticServing"):
+        # Fichier servi par Streamlit et mis en cache par le navigateur: seul le lien est renvoyé à chaque exécution
+        st.markdown(f'<link rel="stylesheet" href="app/static/app.css?v={css_version}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>\n{css}</style>", unsafe_allow_html=True)
+
+inject_app_css()
+
+# Sources de cotations proposées (voir market_data.provider_from_spec)
+DATA_SOURCES = {
+    "yfinance": "Yahoo Finance",
+    "replay": "Rejeu local (hors ligne)",
+    "synthetic": "Synthétique (hors ligne)"
+}
+
+@st.cache_resource
+def get_bar_store():
+    """Stock local des cotations, partagé par toutes les sessions"""
+    return BarStore()
+
+@st.cache_resource
+def get_market_data_provider(provider_spec):
+    """Source des cotations décrite par provider_spec, partagée par toutes les sessions"""
+    return provider_from_spec(provider_spec)
+
+@st.cache_resource
+def get_shared_market_data(provider_spec):
+    """Couche de données de marché partagée par toutes les sessions (une par source)"""
+    return SharedMarketData()
+
+@st.cache_resource
+def get_refresh_scheduler():
+    """Planificateur des actualisations automatiques, partagé par toutes les sessions"""
+    return RefreshScheduler()
+
+@st.cache_resource
+def get_async_fetcher():
+    """Pipeline de collecte asynchrone (session HTTP et boucle asyncio), partagé par toutes les sessions"""
+    return AsyncFetcher()
+
+@st.cache_resource
+def get_metadata_cache(provider_spec):
+    """Cache des informations entreprise (TTL 24h, rafraîchi en arrière-plan), partagé par toutes les sessions"""
+    provider = get_market_data_provider(provider_spec)
+    if provider.name == "yfinance":
+        return MetadataCache()
+    # Sources hors ligne: informations servies par la source, sans persistance
+    return MetadataCache(path=None, fetcher=provider.company_info)
+
+@st.cache_resource(max_entries=16)
+def get_constituent_index(provider_spec, constituents, metadata_version):
+    """Index des valeurs (nom, ticker, secteur), reconstruit seulement quand la liste ou les informations entreprise changent"""
+    tickers_dict = dict(constituents)
+    return ConstituentIndex(tickers_dict, get_metadata_cache(provider_spec).get_many(list(tickers_dict.values())))
+
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore()
+
+def read_snapshot(provider_spec, period, tickers):
+    """Sélection servie par le dernier instantané de collector.py s'il est récent et couvre tous les tickers (None sinon)"""
+    snapshot = get_snapshot_store().read(provider_spec, period)
+    if snapshot is None:
+        return None
+    panel, manifest = snapshot
+    failed = dict(manifest['errors'])
+    if any(t not in panel and t not in failed for t in tickers):
+        return None
+    # Même sélection, même panneau pour toutes les sessions: les figures en cache restent valables
+    selection = panel.derived(('select', tuple(tickers)), lambda: panel.select(tickers))
+    return selection, [(t, failed[t]) for t in tickers if t in failed]
+
+@st.cache_resource
+def get_figure_cache():
+    """Cache des figures Plotly, partagé par toutes les sessions (les vues partagées ont la même version)"""
+    return FigureCache()
+
+def get_collection_backends(provider_spec, use_bar_store=True, async_download=True):
+    """Stock local et collecte asynchrone applicables à une source (réservés à Yahoo Finance)"""
+    if get_market_data_provider(provider_spec).name != "yfinance":
+        return None, None
+    return (get_bar_store() if use_bar_store else None,
+            get_async_fetcher() if async_download else None)
+
+def select_display_range(df, key):
+    """Curseur de la plage affichée d'un graphique; retourne la plage (début, fin) choisie, None pour toute la période.
+
+    Sur une plage réduite, le budget de points s'applique à moins de barres: le détail
+    (jusqu'à la pleine résolution) réapparaît au lieu d'être agrégé.
+    """
+    dates = df['Date'].dropna()
+    if len(dates) < 2:
+        return None
+    local_dates = dates.dt.tz_localize(None) if dates.dt.tz is not None else dates
+    first, last = local_dates.iloc[0].to_pydatetime(), local_dates.iloc[-1].to_pydatetime()
+    # Pas du curseur: l'intervalle des barres, borné entre une minute et un jour
+    step = min(max(local_dates.diff().median(), pd.Timedelta(minutes=1)), pd.Timedelta(days=1)).to_pytimedelta()
+
+    # Plage choisie conservée hors du curseur, qui est recréé quand de nouvelles barres
+    # déplacent ses bornes (actualisation, collecte progressive): elle est ramenée dans
+    # [first, last]; la période entière (None) suit la dernière barre
+    selection_key = f"{key}_selection"
+    value = (first, last)
+    saved = st.session_state.get(selection_key)
+    if saved is not None:
+        start, end = (min(max(bound, first), last) for bound in saved)
+        if start < end:
+            value = (start, end)
+
+    selected = st.slider(
+        "Plage affichée:",
+        min_value=first,
+        max_value=last,
+        value=value,
+        step=step,
+        format="DD/MM/YY HH:mm",
+        key=key,
+        # Plage conservée quand l'onglet n'est pas affiché
+        persist_state="page"
+    )
+    display_range = None if selected == (first, last) else selected
+    st.session_state[selection_key] = display_range
+    return display_range
+
+def show_collection_errors(collection_errors, constituents):
+    """Erreurs d'une collecte: échec global (ticker None) en erreur, échecs par valeur dans un volet"""
+    for ticker, error in collection_errors:
+        if ticker is None:
+            st.error(f"❌ Erreur lors de la collecte: {error}")
+    ticker_errors = [(ticker, error) for ticker, error in collection_errors if ticker is not None]
+    if ticker_errors:
+        with st.expander(f"⚠️ Erreurs de collecte ({len(ticker_errors)})"):
+            for ticker, error in ticker_errors:
+                display_name = constituents.name(ticker, ticker)
+                st.warning(f"**{display_name} ({ticker})**: {error}")
+
+@st.fragment
+def price_chart_view(collected_data, data_period, ticker_names, tickers_dict, include_indicators, max_chart_points, webgl_threshold, selected_companies):
+    """Sélecteurs et graphique de l'onglet Analyse Temps Réel.
+
+    Fragment: changer de valeur, de type de graphique ou de plage ne reconstruit que
+    ce graphique, sans relancer la barre latérale ni le résumé de la collecte.
+    """
+    # Durées propres au fragment (il peut être relancé sans le reste du script)
+    chart_timings = StageTimings("render")
+
+    # Sélection de la valeur à analyser
+    available_tickers = list(collected_data.keys())
+    display_names = [ticker_names.get(t, t) for t in available_tickers]
+
+    col1_viz, col2_viz = st.columns([2, 1])
+    with col1_viz:
+        selected_display = st.selectbox(
+            "Sélectionner une valeur pour l'analyse détaillée:", 
+            display_names, 
+            key="viz_select",
+            persist_state="page"
+        )
 
-    /* Sidebar personnalisée */
-    .css-1d391kg {
-        background-color: var(--card-background);
-        border-right: 1px solid var(--border-color);
-    }
+    with col2_viz:
+        chart_type = st.selectbox(
+            "Type de graphique:",
+            ["Chandelier + Volume", "Prix + Indicateurs", "Comparaison Multiple"],
+            key="chart_type_select",
+            persist_state="page"
+        )
 
-    /* Selectbox et Multiselect */
-    .stSelectbox > div > div > div, .stMultiSelect > div > div > div {
-        border-radius: 8px;
-        border: 1px solid var(--border-color);
-        transition: all 0.2s ease;
-    }
+    selected_ticker = tickers_dict.get(selected_display, selected_display)
+
+    # --- Plotting Logic for tab1 ---
+    if selected_ticker and selected_ticker in collected_data:
+        df_single = collected_data[selected_ticker]
+        company_name = collected_data.meta(selected_ticker, 'Company_Name', selected_display)
+        display_range = None
+        if chart_type != "Comparaison Multiple":
+            display_range = select_display_range(df_single, f"range_tab1_{selected_ticker}_{data_period}")
+            df_single = slice_range(df_single, display_range)
+            if max_chart_points and len(df_single) > max_chart_points:
+                st.caption(f"🔎 {len(df_single):,} barres réduites à {max_chart_points:,} points par courbe. "
+                           f"Réduisez la plage affichée pour plus de détail.".replace(",", " "))
+
+        if chart_type == "Chandelier + Volume":
+            st.subheader(f"🕯️ Chandelier et Volume pour {company_name}")
+            if not df_single.empty:
+                with chart_timings.time('figure.candlestick', selected_ticker):
+                    fig = get_figure_cache().get(
+                        (collected_data.version, selected_ticker, 'candlestick', include_indicators, max_chart_points, webgl_threshold, display_range),
+                        lambda: build_candlestick_figure(df_single, company_name, include_indicators, max_chart_points, webgl_threshold)
+                    )
+                with chart_timings.time('render.chart', selected_ticker):
+                    st.plotly_chart(fig, use_container_width=True, key="tab1_chart")
+            else:
+                st.warning("Pas de données disponibles pour le graphique en chandelier.")
+
+        elif chart_type == "Prix + Indicateurs":
+            st.subheader(f"📈 Prix et Indicateurs Techniques pour {company_name}")
+            if not df_single.empty and include_indicators:
+                with chart_timings.time('figure.indicators', selected_ticker):
+                    fig = get_figure_cache().get(
+                        (collected_data.version, selected_ticker, 'indicators', max_chart_points, webgl_threshold, display_range),
+                        lambda: build_indicators_figure(df_single, company_name, max_chart_points, webgl_threshold)
+                    )
+                with chart_timings.time('render.chart', selected_ticker):
+                    st.plotly_chart(fig, use_container_width=True, key="tab1_chart")
+            else:
+                st.warning("Pas de données ou indicateurs techniques non inclus pour ce graphique.")
+        elif chart_type == "Comparaison Multiple":
+            st.subheader(f"📈 Comparaison de l'Évolution Normalisée")
+            if collected_data:
+                col_fill, col_resample = st.columns(2)
+                with col_fill:
+                    comparison_fill = st.checkbox(
+                        "Combler les barres manquantes", value=True, key="comparison_fill", persist_state="page",
+                        help="Prolonge la dernière clôture d'un ticker sur les barres où seuls d'autres tickers ont coté (places ou horaires différents)"
+                    )
+                with col_resample:
+                    comparison_resample = st.selectbox(
+                        "Rééchantillonnage:",
+                        options=[None, "1h", "1D", "1W"],
+                        format_func=lambda v: {None: "Aucun", "1h": "Horaire", "1D": "Quotidien", "1W": "Hebdomadaire"}[v],
+                        key="comparison_resample",
+                        persist_state="page"
+                    )
+                with chart_timings.time('figure.comparison'):
+                    comparison_names = tuple(ticker_names.get(t, t) for t in collected_data)
+                    fig = get_figure_cache().get(
+                        (collected_data.version, None, 'comparison', comparison_names, webgl_threshold, comparison_fill, comparison_resample),
+                        lambda: build_comparison_figure(collected_data, ticker_names, webgl_threshold, comparison_fill, comparison_resample)
+                    )
+                if fig is not None:
+                    with chart_timings.time('render.chart'):
+                        st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.warning("Pas assez de données pour la comparaison multiple.")
+            else:
+                st.info("Veuillez collecter les données pour voir la comparaison.")
+    else:
+        if selected_companies: # Only show this if data collection is pending but companies are selected
+            st.info("Cliquez sur '🚀 Lancer l'Analyse' pour afficher les graphiques.")
+        else:
+            st.info("Sélectionnez des entreprises dans la barre latérale pour commencer l'analyse.")
 
-    .stSelectbox > div > div > div:focus-within, .stMultiSelect > div > div > div:focus-within {
-        border-color: var(--primary-color);
-        box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
-    }
+    if chart_timings.records:
+        REGISTRY.observe(chart_timings)
+        st.session_state['chart_timings'] = chart_timings
 
-    /* Animation de chargement */
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.6; }
-    }
-    
-    .loading-pulse {
-        animation: pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite;
-    }
+@st.fragment
+def technical_chart_view(tech_panel, data_period, ticker_names, tickers_dict, include_indicators, max_chart_points, webgl_threshold):
+    """Sélecteur et graphique de l'onglet Analyse Technique Détaillée (fragment relancé seul)"""
+    chart_timings = StageTimings("render")
 
-    /* Progress bar */
-    .stProgress > div > div > div > div {
-        background: linear-gradient(90deg, var(--primary-color), var(--secondary-color));
-        border-radius: 4px;
-    }
+    available_tickers = list(tech_panel.keys())
+    display_names = [ticker_names.get(t, t) for t in available_tickers]
 
-    /* Alertes personnalisées */
-    .stAlert > div {
-        border-radius: 8px;
-        border: 1px solid;
-        font-weight: 500;
-    }
+    selected_display_tech = st.selectbox(
+        "Sélectionner une valeur pour l'analyse technique:",
+        display_names,
+        key="tech_select_tab3", # Use a unique key
+        persist_state="page"
+    )
 
-    /* DataFrames */
-    .stDataFrame {
-        border-radius: 12px;
-        overflow: hidden;
-        box-shadow: var(--shadow);
-        border: 1px solid var(--border-color);
-    }
+    selected_ticker_tech = tickers_dict.get(selected_display_tech, selected_display_tech)
 
-    /* Text inputs */
-    .stTextInput > div > div > input {
-        border-radius: 8px;
-        border: 1px solid var(--border-color);
-        transition: all 0.2s ease;
-    }
+    if selected_ticker_tech and selected_ticker_tech in tech_panel:
+        df_tech = tech_panel[selected_ticker_tech]
+        company_name_tech = tech_panel.meta(selected_ticker_tech, 'Company_Name', selected_display_tech)
 
-    .stTextInput > div > div > input:focus {
-        border-color: var(--primary-color);
-        box-shadow: 0 0 0 3px rgba(37, 99, 235, 0.1);
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# --- Fonctions Utilitaires ---
-def calculate_data_quality(df):
-    """Calcule la qualité des données basée sur la complétude et la fraîcheur"""
-    if df.empty:
-        return 0, "Aucune donnée", "data-quality-poor"
-    
-    # Calcul de la complétude
-    total_cells = len(df) * len(df.columns)
-    missing_cells = df.isnull().sum().sum()
-    completeness = ((total_cells - missing_cells) / total_cells) * 100
-    
-    # Classification de la qualité
-    if completeness >= 98:
-        return completeness, "Excellente", "data-quality-excellent"
-    elif completeness >= 90:
-        return completeness, "Bonne", "data-quality-good"
-    elif completeness >= 70:
-        return completeness, "Moyenne", "data-quality-medium"
-    else:
-        return completeness, "Faible", "data-quality-poor"
+        st.subheader(f"Indicateurs pour {company_name_tech}")
+        tech_range = select_display_range(df_tech, f"range_tab3_{selected_ticker_tech}_{data_period}")
+        df_tech = slice_range(df_tech, tech_range)
 
-def format_number(num, prefix="", suffix=""):
-    """Formate les grands nombres avec des suffixes appropriés"""
-    if pd.isna(num) or num is None:
-        return "N/A"
-    
-    if abs(num) >= 1e12: # Trillions
-        return f"{prefix}{num/1e12:.2f}T{suffix}"
-    elif abs(num) >= 1e9: # Billions
-        return f"{prefix}{num/1e9:.2f}Md{suffix}"
-    elif abs(num) >= 1e6: # Millions
-        return f"{prefix}{num/1e6:.2f}M{suffix}"
-    elif abs(num) >= 1e3: # Thousands
-        return f"{prefix}{num/1e3:.2f}K{suffix}"
+        if include_indicators: # Check if indicators were collected
+            if not has_indicator_panels(df_tech): # Only price data, no indicators to plot
+                st.warning("Aucun indicateur technique disponible ou calculé pour cette période/donnée. Activez l'option 'Inclure les indicateurs techniques' dans la barre latérale.")
+            else:
+                # Même figure que « Prix + Indicateurs » (onglet 1): construite une seule fois pour les deux onglets
+                with chart_timings.time('figure.indicators', selected_ticker_tech):
+                    fig_tech = get_figure_cache().get(
+                        (tech_panel.version, selected_ticker_tech, 'indicators', max_chart_points, webgl_threshold, tech_range),
+                        lambda: build_indicators_figure(df_tech, company_name_tech, max_chart_points, webgl_threshold)
+                    )
+                with chart_timings.time('render.chart', selected_ticker_tech):
+                    # Clé explicite: la même figure peut être affichée dans l'onglet 1
+                    st.plotly_chart(fig_tech, use_container_width=True, key="tab3_chart")
+        else:
+            st.info("Veuillez activer l'option 'Inclure les indicateurs techniques' dans la barre latérale pour voir cette analyse.")
     else:
-        return f"{prefix}{num:.2f}{suffix}"
-
-# Suppression de la fonction format_percentage car sa logique est désormais intégrée au styler de Pandas.
-
-def get_ticker_data_enhanced(ticker_symbol, period):
-    """Collecte de données améliorée avec gestion d'erreurs et informations supplémentaires"""
-    try:
-        # Mapping des intervalles optimaux
-        interval_mapping = {
-            "1d": "2m", "5d": "5m", "1mo": "30m", 
-            "3mo": "1h", "6mo": "1d", "1y": "1d",
-            "2y": "1wk", "5y": "1wk", "10y": "1mo", 
-            "ytd": "1d", "max": "1mo"
-        }
-        interval_val = interval_mapping.get(period, "1d")
-        
-        # Création de l'objet ticker
-        ticker = yf.Ticker(ticker_symbol)
-        
-        # Téléchargement des données historiques
-        data = ticker.history(period=period, interval=interval_val, auto_adjust=True, prepost=True)
-        
-        if not data.empty:
-            # Reset de l'index pour avoir Datetime comme colonne
-            data = data.reset_index()
-            # Renommer la colonne 'Datetime' si elle existe, sinon 'Date'
-            if 'Datetime' in data.columns:
-                data.rename(columns={'Datetime': 'Date'}, inplace=True)
-            data['Ticker'] = ticker_symbol
-            
-            # Tentative de récupération des informations de l'entreprise
-            try:
-                info = ticker.info
-                company_name = info.get('longName', info.get('shortName', ticker_symbol))
-                sector = info.get('sector', 'Non spécifié')
-                market_cap = info.get('marketCap', None)
-                currency = info.get('currency', 'EUR')
-                
-                # Ajout des informations au DataFrame
-                data['Company_Name'] = company_name
-                data['Sector'] = sector
-                data['Market_Cap'] = market_cap
-                data['Currency'] = currency
-                
-            except Exception as info_error:
-                # Valeurs par défaut en cas d'erreur
-                data['Company_Name'] = ticker_symbol
-                data['Sector'] = 'Non spécifié'
-                data['Market_Cap'] = None
-                data['Currency'] = 'EUR'
-            
-            # Ajout d'indicateurs techniques
-            data = add_technical_indicators(data)
-            
-            return ticker_symbol, data, None
-            
-    except Exception as e:
-        return ticker_symbol, pd.DataFrame(), str(e)
+        st.info("Sélectionnez une entreprise et assurez-vous d'avoir collecté les données pour voir l'analyse technique.")
 
-def add_technical_indicators(df):
-    """Ajoute des indicateurs techniques au DataFrame"""
-    if df.empty or len(df) < 2:
-        return df
-    
-    try:
-        # Moyennes mobiles
-        if len(df) >= 10:
-            df['MA_10'] = df['Close'].rolling(window=10, min_periods=1).mean()
-        if len(df) >= 20:
-            df['MA_20'] = df['Close'].rolling(window=20, min_periods=1).mean()
-        if len(df) >= 50:
-            df['MA_50'] = df['Close'].rolling(window=50, min_periods=1).mean()
-        
-        # RSI (Relative Strength Index)
-        if len(df) >= 14:
-            delta = df['Close'].diff()
-            # Pour éviter la division par zéro dans le cas où loss est 0
-            gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
-            
-            # Gestion de la division par zéro pour RS
-            rs = np.where(loss == 0, np.inf, gain / loss)
-            df['RSI'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        if len(df) >= 26:
-            exp1 = df['Close'].ewm(span=12, adjust=False).mean()
-            exp2 = df['Close'].ewm(span=26, adjust=False).mean()
-            df['MACD'] = exp1 - exp2
-            df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-            df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
-        
-        # Bandes de Bollinger
-        if len(df) >= 20:
-            df['BB_Middle'] = df['Close'].rolling(window=20).mean()
-            bb_std = df['Close'].rolling(window=20).std()
-            df['BB_Upper'] = df['BB_Middle'] + (bb_std * 2)
-            df['BB_Lower'] = df['BB_Middle'] - (bb_std * 2)
-            
-    except Exception as e:
-        st.warning(f"Erreur lors du calcul des indicateurs techniques: {e}")
-        # S'assurer que les colonnes sont créées même en cas d'erreur pour éviter des KeyError plus tard
-        for col in ['MA_10', 'MA_20', 'MA_50', 'RSI', 'MACD', 'MACD_Signal', 'MACD_Histogram', 'BB_Middle', 'BB_Upper', 'BB_Lower']:
-            if col not in df.columns:
-                df[col] = np.nan
-    
-    return df
-
-def collect_data_parallel(tickers_to_collect, period, max_workers=5):
-    """Collecte les données en parallèle pour améliorer les performances"""
-    collected_data = {}
-    errors = []
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Soumission de tous les jobs
-        future_to_ticker = {
-            executor.submit(get_ticker_data_enhanced, ticker, period): ticker 
-            for ticker in tickers_to_collect
-        }
-        
-        # Récupération des résultats
-        for future in as_completed(future_to_ticker):
-            ticker_symbol, data, error = future.result()
-            
-            if error:
-                errors.append((ticker_symbol, error))
-            elif not data.empty:
-                collected_data[ticker_symbol] = data
-            else:
-                errors.append((ticker_symbol, "Aucune donnée disponible"))
-    
-    return collected_data, errors
+    if chart_timings.records:
+        REGISTRY.observe(chart_timings)
+        st.session_state['chart_timings'] = chart_timings
 
 # --- Application Principale ---
 st.title("📈 CAC 40 Tracker Pro")
@@ -458,24 +350,54 @@ st.markdown("*Suivi avancé et analyse en temps réel des valeurs du CAC 40*")
 with st.sidebar:
     st.header("⚙️ Configuration")
     
-    # Actualisation des tickers CAC 40
-    if st.button("🔄 Actualiser CAC 40", use_container_width=True):
-        with st.spinner("Actualisation en cours..."):
-            try:
-                st.session_state['tickers_dict'] = get_cac40_tickers()
-                st.success("✅ Liste CAC 40 actualisée !")
-            except Exception as e:
-                st.error(f"❌ Erreur lors de l'actualisation: {e}")
+    # Source des cotations: Yahoo Finance ou sources hors ligne (rejeu, synthétique) pour les tests de charge
+    default_source, default_source_options = parse_provider_spec(DEFAULT_PROVIDER_SPEC)
+    data_source = st.selectbox(
+        "Source des données:",
+        list(DATA_SOURCES),
+        index=list(DATA_SOURCES).index(default_source) if default_source in DATA_SOURCES else 0,
+        format_func=DATA_SOURCES.get
+    )
+    source_options = default_source_options if data_source == default_source else {}
+    if data_source == "replay":
+        replay_root = st.text_input("Répertoire des barres enregistrées:", value=source_options.get('root', get_bar_store().root))
+        replay_latency_ms = st.slider("Latence simulée (ms):", 0, 1000, int(float(source_options.get('latency', 0)) * 1000), step=10)
+        provider_spec = f"replay:{replay_root},latency={replay_latency_ms / 1000}"
+    elif data_source == "synthetic":
+        synthetic_tickers = st.number_input("Nombre de tickers synthétiques:", 1, 5000, int(source_options.get('tickers', 40)))
+        provider_spec = f"synthetic:tickers={synthetic_tickers}"
+    else:
+        provider_spec = "yfinance"
+    provider = get_market_data_provider(provider_spec)
+    provider_tickers = provider.list_tickers()
     
-    # Initialisation des tickers
-    if 'tickers_dict' not in st.session_state:
+    if provider_tickers is not None:
+        # Univers propre à la source hors ligne
+        tickers_dict = provider_tickers
+    else:
+        # Relecture du registre de composition (après mise à jour de data/cac40_constituents.json)
+        if st.button("🔄 Actualiser CAC 40", use_container_width=True):
+            get_constituent_registry.clear()
+            get_cac40_tickers.clear()
+            st.success("✅ Liste CAC 40 actualisée !")
+        
+        # Composition de l'indice à la date choisie (aujourd'hui par défaut), proposée seulement
+        # sur la partie exhaustive de l'historique renseigné (entrées et sorties)
+        history_start = get_constituent_registry().complete_from
+        composition_date = None
+        if history_start is not None and history_start < date.today():
+            composition_date = st.date_input(
+                "Composition de l'indice au:",
+                value=date.today(),
+                min_value=history_start,
+                max_value=date.today(),
+                format="DD/MM/YYYY"
+            )
         try:
-            st.session_state['tickers_dict'] = get_cac40_tickers()
+            tickers_dict = get_cac40_tickers(composition_date)
         except Exception as e:
             st.error(f"Erreur lors du chargement des tickers: {e}")
-            st.session_state['tickers_dict'] = {}
-    
-    tickers_dict = st.session_state.get('tickers_dict', {})
+            tickers_dict = {}
     
     if tickers_dict:
         st.success(f"✅ {len(tickers_dict)} entreprises chargées")
@@ -499,38 +421,41 @@ with st.sidebar:
     # Sélection des entreprises avec recherche et filtre par secteur
     st.subheader("🏢 Sélection des Entreprises")
     
+    # Index des valeurs: secteurs issus du cache partagé des informations entreprise (disponibles avant toute collecte)
+    metadata_cache = get_metadata_cache(provider_spec)
+    metadata_cache.prefetch(list(tickers_dict.values()))
+    constituents = get_constituent_index(provider_spec, tuple(tickers_dict.items()), metadata_cache.version)
+    # Informations entreprise reçues depuis la collecte: panneau de la session mis à jour (mêmes barres)
+    collection_request = st.session_state.get('collection_request')
+    if collection_request and isinstance(st.session_state.get('collected_data'), MarketPanel):
+        st.session_state['collected_data'] = refresh_panel_metadata(
+            st.session_state['collected_data'], get_metadata_cache(collection_request['provider_spec'])
+        )
+    # Nom affiché de chaque ticker
+    ticker_names = constituents.ticker_names
+    
     if tickers_dict:
-        # Récupérer tous les secteurs disponibles (hypothèse : si get_cac40_tickers ou la première collecte fournit le secteur)
-        all_sectors = []
-        if 'collected_data' in st.session_state and st.session_state['collected_data']:
-            for df_val in st.session_state['collected_data'].values():
-                if 'Sector' in df_val.columns and not df_val.empty:
-                    all_sectors.append(df_val['Sector'].iloc[0])
-        all_sectors = sorted(list(set(all_sectors)))
+        all_sectors = constituents.sectors
         
         selected_sectors = st.multiselect(
             "Filtrer par secteur:",
             ['Tous'] + all_sectors,
             default=['Tous']
         )
+        if metadata_cache.is_loading(tickers_dict.values()):
+            st.caption("⏳ Chargement des secteurs en arrière-plan...")
 
         search_term = st.text_input("🔍 Rechercher", placeholder="Tapez le nom d'une entreprise...")
         
-        all_companies_names = list(tickers_dict.keys())
-        filtered_companies_by_search = [name for name in all_companies_names if search_term.lower() in name.lower()]
+        # Recherche par préfixe (nom ou mot du nom), texte contenu, puis noms approchants
+        filtered_companies_by_search = constituents.search(search_term)
 
         # Filtrer davantage par secteur si "Tous" n'est pas sélectionné
         if 'Tous' not in selected_sectors and all_sectors:
-            companies_in_selected_sectors = []
-            if 'collected_data' in st.session_state and st.session_state['collected_data']:
-                for company_name, ticker_symbol in tickers_dict.items():
-                    if ticker_symbol in st.session_state['collected_data']:
-                        df_info = st.session_state['collected_data'][ticker_symbol]
-                        if not df_info.empty and 'Sector' in df_info.columns and df_info['Sector'].iloc[0] in selected_sectors:
-                            companies_in_selected_sectors.append(company_name)
+            companies_in_selected_sectors = constituents.names_in_sectors(selected_sectors)
             
             # Intersection des deux filtres (recherche et secteur)
-            filtered_companies = list(set(filtered_companies_by_search) & set(companies_in_selected_sectors))
+            filtered_companies = [name for name in filtered_companies_by_search if name in companies_in_selected_sectors]
         else:
             filtered_companies = filtered_companies_by_search
 
@@ -547,14 +472,18 @@ with st.sidebar:
         # Si la sélection actuelle est vide ET qu'il y a des entreprises filtrées,
         # alors proposez les 5 premières entreprises filtrées comme défaut.
         # Sinon, utilisez la sélection actuelle (peut être vide si l'utilisateur a tout désélectionné).
-        default_selection_for_widget = current_multiselect_value 
-        if not current_multiselect_value and filtered_companies:
+        # Seules les entreprises encore présentes après filtre peuvent rester sélectionnées
+        default_selection_for_widget = [name for name in current_multiselect_value if name in filtered_companies]
+        if not default_selection_for_widget and filtered_companies:
             default_selection_for_widget = filtered_companies[:5]
+        # La sélection est imposée via st.session_state: la valeur mémorisée prime sur 'default'
+        # et resterait vide après un changement de liste (autre source de données, filtre)
+        if current_multiselect_value != default_selection_for_widget:
+            st.session_state["company_multiselect"] = default_selection_for_widget
 
         selected_companies = st.multiselect(
             "Entreprises à analyser:",
             filtered_companies,
-            default=default_selection_for_widget, # Utilisez la valeur par défaut calculée
             key="company_multiselect", # ATTENTION: Ce 'key' est essentiel pour la persistance de l'état
             help=f"{len(filtered_companies)} entreprises disponibles après filtre"
         )
@@ -586,515 +515,591 @@ with st.sidebar:
     # Options avancées
     with st.expander("🔧 Options Avancées"):
         include_indicators = st.checkbox("Inclure les indicateurs techniques", value=True)
-        auto_refresh = st.checkbox("Actualisation automatique (5 min)", value=False)
+        async_download = st.checkbox(
+            "Collecte asynchrone",
+            value=True,
+            disabled=provider.name != "yfinance",
+            help="Envoie toutes les requêtes simultanément sur une session HTTP partagée (nouvelles tentatives et limitation de débit)"
+        )
+        batch_download = st.checkbox(
+            "Téléchargement groupé",
+            value=True,
+            help="Récupère les historiques par lots de plusieurs tickers (repli individuel en cas d'échec)"
+        )
+        use_bar_store = st.checkbox(
+            "Cache local des cotations",
+            value=True,
+            disabled=provider.name != "yfinance",
+            help="Conserve les historiques sur disque et ne télécharge que les nouvelles barres"
+        )
+        incremental_indicators = st.checkbox(
+            "Indicateurs incrémentaux",
+            value=True,
+            help="Ne calcule les indicateurs que pour les nouvelles barres depuis la dernière collecte"
+        )
+        max_chart_points = st.select_slider(
+            "Points max par courbe:",
+            options=[500, 1000, 2000, 5000, 0],
+            value=DEFAULT_MAX_POINTS,
+            format_func=lambda v: "Toutes les barres" if v == 0 else f"{v:,}".replace(",", " "),
+            help="Au-delà, les bougies sont regroupées et les courbes simplifiées (LTTB); réduisez la plage affichée pour retrouver le détail"
+        )
+        webgl_mode = st.selectbox(
+            "Rendu des courbes:",
+            options=["auto", "webgl", "svg"],
+            format_func=lambda v: {"auto": "Automatique", "webgl": "WebGL", "svg": "SVG"}[v],
+            help=f"Automatique: WebGL au-delà de {WEBGL_POINT_THRESHOLD:,} points par graphique, "
+                 f"pour garder survol, zoom et déplacement fluides".replace(",", " ")
+        )
+        # Seuil de points transmis aux graphiques: None = jamais WebGL, 0 = toujours
+        webgl_threshold = {"auto": WEBGL_POINT_THRESHOLD, "webgl": 0, "svg": None}[webgl_mode]
+        use_snapshots = st.checkbox(
+            "Instantanés précalculés",
+            value=True,
+            help=f"Utilise la dernière collecte écrite par collector.py si elle date de moins de {DEFAULT_MAX_AGE / 60:.0f} min "
+                 "et couvre toute la sélection"
+        )
+        streaming_collection = st.checkbox(
+            "Collecte progressive",
+            value=False,
+            help="Affiche chaque valeur dès son arrivée (téléchargements individuels, sans partage entre sessions ni téléchargement groupé)"
+        )
+        auto_refresh = st.checkbox("Actualisation automatique", value=False)
+        refresh_interval_min = 5
         if auto_refresh:
-            st.info("🔄 L'actualisation automatique est activée")
+            refresh_interval_min = st.select_slider(
+                "Intervalle d'actualisation (min):",
+                options=[1, 2, 5, 10, 15, 30],
+                value=5
+            )
+            st.info(f"🔄 L'actualisation automatique est activée ({refresh_interval_min} min)")
+
+# Durées de calcul et d'affichage de cette exécution du script (onglet Diagnostics)
+render_timings = StageTimings("render")
+# Imports (coûteux au démarrage à froid, quasi nuls ensuite) puis configuration, style et barre latérale
+render_timings.record('script.imports', imports_done - script_started)
+render_timings.record('script.sidebar', time.perf_counter() - imports_done)
 
 # --- Onglets principaux ---
-tab1, tab2, tab3 = st.tabs(["📊 Analyse Temps Réel", "📈 Vue d'Ensemble CAC 40", "🔬 Analyse Technique Détaillée"])
+# Exécution à la demande: seul l'onglet affiché est calculé (tab.open); changer d'onglet relance le script.
+# Les résultats restent mémorisés avec le panneau de données (derived, cache des graphiques) jusqu'à la collecte suivante.
+tab1, tab2, tab3, tab4 = st.tabs(
+    ["📊 Analyse Temps Réel", "📈 Vue d'Ensemble CAC 40", "🔬 Analyse Technique Détaillée", "⏱️ Diagnostics"],
+    key="main_tab",
+    on_change="rerun"
+)
 
 # --- Onglet 1: Analyse Temps Réel ---
-with tab1:
-    col1, col2 = st.columns([3, 1])
+if tab1.open:
+    with tab1:
+        col1, col2 = st.columns([3, 1])
     
-    with col1:
-        st.header("📊 Analyse en Temps Réel")
-        st.markdown(f"*Données pour la période: **{selected_period_label}** • Indicateurs techniques: {'✅' if include_indicators else '❌'}*")
+        with col1:
+            st.header("📊 Analyse en Temps Réel")
+            st.markdown(f"*Données pour la période: **{selected_period_label}** • Indicateurs techniques: {'✅' if include_indicators else '❌'}*")
     
-    with col2:
-        # Bouton de collecte principal
-        collect_button = st.button(
-            "🚀 Lancer l'Analyse", 
-            use_container_width=True, 
-            type="primary",
-            disabled=not selected_companies
-        )
+        with col2:
+            # Bouton de collecte principal
+            collect_button = st.button(
+                "🚀 Lancer l'Analyse", 
+                use_container_width=True, 
+                type="primary",
+                disabled=not selected_companies
+            )
     
-    # Gestion de la collecte des données
-    if collect_button:
-        if not selected_companies:
-            st.error("⚠️ Veuillez sélectionner au moins une entreprise")
-        else:
-            # Préparation de la collecte
-            tickers_to_collect = [tickers_dict[name] for name in selected_companies if name in tickers_dict]
+        # Gestion de la collecte des données
+        if collect_button:
+            if not selected_companies:
+                st.error("⚠️ Veuillez sélectionner au moins une entreprise")
+            else:
+                # Préparation de la collecte
+                tickers_to_collect = [tickers_dict[name] for name in selected_companies if name in tickers_dict]
+                if provider_tickers is None:
+                    # Pas de requête pour les valeurs absentes de l'indice sur toute la période analysée
+                    tickers_to_collect, skipped_tickers = get_constituent_registry().filter_members(
+                        tickers_to_collect, period_window_start(selected_period), date.today()
+                    )
+                    if skipped_tickers:
+                        st.info(f"ℹ️ Hors de l'indice sur la période, non collectées: {', '.join(constituents.name(t, t) for t in skipped_tickers)}")
             
-            # Interface de progression
-            progress_placeholder = st.empty()
-            status_placeholder = st.empty()
+                # Une collecte progressive encore en cours est abandonnée au profit de la nouvelle
+                previous_job = st.session_state.pop('streaming_collection', None)
+                if previous_job is not None:
+                    previous_job.cancel()
+                if streaming_collection:
+                    # Chaque valeur s'affiche dès son arrivée; avancement suivi dans la barre latérale
+                    bar_store, _ = get_collection_backends(provider_spec, use_bar_store, False)
+                    streaming_job = StreamingCollection(
+                        tickers_to_collect, selected_period, max_workers, bar_store,
+                        get_metadata_cache(provider_spec), provider, StageTimings()
+                    ).start()
+                    st.session_state['streaming_collection'] = streaming_job
+                    st.session_state['collected_data'] = streaming_job.panel()
+                    st.session_state['collection_errors'] = []
+                    st.session_state['collection_request'] = {
+                        'id': str(uuid.uuid4()),
+                        'tickers': tickers_to_collect,
+                        'period': selected_period,
+                        'provider_spec': provider_spec
+                    }
+                    st.info(f"📡 Collecte progressive de {len(tickers_to_collect)} valeurs: les résultats s'affichent au fil de leur arrivée.")
+                else:
+                    # Interface de progression
+                    progress_placeholder = st.empty()
+                    status_placeholder = st.empty()
             
-            with progress_placeholder.container():
-                st.info(f"🔄 Démarrage de la collecte pour {len(tickers_to_collect)} valeurs...")
-                progress_bar = st.progress(0)
+                    with progress_placeholder.container():
+                        st.info(f"🔄 Démarrage de la collecte pour {len(tickers_to_collect)} valeurs...")
+                        progress_bar = st.progress(0)
             
-            # Collecte parallèle des données
-            start_time = time.time()
+                    # Collecte parallèle des données
+                    start_time = time.time()
             
-            try:
-                with status_placeholder.container():
-                    st.info("📡 Collecte des données en cours...")
+                    try:
+                        with status_placeholder.container():
+                            st.info("📡 Collecte des données en cours...")
                 
-                collected_data, collection_errors = collect_data_parallel(
-                    tickers_to_collect, 
-                    selected_period, 
-                    max_workers
-                )
+                        collection_timings = StageTimings()
+                        snapshot = None
+                        if use_snapshots:
+                            with collection_timings.time('snapshot'):
+                                snapshot = read_snapshot(provider_spec, selected_period, tickers_to_collect)
+                        if snapshot is not None:
+                            # Collecte précalculée par collector.py: aucune requête pendant la session
+                            collected_data, collection_errors = snapshot
+                        else:
+                            # Données servies par la couche partagée (un seul téléchargement pour toutes les sessions)
+                            bar_store, async_fetcher = get_collection_backends(provider_spec, use_bar_store, async_download)
+                            collected_data, collection_errors = collect_data_shared(
+                                get_shared_market_data(provider_spec),
+                                tickers_to_collect, 
+                                selected_period, 
+                                max_workers,
+                                batch_download,
+                                bar_store,
+                                get_metadata_cache(provider_spec),
+                                incremental_indicators,
+                                async_fetcher,
+                                provider,
+                                collection_timings
+                            )
                 
-                collection_time = time.time() - start_time
-                progress_bar.progress(1.0)
+                        collection_time = time.time() - start_time
+                        collection_timings.record('collection', collection_time)
+                        REGISTRY.observe(collection_timings, errors=len(collection_errors),
+                                         tickers=len(tickers_to_collect), period=selected_period, source=provider.name)
+                        progress_bar.progress(1.0)
                 
-                # Stockage des résultats dans la session
-                st.session_state['collected_data'] = collected_data
-                st.session_state['collection_errors'] = collection_errors
-                st.session_state['collection_time'] = collection_time
-                st.session_state['collection_timestamp'] = datetime.now()
+                        # Stockage des résultats dans la session
+                        st.session_state['collected_data'] = collected_data
+                        st.session_state['collection_errors'] = collection_errors
+                        st.session_state['collection_time'] = collection_time
+                        st.session_state['collection_timestamp'] = datetime.now()
+                        st.session_state['collection_timings'] = collection_timings
+                        # Sélection collectée, reprise par l'actualisation automatique
+                        st.session_state['collection_request'] = {
+                            'id': str(uuid.uuid4()),
+                            'tickers': tickers_to_collect,
+                            'period': selected_period,
+                            'provider_spec': provider_spec
+                        }
                 
-                # Nettoyage de l'interface
-                progress_placeholder.empty()
+                        # Nettoyage de l'interface
+                        progress_placeholder.empty()
                 
-                # Message de succès avec statistiques
-                if collected_data:
-                    total_rows = sum(len(df) for df in collected_data.values())
-                    success_rate = (len(collected_data) / len(tickers_to_collect)) * 100
+                        # Message de succès avec statistiques
+                        if collected_data:
+                            total_rows = int(collected_data.row_counts().sum())
+                            success_rate = (len(collected_data) / len(tickers_to_collect)) * 100
                     
-                    status_placeholder.success(
-                        f"✅ Collecte terminée: {len(collected_data)}/{len(tickers_to_collect)} valeurs "
-                        f"({success_rate:.1f}% succès) • {total_rows:,} points de données • "
-                        f"Temps: {collection_time:.1f}s"
-                    )
+                            status_placeholder.success(
+                                f"✅ Collecte terminée: {len(collected_data)}/{len(tickers_to_collect)} valeurs "
+                                f"({success_rate:.1f}% succès) • {total_rows:,} points de données • "
+                                f"Temps: {collection_time:.1f}s"
+                            )
                     
-                    # Affichage des erreurs s'il y en a
-                    if collection_errors:
-                        with st.expander(f"⚠️ Erreurs de collecte ({len(collection_errors)})"):
-                            for ticker, error in collection_errors:
-                                company_name = [k for k, v in tickers_dict.items() if v == ticker]
-                                display_name = company_name[0] if company_name else ticker
-                                st.warning(f"**{display_name} ({ticker})**: {error}")
-                else:
-                    status_placeholder.error("❌ Aucune donnée collectée. Vérifiez votre connexion internet.")
+                            # Affichage des erreurs s'il y en a
+                            show_collection_errors(collection_errors, constituents)
+                        else:
+                            status_placeholder.error("❌ Aucune donnée collectée. Vérifiez votre connexion internet.")
                     
-            except Exception as e:
-                progress_placeholder.empty()
-                status_placeholder.error(f"❌ Erreur lors de la collecte: {e}")
+                    except Exception as e:
+                        progress_placeholder.empty()
+                        status_placeholder.error(f"❌ Erreur lors de la collecte: {e}")
+
+        # Bilan d'une collecte progressive terminée, affiché une fois comme après une collecte classique
+        streaming_report = st.session_state.pop('streaming_report', None)
+        if streaming_report is not None:
+            loaded, total = streaming_report['loaded'], streaming_report['total']
+            if loaded:
+                st.success(
+                    f"✅ Collecte progressive terminée: {loaded}/{total} valeurs "
+                    f"({loaded / total * 100:.1f}% succès) • {streaming_report['rows']:,} points de données • "
+                    f"Temps: {streaming_report['collection_time']:.1f}s"
+                )
+            else:
+                st.error("❌ Aucune donnée collectée. Vérifiez votre connexion internet.")
+            show_collection_errors(streaming_report['errors'], constituents)
     
-    # Affichage des données collectées
-    if 'collected_data' in st.session_state and st.session_state['collected_data']:
-        st.markdown("---")
+        # Affichage des données collectées
+        if 'collected_data' in st.session_state and st.session_state['collected_data']:
+            st.markdown("---")
         
-        collected_data = st.session_state['collected_data']
-        collection_time = st.session_state.get('collection_time', 0)
-        collection_timestamp = st.session_state.get('collection_timestamp', datetime.now())
+            collected_data = st.session_state['collected_data']
+            collection_time = st.session_state.get('collection_time', 0)
+            collection_timestamp = st.session_state.get('collection_timestamp', datetime.now())
         
-        # Métriques de résumé
-        st.subheader("📊 Résumé de la Collecte")
+            # Métriques de résumé
+            st.subheader("📊 Résumé de la Collecte")
         
-        # Calcul des statistiques globales
-        total_rows = sum(len(df) for df in collected_data.values())
-        quality_scores = [calculate_data_quality(df)[0] for df in collected_data.values()]
-        avg_quality = np.mean(quality_scores) if quality_scores else 0
+            # Calcul des statistiques globales
+            total_rows = int(collected_data.row_counts().sum())
+            def average_quality():
+                quality_scores = []
+                for ticker, df in collected_data.items():
+                    with render_timings.time('quality', ticker):
+                        quality_scores.append(calculate_data_quality(df)[0])
+                return np.mean(quality_scores) if quality_scores else 0
+            # Calculée une fois par collecte, pas à chaque interaction
+            avg_quality = collected_data.derived(('average_quality',), average_quality)
         
-        # Affichage des métriques en colonnes
-        col1, col2, col3, col4 = st.columns(4)
+            # Affichage des métriques en colonnes
+            col1, col2, col3, col4 = st.columns(4)
         
-        with col1:
-            st.markdown(f"""
-                <div class="metric-container">
-                    <div class="metric-value">{len(collected_data)}</div>
-                    <div class="metric-label">Valeurs Collectées</div>
-                </div>
-            """, unsafe_allow_html=True)
+            with col1:
+                st.markdown(f"""
+                    <div class="metric-container">
+                        <div class="metric-value">{len(collected_data)}</div>
+                        <div class="metric-label">Valeurs Collectées</div>
+                    </div>
+                """, unsafe_allow_html=True)
             
-        with col2:
-            st.markdown(f"""
-                <div class="metric-container">
-                    <div class="metric-value">{total_rows:,}</div>
-                    <div class="metric-label">Points de Données</div>
-                </div>
-            """, unsafe_allow_html=True)
+            with col2:
+                st.markdown(f"""
+                    <div class="metric-container">
+                        <div class="metric-value">{total_rows:,}</div>
+                        <div class="metric-label">Points de Données</div>
+                    </div>
+                """, unsafe_allow_html=True)
             
-        with col3:
-            quality_class = ("excellent" if avg_quality >= 95 else 
-                             "good" if avg_quality >= 80 else 
-                             "medium" if avg_quality >= 60 else "poor")
-            st.markdown(f"""
-                <div class="metric-container">
-                    <div class="metric-value data-quality-{quality_class}">{avg_quality:.1f}%</div>
-                    <div class="metric-label">Qualité Moyenne</div>
-                </div>
-            """, unsafe_allow_html=True)
+            with col3:
+                quality_class = ("excellent" if avg_quality >= 95 else 
+                                 "good" if avg_quality >= 80 else 
+                                 "medium" if avg_quality >= 60 else "poor")
+                st.markdown(f"""
+                    <div class="metric-container">
+                        <div class="metric-value data-quality-{quality_class}">{avg_quality:.1f}%</div>
+                        <div class="metric-label">Qualité Moyenne</div>
+                    </div>
+                """, unsafe_allow_html=True)
+            
+            with col4:
+                st.markdown(f"""
+                    <div class="metric-container">
+                        <div class="metric-value">{collection_time:.1f}s</div>
+                        <div class="metric-label">Temps de Collecte</div>
+                    </div>
+                """, unsafe_allow_html=True)
             
-        with col4:
+            # Informations sur la dernière mise à jour
             st.markdown(f"""
-                <div class="metric-container">
-                    <div class="metric-value">{collection_time:.1f}s</div>
-                    <div class="metric-label">Temps de Collecte</div>
+                <div class="info-card">
+                    <p><strong>📅 Dernière mise à jour:</strong> {collection_timestamp.strftime('%d/%m/%Y à %H:%M:%S')}</p>
+                    <p><strong>⏱️ Période analysée:</strong> {selected_period_label} • <strong>🔧 Threads utilisés:</strong> {max_workers}</p>
                 </div>
             """, unsafe_allow_html=True)
-            
-        # Informations sur la dernière mise à jour
-        st.markdown(f"""
-            <div class="info-card">
-                <p><strong>📅 Dernière mise à jour:</strong> {collection_timestamp.strftime('%d/%m/%Y à %H:%M:%S')}</p>
-                <p><strong>⏱️ Période analysée:</strong> {selected_period_label} • <strong>🔧 Threads utilisés:</strong> {max_workers}</p>
-            </div>
-        """, unsafe_allow_html=True)
-        
-        st.markdown("---")
-        
-        # Section de visualisation avancée
-        st.subheader("📈 Visualisation Interactive")
         
-        # Sélection de la valeur à analyser
-        ticker_names = {v: k for k, v in tickers_dict.items()}
-        available_tickers = list(collected_data.keys())
-        display_names = [ticker_names.get(t, t) for t in available_tickers]
-        
-        col1_viz, col2_viz = st.columns([2, 1])
-        with col1_viz:
-            selected_display = st.selectbox(
-                "Sélectionner une valeur pour l'analyse détaillée:", 
-                display_names, 
-                key="viz_select"
-            )
+            st.markdown("---")
         
-        with col2_viz:
-            chart_type = st.selectbox(
-                "Type de graphique:",
-                ["Chandelier + Volume", "Prix + Indicateurs", "Comparaison Multiple"],
-                key="chart_type_select"
-            )
+            # Section de visualisation avancée
+            st.subheader("📈 Visualisation Interactive")
         
-        selected_ticker = tickers_dict.get(selected_display, selected_display)
-
-        # --- Plotting Logic for tab1 ---
-        if selected_ticker and selected_ticker in collected_data:
-            df_single = collected_data[selected_ticker]
-            company_name = df_single['Company_Name'].iloc[0] if 'Company_Name' in df_single.columns and not df_single.empty else selected_display
-
-            if chart_type == "Chandelier + Volume":
-                st.subheader(f"🕯️ Chandelier et Volume pour {company_name}")
-                if not df_single.empty:
-                    fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
-                                        vertical_spacing=0.1,
-                                        row_heights=[0.7, 0.3])
-                    fig.add_trace(go.Candlestick(x=df_single['Date'],
-                                                 open=df_single['Open'],
-                                                 high=df_single['High'],
-                                                 low=df_single['Low'],
-                                                 close=df_single['Close'],
-                                                 name='Candlestick'), row=1, col=1)
-                    if include_indicators:
-                        if 'MA_10' in df_single.columns and not df_single['MA_10'].isnull().all():
-                            fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MA_10'], mode='lines', name='MA 10', line=dict(color='orange', width=1)), row=1, col=1)
-                        if 'MA_20' in df_single.columns and not df_single['MA_20'].isnull().all():
-                            fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MA_20'], mode='lines', name='MA 20', line=dict(color='purple', width=1)), row=1, col=1)
-                        if 'MA_50' in df_single.columns and not df_single['MA_50'].isnull().all():
-                            fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MA_50'], mode='lines', name='MA 50', line=dict(color='red', width=1.5)), row=1, col=1)
-                        if 'BB_Upper' in df_single.columns and 'BB_Lower' in df_single.columns and not df_single['BB_Upper'].isnull().all():
-                             fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['BB_Upper'], mode='lines', name='BB Upper', line=dict(color='blue', width=1, dash='dot')), row=1, col=1)
-                             fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['BB_Lower'], mode='lines', name='BB Lower', line=dict(color='blue', width=1, dash='dot')), row=1, col=1)
-
-
-                    fig.add_trace(go.Bar(x=df_single['Date'], y=df_single['Volume'], name='Volume', marker_color='rgba(0,100,200,0.8)'), row=2, col=1)
-                    fig.update_layout(xaxis_rangeslider_visible=False, title_text=f"Cours et Volume - {company_name}", height=600)
-                    fig.update_yaxes(title_text="Cours", row=1, col=1)
-                    fig.update_yaxes(title_text="Volume", row=2, col=1)
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.warning("Pas de données disponibles pour le graphique en chandelier.")
-
-            elif chart_type == "Prix + Indicateurs":
-                st.subheader(f"📈 Prix et Indicateurs Techniques pour {company_name}")
-                if not df_single.empty and include_indicators:
-                    plot_rows_indicators = 1 # Start with Close price
-                    row_titles_indicators = ["Prix de Clôture & Moyennes Mobiles"]
-                    if 'RSI' in df_single.columns and not df_single['RSI'].isnull().all():
-                        plot_rows_indicators += 1
-                        row_titles_indicators.append("RSI (Relative Strength Index)")
-                    if 'MACD' in df_single.columns and not df_single['MACD'].isnull().all() and not df_single['MACD_Signal'].isnull().all():
-                        plot_rows_indicators += 1
-                        row_titles_indicators.append("MACD (Moving Average Convergence Divergence)")
-
-
-                    fig = make_subplots(rows=plot_rows_indicators, cols=1, shared_xaxes=True,
-                                        vertical_spacing=0.1,
-                                        row_titles=row_titles_indicators)
-                    
-                    current_row_indicator = 1
-                    # Prix
-                    fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['Close'], mode='lines', name='Prix Clôture', line=dict(color='blue')), row=current_row_indicator, col=1)
-                    if 'MA_10' in df_single.columns and not df_single['MA_10'].isnull().all():
-                        fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MA_10'], mode='lines', name='MA 10', line=dict(color='orange')), row=current_row_indicator, col=1)
-                    if 'MA_20' in df_single.columns and not df_single['MA_20'].isnull().all():
-                        fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MA_20'], mode='lines', name='MA 20', line=dict(color='purple')), row=current_row_indicator, col=1)
-                    if 'MA_50' in df_single.columns and not df_single['MA_50'].isnull().all():
-                        fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MA_50'], mode='lines', name='MA 50', line=dict(color='red')), row=current_row_indicator, col=1)
-                    if 'BB_Upper' in df_single.columns and 'BB_Lower' in df_single.columns and not df_single['BB_Upper'].isnull().all():
-                         fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['BB_Upper'], mode='lines', name='BB Upper', line=dict(color='blue', dash='dot')), row=current_row_indicator, col=1)
-                         fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['BB_Lower'], mode='lines', name='BB Lower', line=dict(color='blue', dash='dot')), row=current_row_indicator, col=1)
-                    fig.update_yaxes(title_text="Prix", row=current_row_indicator, col=1)
-                    current_row_indicator += 1
-
-                    # RSI
-                    if 'RSI' in df_single.columns and not df_single['RSI'].isnull().all():
-                        fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['RSI'], mode='lines', name='RSI', line=dict(color='green')), row=current_row_indicator, col=1)
-                        fig.add_hline(y=70, line_dash="dash", line_color="red", row=current_row_indicator, col=1, annotation_text="Surachat", annotation_position="top right")
-                        fig.add_hline(y=30, line_dash="dash", line_color="green", row=current_row_indicator, col=1, annotation_text="Survente", annotation_position="bottom right")
-                        fig.update_yaxes(title_text="RSI", row=current_row_indicator, col=1)
-                        current_row_indicator += 1
-
-                    # MACD
-                    if 'MACD' in df_single.columns and 'MACD_Signal' in df_single.columns and 'MACD_Histogram' in df_single.columns and not df_single['MACD'].isnull().all():
-                        fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MACD'], mode='lines', name='MACD', line=dict(color='blue')), row=current_row_indicator, col=1)
-                        fig.add_trace(go.Scatter(x=df_single['Date'], y=df_single['MACD_Signal'], mode='lines', name='Signal', line=dict(color='red')), row=current_row_indicator, col=1)
-                        # Ensure marker_color logic is robust for empty or single-value histograms
-                        marker_colors = ['green' if val >= 0 else 'red' for val in df_single['MACD_Histogram']] if not df_single['MACD_Histogram'].empty else []
-                        fig.add_trace(go.Bar(x=df_single['Date'], y=df_single['MACD_Histogram'], name='Histogram', marker_color=marker_colors), row=current_row_indicator, col=1)
-                        fig.update_yaxes(title_text="MACD", row=current_row_indicator, col=1)
-                        current_row_indicator += 1
-                        
-                    fig.update_layout(xaxis_rangeslider_visible=False, title_text=f"Cours et Indicateurs Techniques - {company_name}", height=plot_rows_indicators * 250, showlegend=True)
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.warning("Pas de données ou indicateurs techniques non inclus pour ce graphique.")
-            elif chart_type == "Comparaison Multiple":
-                st.subheader(f"📈 Comparaison de l'Évolution Normalisée")
-                if collected_data:
-                    comparison_df = pd.DataFrame()
-                    for ticker_sym, df_comp in collected_data.items():
-                        if not df_comp.empty and 'Close' in df_comp.columns:
-                            # Normalisation pour comparer les évolutions
-                            initial_price = df_comp['Close'].iloc[0]
-                            if initial_price != 0:
-                                # Ensure 'Date' column is used for index alignment
-                                temp_series = (df_comp['Close'] / initial_price - 1) * 100
-                                temp_series.index = df_comp['Date']
-                                comparison_df[ticker_names.get(ticker_sym, ticker_sym)] = temp_series
-                            else:
-                                temp_series = pd.Series(0, index=df_comp['Date'])
-                                comparison_df[ticker_names.get(ticker_sym, ticker_sym)] = temp_series
-
-                    if not comparison_df.empty:
-                        # Ensure 'Date' column is present for plotting
-                        if 'Date' not in comparison_df.columns:
-                            comparison_df = comparison_df.reset_index().rename(columns={'index': 'Date'})
-
-                        fig = px.line(comparison_df, x='Date', y=[col for col in comparison_df.columns if col != 'Date'],
-                                      title="Évolution Normalisée des Prix (%)",
-                                      labels={'value': 'Changement (%)', 'variable': 'Entreprise'},
-                                      line_shape='linear')
-                        fig.update_layout(hovermode="x unified")
-                        st.plotly_chart(fig, use_container_width=True)
-                    else:
-                        st.warning("Pas assez de données pour la comparaison multiple.")
-                else:
-                    st.info("Veuillez collecter les données pour voir la comparaison.")
-        else:
-            if selected_companies: # Only show this if data collection is pending but companies are selected
-                st.info("Cliquez sur '🚀 Lancer l'Analyse' pour afficher les graphiques.")
-            else:
-                st.info("Sélectionnez des entreprises dans la barre latérale pour commencer l'analyse.")
+            # Sélecteurs et graphique: fragment relancé seul quand la valeur ou le type de graphique change
+            data_period = st.session_state.get('collection_request', {}).get('period', selected_period)
+            price_chart_view(collected_data, data_period, ticker_names, tickers_dict, include_indicators,
+                             max_chart_points, webgl_threshold, selected_companies)
 
 
 # --- Onglet 2: Vue d'Ensemble CAC 40 ---
-with tab2:
-    st.header("🌍 Vue d'Ensemble du CAC 40")
-    st.markdown("Aperçu des performances globales et des statistiques clés des entreprises sélectionnées.")
-
-    if 'collected_data' in st.session_state and st.session_state['collected_data']:
-        overview_data = []
-        for ticker_sym, df_val in st.session_state['collected_data'].items():
-            if not df_val.empty:
-                latest_data = df_val.iloc[-1]
-                first_data = df_val.iloc[0]
-
-                company_name = df_val['Company_Name'].iloc[0] if 'Company_Name' in df_val.columns else ticker_names.get(ticker_sym, ticker_sym)
-                sector = df_val['Sector'].iloc[0] if 'Sector' in df_val.columns else 'Non spécifié'
-                market_cap = df_val['Market_Cap'].iloc[0] if 'Market_Cap' in df_val.columns else None
-                currency = df_val['Currency'].iloc[0] if 'Currency' in df_val.columns else 'EUR'
-                
-                # Handling potential division by zero for price change
-                price_change = latest_data['Close'] - first_data['Open'] if not pd.isna(latest_data['Close']) and not pd.isna(first_data['Open']) else np.nan
-                percentage_change = (price_change / first_data['Open']) * 100 if first_data['Open'] != 0 and not pd.isna(first_data['Open']) else np.nan
-                
-                overview_data.append({
-                    'Entreprise': company_name,
-                    'Ticker': ticker_sym,
-                    'Secteur': sector,
-                    'Dernier Prix': latest_data['Close'] if 'Close' in latest_data else np.nan,
-                    'Changement': price_change,
-                    'Changement %': percentage_change, # Garder en numérique pour le styler
-                    'Volume Moyen': df_val['Volume'].mean() if 'Volume' in df_val.columns else np.nan,
-                    'Capitalisation Boursière': market_cap,
-                    'Devise': currency,
-                    'Date Dernière Donnée': latest_data['Date'].strftime('%Y-%m-%d') if 'Date' in latest_data else 'N/A'
-                })
-        
-        if overview_data:
-            df_overview = pd.DataFrame(overview_data)
-            
-            # Special handling for Market_Cap as it depends on Currency
-            df_overview['Capitalisation Boursière Display'] = df_overview.apply(
-                lambda row: format_number(row['Capitalisation Boursière'], suffix=f" {row['Devise']}" if pd.notna(row['Capitalisation Boursière']) else ""), axis=1
-            )
-            
-            st.subheader("Résumé des Performances")
-            # Select columns to display, hiding raw Market_Cap and Devise
-            display_cols = [col for col in df_overview.columns if col not in ['Capitalisation Boursière', 'Devise']]
-            
-            # --- Utilisation de Pandas Styler pour le formatage et le style ---
-            styled_df_to_display = df_overview[display_cols].style \
-                .applymap(
-                    lambda x: f"color: {'green' if x >= 0 else 'red'}; font-weight: 600;",
-                    subset=['Changement %']
-                ) \
-                .format(
-                    {
-                        'Dernier Prix': "{:.2f}",
-                        'Changement': "{:+.2f}",
-                        'Changement %': "{:+.2f}%",
-                        'Volume Moyen': lambda x: format_number(x, suffix=""),
-                        'Capitalisation Boursière Display': "{}"
-                    }, 
-                    na_rep="N/A"
-                )
+if tab2.open:
+    with tab2:
+        st.header("🌍 Vue d'Ensemble du CAC 40")
+        st.markdown("Aperçu des performances globales et des statistiques clés des entreprises sélectionnées.")
 
-            st.dataframe(styled_df_to_display, use_container_width=True, height=500)
-            # --- Fin de l'utilisation de Pandas Styler ---
+        if 'collected_data' in st.session_state and st.session_state['collected_data']:
+            overview_panel = st.session_state['collected_data']
+            with render_timings.time('overview'):
+                # Calculé une fois par version des données, pour toutes les sessions qui partagent le panneau
+                overview_names = tuple(ticker_names.get(t, t) for t in overview_panel)
+                df_overview = overview_panel.derived(
+                    ('overview', overview_names),
+                    lambda: build_overview_table(overview_panel, ticker_names)
+                )
+                # Capitalisation affichée avec sa devise, mise en forme une fois par version des données
+                df_overview_display = overview_panel.derived(
+                    ('overview_display', overview_names),
+                    lambda: df_overview.assign(**{'Capitalisation': format_market_caps(df_overview)})
+                )
+        
+            if not df_overview.empty:
+                st.subheader("Résumé des Performances")
+                # Formats numériques par colonne, côté navigateur; seule la couleur de la variation passe par le Styler
+                with render_timings.time('render.overview'):
+                    st.dataframe(
+                        df_overview_display.style.map(
+                            lambda x: "" if pd.isna(x) else f"color: {'green' if x >= 0 else 'red'}; font-weight: 600;",
+                            subset=['Changement %']
+                        ),
+                        use_container_width=True,
+                        height=500,
+                        hide_index=True,
+                        column_order=[
+                            'Entreprise', 'Ticker', 'Secteur', 'Dernier Prix', 'Changement', 'Changement %',
+                            'Volume Moyen', 'Capitalisation', 'Date Dernière Donnée'
+                        ],
+                        column_config={
+                            'Dernier Prix': st.column_config.NumberColumn(format="%.2f"),
+                            'Changement': st.column_config.NumberColumn(format="%+.2f"),
+                            'Changement %': st.column_config.NumberColumn(format="%+.2f%%"),
+                            'Volume Moyen': st.column_config.NumberColumn(format="compact"),
+                            'Capitalisation': st.column_config.TextColumn("Capitalisation Boursière"),
+                            'Date Dernière Donnée': st.column_config.TextColumn()
+                        }
+                    )
             
-            st.markdown("---")
+                st.markdown("---")
             
-            # --- Visualisations globales ---
-            col_chart1, col_chart2 = st.columns(2)
+                # --- Visualisations globales ---
+                col_chart1, col_chart2 = st.columns(2)
             
-            with col_chart1:
-                st.subheader("Distribution par Secteur")
-                # Filter out 'Non spécifié' if it's the only value or too dominant
-                sector_counts = df_overview['Secteur'].value_counts().reset_index()
-                sector_counts.columns = ['Secteur', 'Nombre d\'entreprises']
+                with col_chart1:
+                    st.subheader("Distribution par Secteur")
+                    # Filter out 'Non spécifié' if it's the only value or too dominant
+                    sector_counts = df_overview['Secteur'].value_counts().reset_index()
+                    sector_counts.columns = ['Secteur', 'Nombre d\'entreprises']
                 
-                if not sector_counts.empty:
-                    fig_sector_pie = px.pie(sector_counts, names='Secteur', values='Nombre d\'entreprises',
-                                            title='Répartition des Entreprises par Secteur',
-                                            hole=0.3)
-                    st.plotly_chart(fig_sector_pie, use_container_width=True)
-                else:
-                    st.info("Pas de données de secteur disponibles pour le graphique.")
-
+                    if not sector_counts.empty:
+                        fig_sector_pie = get_figure_cache().get(
+                            (overview_panel.version, None, 'sector_pie', overview_names),
+                            lambda: build_sector_pie_figure(sector_counts)
+                        )
+                        st.plotly_chart(fig_sector_pie, use_container_width=True)
+                    else:
+                        st.info("Pas de données de secteur disponibles pour le graphique.")
 
-            with col_chart2:
-                st.subheader("Capitalisation Boursière par Entreprise")
-                # Need to convert back Market_Cap to numeric for plotting
-                df_plot_mc = df_overview[df_overview['Capitalisation Boursière'].notna()].copy()
-                if not df_plot_mc.empty:
-                    # Convert to numeric, handle potential string suffixes if format_number was applied earlier
-                    df_plot_mc['Capitalisation Boursière_num'] = df_plot_mc['Capitalisation Boursière'].astype(float) # Assuming it's still numeric before display formatting
 
-                    # Filter out None/NaN values for plotting
-                    df_plot_mc_filtered = df_plot_mc[df_plot_mc['Capitalisation Boursière_num'].notna()]
-                    
+                with col_chart2:
+                    st.subheader("Capitalisation Boursière par Entreprise")
+                    # Capitalisation numérique du tableau de synthèse (la version affichée est du texte)
+                    df_plot_mc_filtered = df_overview[df_overview['Capitalisation Boursière'].notna()]
                     if not df_plot_mc_filtered.empty:
-                        fig_mc_bar = px.bar(df_plot_mc_filtered.sort_values('Capitalisation Boursière_num', ascending=False), 
-                                            x='Entreprise', y='Capitalisation Boursière_num',
-                                            title='Capitalisation Boursière (en Millions/Milliards)',
-                                            labels={'Capitalisation Boursière_num': 'Capitalisation Boursière'},
-                                            color='Secteur')
-                        fig_mc_bar.update_yaxes(tickformat=".2s") # Format y-axis to show M, B for millions, billions
+                        fig_mc_bar = get_figure_cache().get(
+                            (overview_panel.version, None, 'market_cap_bar', overview_names),
+                            lambda: build_market_cap_figure(df_plot_mc_filtered)
+                        )
                         st.plotly_chart(fig_mc_bar, use_container_width=True)
                     else:
                         st.info("Pas de données de capitalisation boursière disponibles pour le graphique.")
-                else:
-                    st.info("Pas de données de capitalisation boursière disponibles pour le graphique.")
                 
+            else:
+                st.info("Aucune donnée disponible pour la vue d'ensemble. Veuillez collecter les données d'abord.")
         else:
-            st.info("Aucune donnée disponible pour la vue d'ensemble. Veuillez collecter les données d'abord.")
-    else:
-        st.info("Aucune donnée collectée pour le CAC 40. Lancez l'analyse dans l'onglet 'Analyse Temps Réel'.")
+            st.info("Aucune donnée collectée pour le CAC 40. Lancez l'analyse dans l'onglet 'Analyse Temps Réel'.")
 
 
 # --- Onglet 3: Analyse Technique Détaillée ---
-with tab3:
-    st.header("🔬 Analyse Technique Détaillée")
-    st.markdown("Explorez les indicateurs techniques pour une valeur sélectionnée.")
+if tab3.open:
+    with tab3:
+        st.header("🔬 Analyse Technique Détaillée")
+        st.markdown("Explorez les indicateurs techniques pour une valeur sélectionnée.")
     
-    if 'collected_data' in st.session_state and st.session_state['collected_data']:
-        # Reuse selection from tab1 or create a new one for clarity
-        ticker_names = {v: k for k, v in tickers_dict.items()}
-        available_tickers = list(st.session_state['collected_data'].keys())
-        display_names = [ticker_names.get(t, t) for t in available_tickers]
-
-        selected_display_tech = st.selectbox(
-            "Sélectionner une valeur pour l'analyse technique:",
-            display_names,
-            key="tech_select_tab3" # Use a unique key
-        )
-        
-        selected_ticker_tech = tickers_dict.get(selected_display_tech, selected_display_tech)
-        
-        if selected_ticker_tech and selected_ticker_tech in st.session_state['collected_data']:
-            df_tech = st.session_state['collected_data'][selected_ticker_tech]
-            company_name_tech = df_tech['Company_Name'].iloc[0] if 'Company_Name' in df_tech.columns and not df_tech.empty else selected_display_tech
-
-            st.subheader(f"Indicateurs pour {company_name_tech}")
-
-            if include_indicators: # Check if indicators were collected
-                
-                # Dynamically determine rows for subplots based on available indicators
-                plot_rows_tech = 1 # Start with Close price
-                row_titles_tech = ["Prix de Clôture & Moyennes Mobiles"]
-
-                if 'RSI' in df_tech.columns and not df_tech['RSI'].isnull().all():
-                    plot_rows_tech += 1
-                    row_titles_tech.append("RSI (Relative Strength Index)")
-                if 'MACD' in df_tech.columns and not df_tech['MACD'].isnull().all() and not df_tech['MACD_Signal'].isnull().all():
-                    plot_rows_tech += 1
-                    row_titles_tech.append("MACD (Moving Average Convergence Divergence)")
-                
-                if plot_rows_tech == 1: # Only price data, no indicators to plot
-                    st.warning("Aucun indicateur technique disponible ou calculé pour cette période/donnée. Activez l'option 'Inclure les indicateurs techniques' dans la barre latérale.")
-                else:
-                    fig_tech = make_subplots(rows=plot_rows_tech, cols=1, shared_xaxes=True,
-                                            vertical_spacing=0.1,
-                                            row_titles=row_titles_tech)
-                    
-                    current_row_tech = 1
-                    # --- Plot 1: Close Price & Moyennes Mobiles ---
-                    fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['Close'], mode='lines', name='Prix Clôture', line=dict(color='blue')), row=current_row_tech, col=1)
-                    if 'MA_10' in df_tech.columns and not df_tech['MA_10'].isnull().all(): fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['MA_10'], mode='lines', name='MA 10', line=dict(color='orange')), row=current_row_tech, col=1)
-                    if 'MA_20' in df_tech.columns and not df_tech['MA_20'].isnull().all(): fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['MA_20'], mode='lines', name='MA 20', line=dict(color='purple')), row=current_row_tech, col=1)
-                    if 'MA_50' in df_tech.columns and not df_tech['MA_50'].isnull().all(): fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['MA_50'], mode='lines', name='MA 50', line=dict(color='red')), row=current_row_tech, col=1)
-                    if 'BB_Upper' in df_tech.columns and 'BB_Lower' in df_tech.columns and not df_tech['BB_Upper'].isnull().all():
-                        fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['BB_Upper'], mode='lines', name='BB Upper', line=dict(color='blue', dash='dot')), row=current_row_tech, col=1)
-                        fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['BB_Lower'], mode='lines', name='BB Lower', line=dict(color='blue', dash='dot')), row=current_row_tech, col=1)
-                    fig_tech.update_yaxes(title_text="Prix", row=current_row_tech, col=1)
-                    current_row_tech += 1
-
-                    # --- Plot 2: RSI ---
-                    if 'RSI' in df_tech.columns and not df_tech['RSI'].isnull().all():
-                        fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['RSI'], mode='lines', name='RSI', line=dict(color='green')), row=current_row_tech, col=1)
-                        fig_tech.add_hline(y=70, line_dash="dash", line_color="red", row=current_row_tech, col=1, annotation_text="Surachat", annotation_position="top right")
-                        fig_tech.add_hline(y=30, line_dash="dash", line_color="green", row=current_row_tech, col=1, annotation_text="Survente", annotation_position="bottom right")
-                        fig_tech.update_yaxes(title_text="RSI", row=current_row_tech, col=1)
-                        current_row_tech += 1
-
-                    # --- Plot 3: MACD ---
-                    if 'MACD' in df_tech.columns and 'MACD_Signal' in df_tech.columns and 'MACD_Histogram' in df_tech.columns and not df_tech['MACD'].isnull().all():
-                        fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['MACD'], mode='lines', name='MACD', line=dict(color='blue')), row=current_row_tech, col=1)
-                        fig_tech.add_trace(go.Scatter(x=df_tech['Date'], y=df_tech['MACD_Signal'], mode='lines', name='Signal', line=dict(color='red')), row=current_row_tech, col=1)
-                        marker_colors_hist = ['green' if val >= 0 else 'red' for val in df_tech['MACD_Histogram']] if not df_tech['MACD_Histogram'].empty else []
-                        fig_tech.add_trace(go.Bar(x=df_tech['Date'], y=df_tech['MACD_Histogram'], name='Histogram', marker_color=marker_colors_hist), row=current_row_tech, col=1)
-                        fig_tech.update_yaxes(title_text="MACD", row=current_row_tech, col=1)
-                        current_row_tech += 1
-
-                    fig_tech.update_layout(xaxis_rangeslider_visible=False, title_text=f"Analyse Technique pour {company_name_tech}", height=plot_rows_tech * 250, showlegend=True)
-                    st.plotly_chart(fig_tech, use_container_width=True)
-            else:
-                st.info("Veuillez activer l'option 'Inclure les indicateurs techniques' dans la barre latérale pour voir cette analyse.")
+        if 'collected_data' in st.session_state and st.session_state['collected_data']:
+            # Sélecteur et graphique relancés seuls quand la valeur change
+            data_period = st.session_state.get('collection_request', {}).get('period', selected_period)
+            technical_chart_view(st.session_state['collected_data'], data_period, ticker_names, tickers_dict,
+                                 include_indicators, max_chart_points, webgl_threshold)
         else:
-            st.info("Sélectionnez une entreprise et assurez-vous d'avoir collecté les données pour voir l'analyse technique.")
-    else:
-        st.info("Veuillez collecter les données des entreprises dans l'onglet 'Analyse Temps Réel' pour activer cette section.")
+            st.info("Veuillez collecter les données des entreprises dans l'onglet 'Analyse Temps Réel' pour activer cette section.")
 
-# --- Auto-refresh logic ---
-if auto_refresh:
-    time.sleep(300) # Attendre 5 minutes (300 secondes)
-    st.experimental_rerun()
+# --- Onglet 4: Diagnostics de performance ---
+if tab4.open:
+    with tab4:
+        st.header("⏱️ Diagnostics de Performance")
+        st.markdown("Durée de chaque étape de la collecte et de l'affichage, pour repérer les tickers et les graphiques les plus lents.")
+    
+        last_timings = st.session_state.get('collection_timings')
+        if last_timings is not None:
+            st.subheader("Dernière collecte")
+            st.dataframe(last_timings.summary(), use_container_width=True, hide_index=True)
+            per_ticker = last_timings.by_ticker()
+            if not per_ticker.empty:
+                st.markdown("**Durées par ticker (s)**, du plus lent au plus rapide")
+                st.dataframe(per_ticker, use_container_width=True)
+        else:
+            st.info("Aucune collecte mesurée dans cette session. Lancez l'analyse pour obtenir le détail des étapes.")
+    
+        # Seul l'onglet affiché est calculé: les durées utiles sont celles de l'exécution précédente (onglet quitté)
+        st.subheader("Affichage précédent de la page")
+        previous_render_timings = st.session_state.get('render_timings')
+        render_summary = previous_render_timings.summary() if previous_render_timings is not None else None
+        if render_summary is not None and not render_summary.empty:
+            st.dataframe(render_summary, use_container_width=True, hide_index=True)
+        else:
+            st.info("Aucun calcul d'affichage mesuré lors de l'exécution précédente.")
+        # Les graphiques des onglets 1 et 3 sont des fragments, mesurés à part
+        chart_timings = st.session_state.get('chart_timings')
+        if chart_timings is not None:
+            st.markdown("**Dernier graphique affiché**")
+            st.dataframe(chart_timings.summary(), use_container_width=True, hide_index=True)
+    
+        st.subheader("Cumul depuis le démarrage du serveur")
+        registry_snapshot = REGISTRY.snapshot()
+        if not registry_snapshot.empty:
+            st.dataframe(registry_snapshot, use_container_width=True, hide_index=True)
+        st.download_button(
+            "📥 Exporter les métriques (format Prometheus)",
+            REGISTRY.to_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain"
+        )
+        if REGISTRY.path:
+            st.caption(f"Fichier Prometheus mis à jour au plus toutes les {REGISTRY.write_interval:g} s: `{REGISTRY.path}`")
+        figure_stats = get_figure_cache().stats()
+        st.caption(f"Cache des graphiques: {figure_stats['entries']} figures conservées • "
+                   f"{figure_stats['hits']} réutilisations • {figure_stats['misses']} constructions")
+
+# --- Actualisation automatique (en arrière-plan, sans bloquer le script) ---
+# Fréquence à laquelle la session vient relever les résultats du planificateur
+REFRESH_POLL_SECONDS = 10
+
+def refresh_collection(previous_value, shared_data, tickers, period, max_workers, batch_download, bar_store, metadata_cache, incremental, async_fetcher=None, provider=DEFAULT_PROVIDER):
+    """Tâche d'actualisation exécutée par le planificateur (hors thread de script)"""
+    start_time = time.time()
+    collection_timings = StageTimings()
+    collected_data, collection_errors = collect_data_shared(
+        shared_data, tickers, period, max_workers, batch_download, bar_store, metadata_cache, incremental, async_fetcher, provider,
+        collection_timings
+    )
+    collection_time = time.time() - start_time
+    collection_timings.record('collection', collection_time)
+    REGISTRY.observe(collection_timings, errors=len(collection_errors),
+                     tickers=len(tickers), period=period, source=provider.name, refresh=True)
+    if not collected_data:
+        raise RuntimeError("Aucune donnée collectée")
+    return collected_data, collection_errors, collection_time, datetime.now(), collection_timings
+
+@st.fragment(run_every=REFRESH_POLL_SECONDS)
+def auto_refresh_monitor(job_key):
+    """Relève les résultats de l'actualisation en arrière-plan; ne relance l'application que s'il y a du nouveau"""
+    status = get_refresh_scheduler().poll(job_key, st.session_state.get('refresh_version', 0))
+    if status is None:
+        return
+    version, value, error, finished_at, next_run = status
+    
+    if value is not None:
+        collected_data, collection_errors, collection_time, collection_timestamp, collection_timings = value
+        st.session_state['collected_data'] = collected_data
+        st.session_state['collection_errors'] = collection_errors
+        st.session_state['collection_time'] = collection_time
+        st.session_state['collection_timestamp'] = collection_timestamp
+        st.session_state['collection_timings'] = collection_timings
+        st.session_state['refresh_version'] = version
+        st.rerun()
+    
+    if error:
+        st.warning(f"⚠️ Dernière actualisation en échec: {error}")
+    st.caption(f"🔄 Prochaine actualisation à {datetime.fromtimestamp(next_run).strftime('%H:%M:%S')}")
+
+# --- Collecte progressive (en arrière-plan, résultats affichés au fil de l'eau) ---
+# Fréquence à laquelle la session relève les tickers arrivés
+STREAMING_POLL_SECONDS = 0.5
+
+def finish_streaming_collection(job):
+    """Enregistre le résultat final d'une collecte progressive comme une collecte classique"""
+    collected_data = job.panel()
+    collection_time = job.finished_at - job.started_at
+    job.timings.record('collection', collection_time)
+    REGISTRY.observe(job.timings, errors=len(job.errors), tickers=len(job.tickers),
+                     period=job.period, source=job.provider.name, streaming=True)
+    st.session_state['collected_data'] = collected_data
+    st.session_state['collection_errors'] = job.errors
+    st.session_state['collection_time'] = collection_time
+    st.session_state['collection_timestamp'] = datetime.fromtimestamp(job.finished_at)
+    st.session_state['collection_timings'] = job.timings
+    st.session_state['streaming_report'] = {
+        'loaded': len(collected_data),
+        'total': len(job.tickers),
+        'rows': int(collected_data.row_counts().sum()) if collected_data else 0,
+        'collection_time': collection_time,
+        'errors': list(job.errors)
+    }
+    st.session_state.pop('streaming_collection', None)
+
+@st.fragment(run_every=STREAMING_POLL_SECONDS)
+def streaming_collection_monitor():
+    """Avancement de la collecte progressive; relance l'application dès que de nouveaux tickers sont chargés"""
+    job = st.session_state.get('streaming_collection')
+    if job is None:
+        return
+    processed, loaded, total = job.progress()
+    st.progress(processed / total if total else 1.0, text=f"📡 Collecte progressive: {loaded}/{total} valeurs chargées")
+    if job.done:
+        finish_streaming_collection(job)
+        st.toast(f"✅ Collecte terminée: {loaded}/{total} valeurs en {job.finished_at - job.started_at:.1f}s"
+                 + (f" • {len(job.errors)} erreur(s)" if job.errors else ""))
+        st.rerun()
+    displayed = st.session_state.get('collected_data')
+    if loaded != (len(displayed) if displayed is not None else 0):
+        st.session_state['collected_data'] = job.panel()
+        st.session_state['collection_time'] = time.time() - job.started_at
+        st.session_state['collection_timestamp'] = datetime.now()
+        st.rerun()
+
+if 'streaming_collection' in st.session_state:
+    with st.sidebar:
+        streaming_collection_monitor()
+
+if 'refresh_job_key' not in st.session_state:
+    st.session_state['refresh_job_key'] = str(uuid.uuid4())
+refresh_job_key = st.session_state['refresh_job_key']
+collection_request = st.session_state.get('collection_request')
+
+if auto_refresh and collection_request and isinstance(st.session_state.get('collected_data'), MarketPanel) \
+        and 'streaming_collection' not in st.session_state:
+    # L'actualisation interroge la source de la collecte, même si une autre source est choisie depuis
+    collection_spec = collection_request['provider_spec']
+    refresh_bar_store, refresh_async_fetcher = get_collection_backends(collection_spec, use_bar_store, async_download)
+    refresh_task = partial(
+        refresh_collection,
+        shared_data=get_shared_market_data(collection_spec),
+        tickers=collection_request['tickers'],
+        period=collection_request['period'],
+        max_workers=max_workers,
+        batch_download=batch_download,
+        bar_store=refresh_bar_store,
+        metadata_cache=get_metadata_cache(collection_spec),
+        incremental=incremental_indicators,
+        async_fetcher=refresh_async_fetcher,
+        provider=get_market_data_provider(collection_spec)
+    )
+    # Une nouvelle tâche n'est créée que si la sélection ou les options ont changé
+    refresh_signature = (collection_request['id'], max_workers, batch_download, use_bar_store, incremental_indicators, async_download)
+    current_collection = (
+        st.session_state['collected_data'],
+        st.session_state.get('collection_errors', []),
+        st.session_state.get('collection_time', 0),
+        st.session_state.get('collection_timestamp', datetime.now()),
+        st.session_state.get('collection_timings')
+    )
+    if get_refresh_scheduler().schedule(refresh_job_key, refresh_task, refresh_interval_min * 60,
+                                        refresh_signature, initial=current_collection):
+        st.session_state['refresh_version'] = 0
+    with st.sidebar:
+        auto_refresh_monitor(refresh_job_key)
+else:
+    get_refresh_scheduler().cancel(refresh_job_key)
+
+# Les durées d'affichage rejoignent les métriques du processus (journal JSON et fichier Prometheus)
+if render_timings.records:
+    REGISTRY.observe(render_timings)
+st.session_state['render_timings'] = render_timings
@@ -0,0 +1,205 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import quote, urlsplit
+import numpy as np
+import pandas as pd
+
+# API « chart » de Yahoo Finance (celle qu'utilise yfinance pour history/download)
+CHART_URL = "https://query2.finance.yahoo.com/v8/finance/chart/{symbol}"
+
+# Codes HTTP considérés comme transitoires (nouvelle tentative)
+TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+# Attente maximale (s) accordée à un en-tête Retry-After: une seule réponse 429 ne doit pas figer la collecte
+MAX_RETRY_AFTER = 30.0
+
+class FetchError(Exception):
+    """Erreur définitive de téléchargement (symbole inconnu, réponse invalide...)"""
+
+class RateLimiter:
+    """Seau à jetons asynchrone limitant le débit de requêtes vers un hôte"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def parse_chart(payload, interval, auto_adjust=True):
+    """Convertit une réponse de l'API chart en DataFrame OHLCV au format de yfinance"""
+    chart = payload.get('chart') or {}
+    if chart.get('error'):
+        raise FetchError(chart['error'].get('description') or chart['error'].get('code'))
+    results = chart.get('result') or []
+    if not results or not results[0].get('timestamp'):
+        return pd.DataFrame()
+    result = results[0]
+
+    intraday = interval.endswith(('m', 'h'))
+    timezone = result.get('meta', {}).get('exchangeTimezoneName', 'UTC')
+    index = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(timezone)
+    if not intraday:
+        index = index.normalize()
+
+    quote_values = result['indicators']['quote'][0]
+    data = pd.DataFrame({
+        'Open': quote_values.get('open'),
+        'High': quote_values.get('high'),
+        'Low': quote_values.get('low'),
+        'Close': quote_values.get('close'),
+        'Volume': quote_values.get('volume')
+    }, index=index, dtype=np.float64)
+
+    # Ajustement des cours (dividendes, divisions) comme auto_adjust=True dans yfinance
+    adjclose = (result['indicators'].get('adjclose') or [{}])[0].get('adjclose')
+    if auto_adjust and adjclose is not None:
+        ratio = np.asarray(adjclose, dtype=np.float64) / data['Close'].to_numpy()
+        for column in ('Open', 'High', 'Low'):
+            data[column] = data[column] * ratio
+        data['Close'] = np.asarray(adjclose, dtype=np.float64)
+
+    data = data.dropna(how='all', subset=['Open', 'High', 'Low', 'Close'])
+    data = data[~data.index.duplicated(keep='last')]
+
+    # Événements rattachés à la barre qui les contient
+    data['Dividends'] = 0.0
+    data['Stock Splits'] = 0.0
+    events = result.get('events') or {}
+    for column, entries, value in (
+        ('Dividends', events.get('dividends', {}), lambda e: e.get('amount', 0.0)),
+        ('Stock Splits', events.get('splits', {}), lambda e: e['numerator'] / e['denominator'] if e.get('denominator') else 0.0)
+    ):
+        for event in entries.values():
+            day = pd.Timestamp(event['date'], unit='s', tz='UTC').tz_convert(timezone).normalize()
+            position = data.index.searchsorted(day, side='left') if intraday else data.index.searchsorted(day, side='right') - 1
+            if 0 <= position < len(data):
+                data.iloc[position, data.columns.get_loc(column)] += value(event)
+
+    data.index.name = 'Datetime' if intraday else 'Date'
+    return data
+
+class AsyncFetcher:
+    """Pipeline de collecte asynchrone.
+
+    Une boucle asyncio dédiée (thread d'arrière-plan) partage une session HTTP
+    keep-alive entre toutes les collectes. Les requêtes sont limitées en nombre
+    simultané et en débit par hôte; les erreurs transitoires sont retentées avec
+    un délai exponentiel et une gigue aléatoire.
+    """
+
+    def __init__(self, max_in_flight=16, rate_per_host=8.0, burst=16,
+                 max_retries=4, backoff_base=0.5, backoff_cap=8.0, timeout=15):
+        self.max_in_flight = max_in_flight
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self._session = None
+        self._semaphore = None
+        self._limiters = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-fetch", daemon=True)
+        self._thread.start()
+
+    def _backoff(self, attempt):
+        # Gigue « complète »: délai aléatoire entre 0 et le plafond exponentiel
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _get_json(self, url, params):
+        # Import différé: curl_cffi n'est chargé qu'au premier téléchargement asynchrone
+        from curl_cffi.requests import AsyncSession
+        from curl_cffi.requests.exceptions import RequestException
+        if self._session is None:
+            self._session = AsyncSession(impersonate="chrome", max_clients=self.max_in_flight)
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        host = urlsplit(url).netloc
+        if host not in self._limiters:
+            self._limiters[host] = RateLimiter(self.rate_per_host, self.burst)
+        limiter = self._limiters[host]
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(last_error[1] if last_error[1] is not None else self._backoff(attempt - 1))
+            await limiter.acquire()
+            try:
+                async with self._semaphore:
+                    response = await self._session.get(url, params=params, timeout=self.timeout)
+            except RequestException as e:
+                last_error = (str(e), None)
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code in TRANSIENT_STATUS:
+                retry_after = response.headers.get('Retry-After')
+                delay = min(float(retry_after), MAX_RETRY_AFTER) if retry_after and retry_after.isdigit() else None
+                last_error = (f"HTTP {response.status_code}", delay)
+                continue
+            # Erreur définitive: message de l'API si disponible (ex: symbole inconnu)
+            try:
+                description = ((response.json().get('chart') or {}).get('error') or {}).get('description')
+            except Exception:
+                description = None
+            raise FetchError(description or f"HTTP {response.status_code}")
+
+        raise FetchError(f"Échec après {self.max_retries + 1} tentatives: {last_error[0]}")
+
+    async def _fetch_one(self, symbol, period, interval, start, timings=None):
+        fetch_start = time.perf_counter()
+        params = {'interval': interval, 'includePrePost': 'true', 'events': 'div,splits'}
+        if start is not None:
+            params['period1'] = int(pd.Timestamp(start).timestamp())
+            params['period2'] = int(time.time())
+        else:
+            params['range'] = period
+        try:
+            payload = await self._get_json(CHART_URL.format(symbol=quote(symbol)), params)
+            return parse_chart(payload, interval)
+        finally:
+            if timings is not None:
+                timings.record('history', time.perf_counter() - fetch_start, symbol)
+
+    async def _fetch_many(self, symbols, period, interval, start, timings=None):
+        results = await asyncio.gather(
+            *(self._fetch_one(symbol, period, interval, start, timings) for symbol in symbols),
+            return_exceptions=True
+        )
+        histories, errors = {}, {}
+        for symbol, result in zip(symbols, results):
+            # BaseException: une requête annulée (CancelledError) est une erreur, pas un résultat
+            if isinstance(result, BaseException):
+                errors[symbol] = str(result) or type(result).__name__
+            elif result.empty:
+                errors[symbol] = "Aucune donnée disponible"
+            else:
+                histories[symbol] = result
+        return histories, errors
+
+    def fetch_histories(self, symbols, period, interval, start=None, timings=None):
+        """Télécharge les historiques de plusieurs symboles; retourne (historiques, erreurs).
+
+        Appel bloquant utilisable depuis n'importe quel thread: les requêtes sont
+        exécutées sur la boucle asyncio du pipeline. Avec timings (StageTimings),
+        la durée de chaque symbole (tentatives comprises) est enregistrée.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._fetch_many(list(symbols), period, interval, start, timings), self._loop
+        )
+        return future.result()
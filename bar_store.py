@@ -0,0 +1,127 @@
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+# Répertoire par défaut du stock local (surchargeable par variable d'environnement)
+DEFAULT_STORE_DIR = os.environ.get(
+    "CAC40_BAR_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bars")
+)
+
+# Périodes classées par profondeur d'historique croissante
+PERIOD_ORDER = ["1d", "5d", "1mo", "3mo", "ytd", "6mo", "1y", "2y", "5y", "10y", "max"]
+
+def period_covers(stored_period, requested_period):
+    """Indique si un historique complet téléchargé pour stored_period couvre requested_period"""
+    if stored_period not in PERIOD_ORDER or requested_period not in PERIOD_ORDER:
+        return False
+    return PERIOD_ORDER.index(stored_period) >= PERIOD_ORDER.index(requested_period)
+
+def select_period(bars, period):
+    """Restreint un historique stocké à la fenêtre couverte par la période demandée"""
+    if bars.empty or period == "max" or period not in PERIOD_ORDER:
+        return bars
+
+    last = bars.index[-1]
+    if period.endswith("d"):
+        # Périodes en jours de bourse, comme côté Yahoo Finance
+        trading_days = bars.index.normalize().unique()
+        start = trading_days[max(len(trading_days) - int(period[:-1]), 0)]
+    elif period == "ytd":
+        start = last.normalize().replace(month=1, day=1)
+    elif period.endswith("mo"):
+        start = last - pd.DateOffset(months=int(period[:-2]))
+    else:
+        start = last - pd.DateOffset(years=int(period[:-1]))
+
+    return bars[bars.index >= start]
+
+class BarStore:
+    """Stock local de barres OHLCV au format Parquet, un fichier par ticker et intervalle"""
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, ticker_symbol, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((ticker_symbol, interval), threading.Lock())
+
+    def path(self, ticker_symbol, interval):
+        """Chemin du fichier Parquet d'un ticker pour un intervalle donné"""
+        safe_symbol = ticker_symbol.replace("/", "_").replace("^", "_")
+        return os.path.join(self.root, interval, f"{safe_symbol}.parquet")
+
+    def load(self, ticker_symbol, interval):
+        """Charge les barres stockées (None si absentes ou illisibles)"""
+        path = self.path(ticker_symbol, interval)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            return None
+
+    def save(self, ticker_symbol, interval, bars, period):
+        """Écrit les barres de façon atomique en mémorisant la période couverte"""
+        path = self.path(ticker_symbol, interval)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            bars = bars.copy()
+            bars.attrs = {"period": period}
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            bars.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            # Le stock n'est qu'un cache: un échec d'écriture ne doit pas bloquer la collecte
+            pass
+
+    def get_delta_start(self, ticker_symbol, interval, period):
+        """Horodatage à partir duquel télécharger le complément, None si un historique complet est nécessaire"""
+        stored = self.load(ticker_symbol, interval)
+        if stored is None or len(stored) < 2 or not period_covers(stored.attrs.get("period"), period):
+            return None
+        # On repart de l'avant-dernière barre: la dernière peut être une barre en cours de formation
+        return stored.index[-2]
+
+    def merge_delta(self, ticker_symbol, interval, delta):
+        """Fusionne les nouvelles barres dans le stock et retourne l'historique complet.
+
+        Le complément doit contenir la barre de recouvrement (avant-dernière barre stockée)
+        avec le même cours. Retourne None sinon, et un rechargement complet est alors requis:
+        complément vide (stock plus ancien que l'historique intraday disponible), barre de
+        recouvrement absente (trou dans l'historique) ou modifiée (dividende ou division
+        ayant modifié les cours ajustés).
+        """
+        with self._lock(ticker_symbol, interval):
+            stored = self.load(ticker_symbol, interval)
+            if stored is None or len(stored) < 2 or delta is None or delta.empty:
+                return None
+
+            # Le complément peut provenir d'une autre source (fuseau de la place ou Europe/Paris)
+            if getattr(delta.index, "tz", None) is not None and getattr(stored.index, "tz", None) is not None:
+                delta = delta.tz_convert(stored.index.tz)
+
+            overlap_ts = stored.index[-2]
+            if overlap_ts not in delta.index:
+                return None
+            stored_close = stored.loc[overlap_ts, "Close"]
+            fetched_close = delta.loc[overlap_ts, "Close"]
+            if not np.isclose(stored_close, fetched_close, rtol=1e-4, equal_nan=True):
+                return None
+
+            delta = delta.reindex(columns=stored.columns)
+            merged = pd.concat([stored, delta])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            self.save(ticker_symbol, interval, merged, stored.attrs.get("period"))
+            return merged
+
+    def store_full(self, ticker_symbol, interval, bars, period):
+        """Remplace le stock par un historique complet téléchargé pour la période donnée"""
+        if bars is None or bars.empty:
+            return bars
+        with self._lock(ticker_symbol, interval):
+            self.save(ticker_symbol, interval, bars, period)
+        return bars
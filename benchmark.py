@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import plotly
+from analytics import build_overview_table, calculate_data_quality
+from charts import build_candlestick_figure, build_comparison_figure, build_indicators_figure
+from collection import add_technical_indicators, collect_data_parallel, get_interval_for_period, prepare_ticker_data
+from indicators import add_indicators_to_frames
+from market_data import SyntheticProvider
+
+# Nombre de tickers et périodes couverts par défaut
+DEFAULT_SCALES = [1, 5, 10, 20, 40]
+DEFAULT_PERIODS = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "max"]
+
+# Répertoire des résultats (un fichier JSON horodaté par exécution)
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "benchmarks")
+
+# Écart de médiane au-delà duquel --compare signale une régression
+DEFAULT_THRESHOLD = 0.10
+
+def measure(func, repeats=5, warmup=1):
+    """Chronomètre func: statistiques en secondes sur `repeats` exécutions après `warmup` tours à vide"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        'repeats': repeats,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+        'stdev_s': statistics.stdev(timings) if len(timings) > 1 else 0.0
+    }
+
+def raw_frames(provider, tickers, period):
+    """Historiques bruts (avant indicateurs), tels que les reçoit la collecte"""
+    interval = get_interval_for_period(period)
+    return {t: prepare_ticker_data(provider.history(t, period, interval)) for t in tickers}
+
+# Mesures de benchmark_period, pour écarter d'emblée une période sans mesure retenue par --filter
+PERIOD_BENCHMARKS = [
+    'add_technical_indicators', 'indicators[vectorized]', 'indicators[processes]',
+    'collect_data_parallel[batch]', 'collect_data_parallel[threads]',
+    'calculate_data_quality', 'overview_table', 'figure.comparison', 'figure.comparison.to_json',
+    'figure.candlestick', 'figure.candlestick.to_json', 'figure.indicators', 'figure.indicators.to_json'
+]
+
+def wanted(name, name_filter=None):
+    """Vrai si la mesure est retenue par le filtre (sous-chaîne du nom)"""
+    return not name_filter or name_filter in name
+
+def benchmark_period(period, scales, repeats, latency, max_workers, seed, compute_processes=-1, name_filter=None):
+    """Mesures d'une période pour chaque nombre de tickers (seules celles retenues par name_filter sont exécutées)"""
+    if not any(wanted(name, name_filter) for name in PERIOD_BENCHMARKS):
+        return
+    interval = get_interval_for_period(period)
+    # Données sans latence pour les étapes de calcul, avec latence pour la collecte
+    provider = SyntheticProvider(n_tickers=max(scales), seed=seed)
+    slow_provider = SyntheticProvider(n_tickers=max(scales), seed=seed, latency=latency)
+    universe = list(provider.list_tickers().values())
+
+    for n_tickers in scales:
+        tickers = universe[:n_tickers]
+        panel, _ = collect_data_parallel(tickers, period, max_workers, provider=provider)
+        bars = int(panel.row_counts().max())
+        context = {'tickers': n_tickers, 'period': period, 'interval': interval, 'bars': bars}
+
+        frames = raw_frames(provider, tickers, period)
+        # Copie à chaque tour: add_technical_indicators modifie le DataFrame reçu
+        if wanted('add_technical_indicators', name_filter):
+            yield 'add_technical_indicators', context, measure(
+                lambda: [add_technical_indicators(df.copy()) for df in frames.values()], repeats)
+        # Calcul vectorisé dans le processus courant, puis réparti entre processus (au-delà de process_pool.MIN_CELLS)
+        if wanted('indicators[vectorized]', name_filter):
+            yield 'indicators[vectorized]', context, measure(lambda: add_indicators_to_frames(frames, 0), repeats)
+        if wanted('indicators[processes]', name_filter):
+            yield 'indicators[processes]', context, measure(
+                lambda: add_indicators_to_frames(frames, compute_processes), repeats)
+
+        for batch_download, variant in ((True, 'batch'), (False, 'threads')):
+            if wanted(f'collect_data_parallel[{variant}]', name_filter):
+                yield f'collect_data_parallel[{variant}]', context, measure(
+                    lambda: collect_data_parallel(tickers, period, max_workers, batch_download, provider=slow_provider),
+                    repeats)
+
+        if wanted('calculate_data_quality', name_filter):
+            yield 'calculate_data_quality', context, measure(
+                lambda: [calculate_data_quality(df) for df in panel.values()], repeats)
+        if wanted('overview_table', name_filter):
+            yield 'overview_table', context, measure(lambda: build_overview_table(panel), repeats)
+
+        comparison = lambda: build_comparison_figure(panel)
+        if wanted('figure.comparison', name_filter):
+            yield 'figure.comparison', context, measure(comparison, repeats)
+        if wanted('figure.comparison.to_json', name_filter):
+            yield 'figure.comparison.to_json', context, measure(comparison().to_json, repeats)
+
+        # Les graphiques d'un ticker ne dépendent pas du nombre de tickers collectés
+        if n_tickers == scales[0]:
+            df_single = panel[tickers[0]]
+            for chart, build in (
+                ('candlestick', lambda: build_candlestick_figure(df_single, tickers[0])),
+                ('indicators', lambda: build_indicators_figure(df_single, tickers[0]))
+            ):
+                if wanted(f'figure.{chart}', name_filter):
+                    yield f'figure.{chart}', context, measure(build, repeats)
+                if wanted(f'figure.{chart}.to_json', name_filter):
+                    yield f'figure.{chart}.to_json', context, measure(build().to_json, repeats)
+
+# Modules importés par l'application au démarrage (hors streamlit)
+STARTUP_MODULES = ["analytics", "async_fetch", "bar_store", "charts", "collection", "company_metadata",
+                   "constituent_registry", "constituents", "market_data", "market_panel", "metrics"]
+
+def benchmark_startup(repeats, name_filter=None):
+    """Imports à froid de l'application: un nouvel interpréteur par mesure, comme au démarrage d'un conteneur"""
+    command = [sys.executable, "-c", f"import {', '.join(STARTUP_MODULES)}"]
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    context = {'tickers': 0, 'period': '-', 'interval': None, 'bars': 0}
+    if wanted('startup.imports', name_filter):
+        yield 'startup.imports', context, measure(lambda: subprocess.run(command, cwd=cwd, check=True), repeats)
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def run(scales, periods, repeats, latency, max_workers, seed, name_filter=None, compute_processes=-1):
+    """Exécute la suite et retourne le rapport (métadonnées et résultats)"""
+    results = []
+    benchmarks = [benchmark_startup(repeats, name_filter)] + [
+        benchmark_period(period, scales, repeats, latency, max_workers, seed, compute_processes, name_filter)
+        for period in periods
+    ]
+    for benchmark in benchmarks:
+        for name, context, timing in benchmark:
+            result = {'benchmark': name, **context, **timing}
+            results.append(result)
+            print(f"{name:<36} {context['tickers']:>4} tickers  {context['period']:>4} ({context['bars']:>5} barres)  "
+                  f"médiane {timing['median_s'] * 1000:9.2f} ms", flush=True)
+    return {
+        'metadata': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plotly': plotly.__version__,
+            'config': {
+                'scales': scales, 'periods': periods, 'repeats': repeats,
+                'latency_s': latency, 'max_workers': max_workers, 'seed': seed,
+                'compute_processes': compute_processes
+            }
+        },
+        'results': results
+    }
+
+def result_key(result):
+    return result['benchmark'], result['tickers'], result['period']
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare les médianes à un rapport de référence; retourne les régressions au-delà du seuil"""
+    reference = {result_key(r): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        previous = reference.get(result_key(result))
+        if previous is None or previous['median_s'] <= 0:
+            continue
+        ratio = result['median_s'] / previous['median_s']
+        marker = "  <-- régression" if ratio > 1 + threshold else ""
+        print(f"{result['benchmark']:<36} {result['tickers']:>4} tickers  {result['period']:>4}  "
+              f"{previous['median_s'] * 1000:9.2f} -> {result['median_s'] * 1000:9.2f} ms  x{ratio:.2f}{marker}")
+        if marker:
+            regressions.append((result_key(result), ratio))
+    return regressions
+
+def parse_list(value, cast=str):
+    return [cast(v) for v in value.split(',') if v]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Mesure hors ligne des étapes coûteuses de CAC40 Tracker Pro (données synthétiques)"
+    )
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="nombres de tickers, séparés par des virgules")
+    parser.add_argument("--periods", default=",".join(DEFAULT_PERIODS),
+                        help="périodes yfinance, séparées par des virgules")
+    parser.add_argument("--repeats", type=int, default=5, help="exécutions chronométrées par mesure")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="latence simulée par requête de la source de données (s)")
+    parser.add_argument("--workers", type=int, default=5, help="threads de collecte")
+    parser.add_argument("--seed", type=int, default=0, help="graine des données synthétiques")
+    parser.add_argument("--compute-processes", type=int, default=-1,
+                        help="processus du calcul réparti des indicateurs (-1: tous les processeurs)")
+    parser.add_argument("--filter", default=None, help="ne garder que les mesures dont le nom contient ce texte")
+    parser.add_argument("--output", default=None, help="fichier JSON de résultats (par défaut: data/benchmarks/)")
+    parser.add_argument("--compare", default=None, help="rapport JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="écart de médiane signalé comme régression (0.10 = +10%%)")
+    args = parser.parse_args(argv)
+
+    report = run(parse_list(args.scales, int), parse_list(args.periods), args.repeats,
+                 args.latency, args.workers, args.seed, args.filter, args.compute_processes)
+
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"Résultats écrits dans {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
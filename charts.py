@@ -0,0 +1,218 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from analytics import build_comparison_matrix
+from downsampling import DEFAULT_MAX_POINTS, aggregate_ohlc, downsample_xy
+
+# Nombre maximal de figures conservées par le cache
+FIGURE_CACHE_SIZE = 64
+
+# Nombre de points de courbes au-delà duquel une figure passe en rendu WebGL (Scattergl)
+WEBGL_POINT_THRESHOLD = 5000
+
+# Courbes tracées sur les graphiques d'un ticker (hors chandeliers et barres)
+LINE_COLUMNS = ['Close', 'MA_10', 'MA_20', 'MA_50', 'BB_Upper', 'BB_Lower', 'RSI', 'MACD', 'MACD_Signal']
+
+class FigureCache:
+    """Figures Plotly déjà construites, réutilisées tant que leurs données et options sont inchangées.
+
+    La clé regroupe la version des données (MarketPanel.version), le ticker, le type
+    de graphique et les options d'affichage; les figures les moins récemment
+    utilisées sont libérées au-delà de max_entries. Les figures servies sont
+    partagées: elles ne doivent pas être modifiées par l'appelant.
+    """
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Retourne la figure mémorisée pour la clé, construite par build() si nécessaire"""
+        with self._lock:
+            fig = self._figures.get(key)
+            if fig is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return fig
+            self.misses += 1
+        fig = build()
+        with self._lock:
+            self._figures[key] = fig
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
+
+    def stats(self):
+        """Statistiques du cache (figures conservées, réutilisations, constructions)"""
+        with self._lock:
+            return {'entries': len(self._figures), 'hits': self.hits, 'misses': self.misses}
+
+def scatter_type(n_points, webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """Classe de trace des courbes: go.Scattergl (WebGL) au-delà de webgl_threshold points, go.Scatter (SVG) sinon.
+
+    webgl_threshold=None désactive le rendu WebGL, 0 l'impose.
+    """
+    # Import différé, comme plotly.express: plotly n'est chargé qu'à la construction du premier graphique
+    import plotly.graph_objects as go
+    if webgl_threshold is not None and n_points > webgl_threshold:
+        return go.Scattergl
+    return go.Scatter
+
+def line_points(df_single, columns, max_points=DEFAULT_MAX_POINTS):
+    """Nombre de points des courbes tracées pour les colonnes disponibles (après réduction)"""
+    per_trace = min(len(df_single), max_points) if max_points else len(df_single)
+    traced = [c for c in columns if c in df_single.columns and not df_single[c].isnull().all()]
+    return per_trace * len(traced)
+
+def build_candlestick_figure(df_single, company_name, include_indicators=True, max_points=DEFAULT_MAX_POINTS, webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """Graphique chandelier et volume d'un ticker, avec moyennes mobiles et bandes de Bollinger.
+
+    Au-delà de max_points barres, les bougies sont regroupées (OHLC) et les courbes réduites par LTTB;
+    les courbes superposées passent en WebGL au-delà de webgl_threshold points.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    Scatter = scatter_type(line_points(df_single, LINE_COLUMNS[1:6], max_points) if include_indicators else 0, webgl_threshold)
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                        vertical_spacing=0.1,
+                        row_heights=[0.7, 0.3])
+    candles = aggregate_ohlc(df_single, max_points)
+    fig.add_trace(go.Candlestick(x=candles['Date'],
+                                 open=candles['Open'],
+                                 high=candles['High'],
+                                 low=candles['Low'],
+                                 close=candles['Close'],
+                                 name='Candlestick'), row=1, col=1)
+    if include_indicators:
+        if 'MA_10' in df_single.columns and not df_single['MA_10'].isnull().all():
+            fig.add_trace(Scatter(**downsample_xy(df_single, 'MA_10', max_points), mode='lines', name='MA 10', line=dict(color='orange', width=1)), row=1, col=1)
+        if 'MA_20' in df_single.columns and not df_single['MA_20'].isnull().all():
+            fig.add_trace(Scatter(**downsample_xy(df_single, 'MA_20', max_points), mode='lines', name='MA 20', line=dict(color='purple', width=1)), row=1, col=1)
+        if 'MA_50' in df_single.columns and not df_single['MA_50'].isnull().all():
+            fig.add_trace(Scatter(**downsample_xy(df_single, 'MA_50', max_points), mode='lines', name='MA 50', line=dict(color='red', width=1.5)), row=1, col=1)
+        if 'BB_Upper' in df_single.columns and 'BB_Lower' in df_single.columns and not df_single['BB_Upper'].isnull().all():
+             fig.add_trace(Scatter(**downsample_xy(df_single, 'BB_Upper', max_points), mode='lines', name='BB Upper', line=dict(color='blue', width=1, dash='dot')), row=1, col=1)
+             fig.add_trace(Scatter(**downsample_xy(df_single, 'BB_Lower', max_points), mode='lines', name='BB Lower', line=dict(color='blue', width=1, dash='dot')), row=1, col=1)
+
+    fig.add_trace(go.Bar(x=candles['Date'], y=candles['Volume'], name='Volume', marker_color='rgba(0,100,200,0.8)'), row=2, col=1)
+    fig.update_layout(xaxis_rangeslider_visible=False, title_text=f"Cours et Volume - {company_name}", height=600)
+    fig.update_yaxes(title_text="Cours", row=1, col=1)
+    fig.update_yaxes(title_text="Volume", row=2, col=1)
+    return fig
+
+def has_indicator_panels(df_single):
+    """Vrai si le RSI ou le MACD est disponible (panneaux sous le graphique des cours)"""
+    has_rsi = 'RSI' in df_single.columns and not df_single['RSI'].isnull().all()
+    has_macd = 'MACD' in df_single.columns and not df_single['MACD'].isnull().all() and not df_single['MACD_Signal'].isnull().all()
+    return has_rsi or has_macd
+
+def build_indicators_figure(df_single, company_name, max_points=DEFAULT_MAX_POINTS, webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """Graphique du cours et des indicateurs techniques (RSI, MACD) d'un ticker, un panneau par indicateur.
+
+    Chaque courbe est réduite par LTTB à max_points points au plus; les courbes passent
+    en WebGL au-delà de webgl_threshold points au total.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    Scatter = scatter_type(line_points(df_single, LINE_COLUMNS, max_points), webgl_threshold)
+    plot_rows_indicators = 1 # Start with Close price
+    row_titles_indicators = ["Prix de Clôture & Moyennes Mobiles"]
+    if 'RSI' in df_single.columns and not df_single['RSI'].isnull().all():
+        plot_rows_indicators += 1
+        row_titles_indicators.append("RSI (Relative Strength Index)")
+    if 'MACD' in df_single.columns and not df_single['MACD'].isnull().all() and not df_single['MACD_Signal'].isnull().all():
+        plot_rows_indicators += 1
+        row_titles_indicators.append("MACD (Moving Average Convergence Divergence)")
+
+    fig = make_subplots(rows=plot_rows_indicators, cols=1, shared_xaxes=True,
+                        vertical_spacing=0.1,
+                        row_titles=row_titles_indicators)
+
+    current_row_indicator = 1
+    # Prix
+    fig.add_trace(Scatter(**downsample_xy(df_single, 'Close', max_points), mode='lines', name='Prix Clôture', line=dict(color='blue')), row=current_row_indicator, col=1)
+    if 'MA_10' in df_single.columns and not df_single['MA_10'].isnull().all():
+        fig.add_trace(Scatter(**downsample_xy(df_single, 'MA_10', max_points), mode='lines', name='MA 10', line=dict(color='orange')), row=current_row_indicator, col=1)
+    if 'MA_20' in df_single.columns and not df_single['MA_20'].isnull().all():
+        fig.add_trace(Scatter(**downsample_xy(df_single, 'MA_20', max_points), mode='lines', name='MA 20', line=dict(color='purple')), row=current_row_indicator, col=1)
+    if 'MA_50' in df_single.columns and not df_single['MA_50'].isnull().all():
+        fig.add_trace(Scatter(**downsample_xy(df_single, 'MA_50', max_points), mode='lines', name='MA 50', line=dict(color='red')), row=current_row_indicator, col=1)
+    if 'BB_Upper' in df_single.columns and 'BB_Lower' in df_single.columns and not df_single['BB_Upper'].isnull().all():
+         fig.add_trace(Scatter(**downsample_xy(df_single, 'BB_Upper', max_points), mode='lines', name='BB Upper', line=dict(color='blue', dash='dot')), row=current_row_indicator, col=1)
+         fig.add_trace(Scatter(**downsample_xy(df_single, 'BB_Lower', max_points), mode='lines', name='BB Lower', line=dict(color='blue', dash='dot')), row=current_row_indicator, col=1)
+    fig.update_yaxes(title_text="Prix", row=current_row_indicator, col=1)
+    current_row_indicator += 1
+
+    # RSI
+    if 'RSI' in df_single.columns and not df_single['RSI'].isnull().all():
+        fig.add_trace(Scatter(**downsample_xy(df_single, 'RSI', max_points), mode='lines', name='RSI', line=dict(color='green')), row=current_row_indicator, col=1)
+        fig.add_hline(y=70, line_dash="dash", line_color="red", row=current_row_indicator, col=1, annotation_text="Surachat", annotation_position="top right")
+        fig.add_hline(y=30, line_dash="dash", line_color="green", row=current_row_indicator, col=1, annotation_text="Survente", annotation_position="bottom right")
+        fig.update_yaxes(title_text="RSI", row=current_row_indicator, col=1)
+        current_row_indicator += 1
+
+    # MACD
+    if 'MACD' in df_single.columns and 'MACD_Signal' in df_single.columns and 'MACD_Histogram' in df_single.columns and not df_single['MACD'].isnull().all():
+        fig.add_trace(Scatter(**downsample_xy(df_single, 'MACD', max_points), mode='lines', name='MACD', line=dict(color='blue')), row=current_row_indicator, col=1)
+        fig.add_trace(Scatter(**downsample_xy(df_single, 'MACD_Signal', max_points), mode='lines', name='Signal', line=dict(color='red')), row=current_row_indicator, col=1)
+        histogram = downsample_xy(df_single, 'MACD_Histogram', max_points)
+        # Ensure marker_color logic is robust for empty or single-value histograms
+        marker_colors = ['green' if val >= 0 else 'red' for val in histogram['y']] if not histogram['y'].empty else []
+        fig.add_trace(go.Bar(**histogram, name='Histogram', marker_color=marker_colors), row=current_row_indicator, col=1)
+        fig.update_yaxes(title_text="MACD", row=current_row_indicator, col=1)
+        current_row_indicator += 1
+
+    fig.update_layout(xaxis_rangeslider_visible=False, title_text=f"Cours et Indicateurs Techniques - {company_name}", height=plot_rows_indicators * 250, showlegend=True)
+    return fig
+
+def build_comparison_figure(panel, ticker_names=None, webgl_threshold=WEBGL_POINT_THRESHOLD, fill=True, resample=None):
+    """Évolution normalisée (%) des cours de tous les tickers, None sans données comparables.
+
+    Les courbes proviennent de build_comparison_matrix (index commun, comblement et
+    rééchantillonnage facultatifs); au-delà de webgl_threshold points au total,
+    elles sont rendues en WebGL.
+    """
+    comparison = build_comparison_matrix(panel, ticker_names, fill, resample)
+    if comparison.empty:
+        return None
+    import plotly.graph_objects as go
+
+    values = comparison.to_numpy()
+    valid = ~np.isnan(values)
+    Scatter = scatter_type(int(valid.sum()), webgl_threshold)
+    # Heure locale sans fuseau (Plotly affiche l'heure murale): évite la conversion date par date des index avec fuseau
+    dates = comparison.index.tz_localize(None) if comparison.index.tz is not None else comparison.index
+    fig = go.Figure(data=[
+        Scatter(x=dates[valid[:, i]], y=values[valid[:, i], i], mode='lines', name=name)
+        for i, name in enumerate(comparison.columns)
+    ])
+    fig.update_layout(
+        title="Évolution Normalisée des Prix (%)",
+        xaxis_title="Date",
+        yaxis_title="Changement (%)",
+        legend_title_text="Entreprise",
+        hovermode="x unified"
+    )
+    return fig
+
+def build_sector_pie_figure(sector_counts):
+    """Répartition des entreprises par secteur (colonnes Secteur, Nombre d'entreprises)"""
+    # Import différé: plotly.express (et ses dépendances) n'est chargé qu'à l'ouverture de la vue d'ensemble
+    import plotly.express as px
+    return px.pie(sector_counts, names='Secteur', values='Nombre d\'entreprises',
+                  title='Répartition des Entreprises par Secteur',
+                  hole=0.3)
+
+def build_market_cap_figure(df_market_cap):
+    """Capitalisation boursière par entreprise, de la plus forte à la plus faible, colorée par secteur"""
+    import plotly.express as px
+    fig = px.bar(df_market_cap.sort_values('Capitalisation Boursière', ascending=False),
+                 x='Entreprise', y='Capitalisation Boursière',
+                 title='Capitalisation Boursière (en Millions/Milliards)',
+                 color='Secteur')
+    fig.update_yaxes(tickformat=".2s") # Format y-axis to show M, B for millions, billions
+    return fig
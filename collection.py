@@ -0,0 +1,506 @@
+import logging
+import threading
+import time
+import pandas as pd
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from bar_store import select_period
+from company_metadata import default_metadata
+from market_panel import MarketPanel, compact_frame
+from indicators import add_indicators_to_frames, build_indicator_states, extend_indicators
+from market_data import DEFAULT_PROVIDER
+from metrics import stage_timer
+
+# Module indépendant de Streamlit: utilisable par l'application comme par collector.py (cron, workers)
+logger = logging.getLogger("cac40.collection")
+
+# Mapping des intervalles optimaux
+INTERVAL_MAPPING = {
+    "1d": "2m", "5d": "5m", "1mo": "30m", 
+    "3mo": "1h", "6mo": "1d", "1y": "1d",
+    "2y": "1wk", "5y": "1wk", "10y": "1mo", 
+    "ytd": "1d", "max": "1mo"
+}
+
+# Nombre maximal de symboles par requête groupée yfinance
+BATCH_SIZE = 20
+
+def get_interval_for_period(period):
+    """Retourne l'intervalle de cotation adapté à la période demandée"""
+    return INTERVAL_MAPPING.get(period, "1d")
+
+def prepare_ticker_data(data):
+    """Met en forme l'historique brut d'un ticker (les indicateurs sont calculés ensuite pour tous les tickers)"""
+    # Reset de l'index pour avoir Datetime comme colonne
+    data = data.reset_index()
+    # Renommer la colonne 'Datetime' si elle existe, sinon 'Date'
+    if 'Datetime' in data.columns:
+        data.rename(columns={'Datetime': 'Date'}, inplace=True)
+    return data
+
+def fetch_ticker_history(ticker_symbol, period, bar_store=None, provider=DEFAULT_PROVIDER):
+    """Télécharge l'historique d'un ticker en ne récupérant que les barres absentes du stock local"""
+    interval_val = get_interval_for_period(period)
+    if bar_store is None:
+        return provider.history(ticker_symbol, period, interval_val)
+    
+    data = None
+    delta_start = bar_store.get_delta_start(ticker_symbol, interval_val, period)
+    if delta_start is not None:
+        try:
+            delta = provider.history(ticker_symbol, period, interval_val, start=delta_start)
+            data = bar_store.merge_delta(ticker_symbol, interval_val, delta)
+        except Exception:
+            # Complément impossible (limite d'historique intraday, etc.): rechargement complet
+            data = None
+    
+    if data is None:
+        data = provider.history(ticker_symbol, period, interval_val)
+        bar_store.store_full(ticker_symbol, interval_val, data, period)
+    
+    return select_period(data, period)
+
+def get_ticker_data_enhanced(ticker_symbol, period, bar_store=None, provider=DEFAULT_PROVIDER, timings=None):
+    """Collecte de données améliorée avec gestion d'erreurs et informations supplémentaires"""
+    try:
+        # Téléchargement des données historiques (complément seulement si le stock local les couvre)
+        with stage_timer(timings, 'history', ticker_symbol):
+            data = fetch_ticker_history(ticker_symbol, period, bar_store, provider)
+        
+        if not data.empty:
+            return ticker_symbol, prepare_ticker_data(data), None
+        return ticker_symbol, pd.DataFrame(), None
+            
+    except Exception as e:
+        return ticker_symbol, pd.DataFrame(), str(e)
+
+def process_batch_history(ticker_symbol, data):
+    """Finalise l'historique d'un ticker issu d'un téléchargement groupé"""
+    try:
+        return ticker_symbol, prepare_ticker_data(data), None
+    except Exception as e:
+        return ticker_symbol, pd.DataFrame(), str(e)
+
+def add_technical_indicators(df):
+    """Ajoute des indicateurs techniques au DataFrame"""
+    if df.empty or len(df) < 2:
+        return df
+    
+    try:
+        # Moyennes mobiles
+        if len(df) >= 10:
+            df['MA_10'] = df['Close'].rolling(window=10, min_periods=1).mean()
+        if len(df) >= 20:
+            df['MA_20'] = df['Close'].rolling(window=20, min_periods=1).mean()
+        if len(df) >= 50:
+            df['MA_50'] = df['Close'].rolling(window=50, min_periods=1).mean()
+        
+        # RSI (Relative Strength Index)
+        if len(df) >= 14:
+            delta = df['Close'].diff()
+            # Pour éviter la division par zéro dans le cas où loss est 0
+            gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
+            loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
+            
+            # Gestion de la division par zéro pour RS
+            rs = np.where(loss == 0, np.inf, gain / loss)
+            df['RSI'] = 100 - (100 / (1 + rs))
+        
+        # MACD
+        if len(df) >= 26:
+            exp1 = df['Close'].ewm(span=12, adjust=False).mean()
+            exp2 = df['Close'].ewm(span=26, adjust=False).mean()
+            df['MACD'] = exp1 - exp2
+            df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
+            df['MACD_Histogram'] = df['MACD'] - df['MACD_Signal']
+        
+        # Bandes de Bollinger
+        if len(df) >= 20:
+            df['BB_Middle'] = df['Close'].rolling(window=20).mean()
+            bb_std = df['Close'].rolling(window=20).std()
+            df['BB_Upper'] = df['BB_Middle'] + (bb_std * 2)
+            df['BB_Lower'] = df['BB_Middle'] - (bb_std * 2)
+            
+    except Exception as e:
+        logger.warning("Erreur lors du calcul des indicateurs techniques: %s", e)
+        # S'assurer que les colonnes sont créées même en cas d'erreur pour éviter des KeyError plus tard
+        for col in ['MA_10', 'MA_20', 'MA_50', 'RSI', 'MACD', 'MACD_Signal', 'MACD_Histogram', 'BB_Middle', 'BB_Upper', 'BB_Lower']:
+            if col not in df.columns:
+                df[col] = np.nan
+    
+    return df
+
+def add_indicators_all(frames, processes=None):
+    """Calcule les indicateurs de tous les tickers en une passe vectorisée (repli ticker par ticker)"""
+    try:
+        return add_indicators_to_frames(frames, processes)
+    except Exception:
+        return {ticker: add_technical_indicators(df) for ticker, df in frames.items()}
+
+def update_indicators(frames, previous_frames=None, previous_states=None, processes=None):
+    """Prolonge les indicateurs de la collecte précédente quand c'est possible, calcul vectorisé sinon.
+
+    previous_frames/previous_states: DataFrames enrichis et états incrémentaux de la collecte
+    précédente (même intervalle). processes: processus du calcul complet (voir add_indicators_to_frames).
+    Retourne les DataFrames enrichis et l'état de chaque ticker.
+    """
+    results = {}
+    states = {}
+    to_compute = {}
+    previous_states = previous_states or {}
+    
+    for ticker, df in frames.items():
+        extended = None
+        if previous_frames is not None and ticker in previous_frames and ticker in previous_states:
+            try:
+                extended = extend_indicators(previous_frames[ticker], df, previous_states[ticker])
+            except Exception:
+                extended = None
+        if extended is None:
+            to_compute[ticker] = df
+        else:
+            results[ticker], states[ticker] = extended
+    
+    if to_compute:
+        results.update(add_indicators_all(to_compute, processes))
+        try:
+            states.update(build_indicator_states(to_compute))
+        except Exception:
+            # Sans état, ces tickers seront simplement recalculés à la prochaine collecte
+            pass
+    
+    return {ticker: results[ticker] for ticker in frames}, states
+
+def collect_batch_histories(tickers_to_collect, period, max_workers=5, bar_store=None, async_fetcher=None, provider=DEFAULT_PROVIDER, timings=None):
+    """Télécharge par lots les historiques, en complément du stock local lorsqu'il couvre la période.
+
+    Avec async_fetcher, toutes les requêtes partent simultanément sur la session
+    asynchrone partagée au lieu de passer par yf.download. Retourne (historiques,
+    erreurs par ticker de la collecte asynchrone).
+    """
+    interval_val = get_interval_for_period(period)
+    batch_errors = {}
+    if async_fetcher is not None:
+        def download(group, start=None):
+            histories, errors = async_fetcher.fetch_histories(group, period, interval_val, start, timings)
+            batch_errors.update(errors)
+            return histories
+        batch_size = max(len(tickers_to_collect), 1)
+    else:
+        download = partial(provider.download, period=period, interval=interval_val, max_workers=max_workers)
+        batch_size = BATCH_SIZE
+    
+    delta_starts = {}
+    if bar_store is not None:
+        for ticker in tickers_to_collect:
+            with stage_timer(timings, 'bar_store', ticker):
+                delta_start = bar_store.get_delta_start(ticker, interval_val, period)
+            if delta_start is not None:
+                delta_starts[ticker] = delta_start
+    full_tickers = [t for t in tickers_to_collect if t not in delta_starts]
+    incremental_tickers = [t for t in tickers_to_collect if t in delta_starts]
+    
+    # Les lots sont traités l'un après l'autre, yf.download n'étant pas réentrant
+    batch_histories = {}
+    for start in range(0, len(full_tickers), batch_size):
+        group = full_tickers[start:start + batch_size]
+        try:
+            with stage_timer(timings, 'history_batch'):
+                histories = download(group)
+        except Exception:
+            # Les tickers du lot repasseront par la collecte individuelle
+            continue
+        for ticker, data in histories.items():
+            if bar_store is not None:
+                bar_store.store_full(ticker, interval_val, data, period)
+            batch_histories[ticker] = data
+    
+    for start in range(0, len(incremental_tickers), batch_size):
+        group = incremental_tickers[start:start + batch_size]
+        try:
+            with stage_timer(timings, 'history_batch'):
+                deltas = download(group, start=min(delta_starts[t] for t in group))
+        except Exception:
+            continue
+        for ticker in group:
+            # Complément absent ou sans barre de recouvrement: collecte individuelle (rechargement complet)
+            merged = bar_store.merge_delta(ticker, interval_val, deltas.get(ticker))
+            if merged is not None:
+                batch_histories[ticker] = select_period(merged, period)
+    
+    return batch_histories, batch_errors
+
+def get_company_metadata(ticker_symbol, provider=DEFAULT_PROVIDER):
+    """Informations entreprise récupérées directement (sans cache), valeurs par défaut en cas d'erreur"""
+    try:
+        return provider.company_info(ticker_symbol)
+    except Exception:
+        return default_metadata(ticker_symbol)
+
+def collect_frames(tickers_to_collect, period, max_workers=5, batch_download=True, bar_store=None, previous_frames=None, previous_states=None, async_fetcher=None, provider=DEFAULT_PROVIDER, timings=None, processes=None):
+    """Collecte les historiques en parallèle et calcule leurs indicateurs.
+
+    Retourne (DataFrames par ticker, états incrémentaux des indicateurs, erreurs).
+    Les tickers que la collecte asynchrone ou groupée n'a pas obtenus repassent
+    par la collecte individuelle yfinance. Avec timings (StageTimings), la durée
+    de chaque étape est enregistrée, par ticker lorsque c'est possible.
+    """
+    collected_data = {}
+    errors = []
+    
+    # Téléchargement groupé des historiques
+    batch_histories, batch_errors = {}, {}
+    if async_fetcher is not None or batch_download:
+        batch_histories, batch_errors = collect_batch_histories(tickers_to_collect, period, max_workers, bar_store, async_fetcher, provider, timings)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Soumission de tous les jobs: finalisation des historiques groupés,
+        # collecte individuelle pour les tickers absents du lot
+        future_to_ticker = {
+            (executor.submit(process_batch_history, ticker, batch_histories[ticker])
+             if ticker in batch_histories
+             else executor.submit(get_ticker_data_enhanced, ticker, period, bar_store, provider, timings)): ticker 
+            for ticker in tickers_to_collect
+        }
+        
+        # Récupération des résultats
+        for future in as_completed(future_to_ticker):
+            ticker_symbol, data, error = future.result()
+            
+            if error or data.empty:
+                # Échec de la collecte asynchrone (HTTP, réponse invalide) plutôt que celui du repli individuel
+                errors.append((ticker_symbol, batch_errors.get(ticker_symbol) or error or "Aucune donnée disponible"))
+            else:
+                collected_data[ticker_symbol] = data
+        
+    # Indicateurs techniques: extension incrémentale des tickers déjà calculés,
+    # calcul vectorisé unique pour les autres
+    with stage_timer(timings, 'indicators'):
+        collected_data, indicator_states = update_indicators(collected_data, previous_frames, previous_states, processes)
+    return collected_data, indicator_states, errors
+
+def get_company_metadata_timed(ticker_symbol, provider=DEFAULT_PROVIDER, timings=None):
+    with stage_timer(timings, 'info', ticker_symbol):
+        return get_company_metadata(ticker_symbol, provider)
+
+def collect_company_metadata(tickers, metadata_cache=None, max_workers=5, provider=DEFAULT_PROVIDER, timings=None):
+    """Informations entreprise des tickers: cache partagé non bloquant, ou appels directs à défaut.
+
+    Retourne (dict ticker -> informations, version du cache lue avant la lecture, None sans cache).
+    """
+    if metadata_cache is not None:
+        version = metadata_cache.version
+        with stage_timer(timings, 'info_cache'):
+            return metadata_cache.get_many(list(tickers)), version
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetch = partial(get_company_metadata_timed, provider=provider, timings=timings)
+        return dict(zip(tickers, executor.map(fetch, tickers))), None
+
+def refresh_panel_metadata(panel, metadata_cache):
+    """Panneau tenant compte des informations entreprise reçues depuis sa construction.
+
+    Le cache ne bloque jamais: un panneau construit avant l'arrivée des informations porte
+    les valeurs par défaut (secteur 'Non spécifié', sans capitalisation). Dès que la version
+    du cache a changé, un panneau aux mêmes barres et aux informations à jour est retourné;
+    le panneau lui-même sinon.
+    """
+    if metadata_cache is None or panel.metadata_version is None:
+        return panel
+    version = metadata_cache.version
+    if version == panel.metadata_version:
+        return panel
+    return panel.with_metadata(metadata_cache.get_many(list(panel)), version)
+
+def collect_data_parallel(tickers_to_collect, period, max_workers=5, batch_download=True, bar_store=None, metadata_cache=None, previous_panel=None, async_fetcher=None, provider=DEFAULT_PROVIDER, timings=None, processes=None):
+    """Collecte les données en parallèle et les retourne sous forme de MarketPanel.
+
+    Avec previous_panel (collecte précédente), seuls les indicateurs des nouvelles barres sont calculés.
+    processes: processus de calcul des indicateurs (None: CAC40_COMPUTE_PROCESSES, voir process_pool).
+    """
+    # Les informations entreprise manquantes sont chargées en arrière-plan pendant la collecte
+    if metadata_cache is not None:
+        metadata_cache.prefetch(tickers_to_collect)
+    
+    interval_val = get_interval_for_period(period)
+    if previous_panel is not None and previous_panel.interval != interval_val:
+        previous_panel = None
+    collected_data, indicator_states, errors = collect_frames(
+        tickers_to_collect, period, max_workers, batch_download, bar_store,
+        previous_panel, previous_panel.indicator_states if previous_panel is not None else None,
+        async_fetcher, provider, timings, processes
+    )
+    
+    # Informations entreprise: une seule entrée par ticker, hors des lignes de prix
+    metadata, metadata_version = collect_company_metadata(list(collected_data), metadata_cache, max_workers, provider, timings)
+    with stage_timer(timings, 'panel'):
+        panel = MarketPanel.from_frames(collected_data, metadata, indicator_states, interval_val, metadata_version)
+    return panel, errors
+
+def load_market_data(keys, previous, max_workers=5, batch_download=True, bar_store=None, incremental=True, async_fetcher=None, provider=DEFAULT_PROVIDER, timings=None):
+    """Chargeur de la couche partagée: collecte les clés (ticker, intervalle, période) d'une même période"""
+    period = keys[0][2]
+    interval_val = get_interval_for_period(period)
+    previous_frames = {key[0]: frame for key, (frame, state) in previous.items()} if incremental else None
+    previous_states = {key[0]: state for key, (frame, state) in previous.items() if state is not None} if incremental else None
+    
+    frames, indicator_states, errors = collect_frames(
+        [key[0] for key in keys], period, max_workers, batch_download, bar_store, previous_frames, previous_states,
+        async_fetcher, provider, timings
+    )
+    # Stockage compact (float32) dans la couche partagée
+    values = {
+        (ticker, interval_val, period): (compact_frame(df), indicator_states.get(ticker))
+        for ticker, df in frames.items()
+    }
+    return values, {(ticker, interval_val, period): error for ticker, error in errors}
+
+def collect_data_shared(shared_data, tickers_to_collect, period, max_workers=5, batch_download=True, bar_store=None, metadata_cache=None, incremental=True, async_fetcher=None, provider=DEFAULT_PROVIDER, timings=None):
+    """Collecte via la couche partagée: les sessions demandant les mêmes données partagent un seul téléchargement.
+
+    Retourne un MarketPanel partagé (non copié) par toutes les sessions ayant la même sélection.
+    L'étape 'shared_get' inclut l'attente d'un téléchargement lancé par une autre session.
+    """
+    if metadata_cache is not None:
+        metadata_cache.prefetch(tickers_to_collect)
+    
+    interval_val = get_interval_for_period(period)
+    keys = [(ticker, interval_val, period) for ticker in tickers_to_collect]
+    loader = partial(load_market_data, max_workers=max_workers, batch_download=batch_download,
+                     bar_store=bar_store, incremental=incremental, async_fetcher=async_fetcher, provider=provider,
+                     timings=timings)
+    with stage_timer(timings, 'shared_get'):
+        values, errors, token = shared_data.get(keys, loader)
+    
+    def build_panel():
+        frames = {key[0]: values[key][0] for key in keys if key in values}
+        states = {key[0]: values[key][1] for key in keys if key in values and values[key][1] is not None}
+        metadata, metadata_version = collect_company_metadata(list(frames), metadata_cache, max_workers, provider, timings)
+        return MarketPanel.from_frames(frames, metadata, states, interval_val, metadata_version)
+    
+    with stage_timer(timings, 'panel'):
+        panel = shared_data.view(token, build_panel)
+        if metadata_cache is not None and panel.metadata_version != metadata_cache.version:
+            # Informations entreprise reçues depuis la construction de la vue: vue partagée aux
+            # mêmes barres et aux informations à jour, pour toutes les sessions
+            base_panel = panel
+            panel = shared_data.view(token + (('metadata', metadata_cache.version),),
+                                     lambda: refresh_panel_metadata(base_panel, metadata_cache))
+    return panel, [(key[0], error) for key, error in errors.items()]
+
+def stream_ticker_frames(tickers_to_collect, period, max_workers=5, bar_store=None, provider=DEFAULT_PROVIDER, timings=None, cancelled=None):
+    """Générateur de la collecte progressive: (ticker, DataFrame avec indicateurs, état incrémental, erreur).
+
+    Chaque ticker est téléchargé individuellement et produit dès son arrivée,
+    indicateurs compris: le premier résultat ne dépend que du ticker le plus rapide.
+    cancelled (threading.Event) interrompt la collecte; les tickers non démarrés sont abandonnés.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(get_ticker_data_enhanced, ticker, period, bar_store, provider, timings)
+                   for ticker in tickers_to_collect]
+        for future in as_completed(futures):
+            if cancelled is not None and cancelled.is_set():
+                return
+            ticker_symbol, data, error = future.result()
+            if error:
+                yield ticker_symbol, None, None, error
+            elif data.empty:
+                yield ticker_symbol, None, None, "Aucune donnée disponible"
+            else:
+                with stage_timer(timings, 'indicators', ticker_symbol):
+                    frames, states = update_indicators({ticker_symbol: data})
+                yield ticker_symbol, frames[ticker_symbol], states.get(ticker_symbol), None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+class StreamingCollection:
+    """Collecte progressive exécutée en arrière-plan.
+
+    Les tickers sont disponibles au fil de leur arrivée: panel() renvoie un MarketPanel
+    des tickers déjà chargés (reconstruit seulement quand de nouveaux tickers sont
+    arrivés), progress() l'avancement. Contourne la couche partagée et le
+    téléchargement groupé, qui ne rendent les historiques qu'en fin de lot.
+    """
+
+    def __init__(self, tickers_to_collect, period, max_workers=5, bar_store=None, metadata_cache=None, provider=DEFAULT_PROVIDER, timings=None):
+        self.tickers = list(tickers_to_collect)
+        self.period = period
+        self.interval = get_interval_for_period(period)
+        self.max_workers = max_workers
+        self.bar_store = bar_store
+        self.metadata_cache = metadata_cache
+        self.provider = provider
+        self.timings = timings
+        self.errors = []
+        self.started_at = time.time()
+        self.finished_at = None
+        self._frames = {}
+        self._states = {}
+        self._done = False
+        self._panel = None
+        self._panel_count = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="streaming-collection", daemon=True)
+
+    def start(self):
+        if self.metadata_cache is not None:
+            self.metadata_cache.prefetch(self.tickers)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Interrompt la collecte (nouvelle collecte lancée entre-temps)"""
+        self._cancelled.set()
+
+    def _run(self):
+        try:
+            for ticker_symbol, frame, state, error in stream_ticker_frames(
+                self.tickers, self.period, self.max_workers, self.bar_store, self.provider, self.timings, self._cancelled
+            ):
+                with self._lock:
+                    if error:
+                        self.errors.append((ticker_symbol, error))
+                    else:
+                        self._frames[ticker_symbol] = frame
+                        if state is not None:
+                            self._states[ticker_symbol] = state
+        except Exception as e:
+            with self._lock:
+                self.errors.append((None, str(e)))
+        finally:
+            with self._lock:
+                self._done = True
+                self.finished_at = time.time()
+
+    @property
+    def done(self):
+        with self._lock:
+            return self._done
+
+    def progress(self):
+        """(tickers traités, tickers chargés, total)"""
+        with self._lock:
+            return len(self._frames) + len(self.errors), len(self._frames), len(self.tickers)
+
+    def panel(self):
+        """MarketPanel des tickers déjà chargés, dans l'ordre demandé.
+
+        Le panneau est reconstruit en entier dès que de nouveaux tickers sont arrivés
+        (au plus une fois par relevé de la session): sur une longue collecte, le coût
+        cumulé croît comme le carré du nombre de tickers.
+        """
+        with self._lock:
+            count = len(self._frames)
+            if self._panel is not None and self._panel_count == count:
+                return self._panel
+            frames = {t: self._frames[t] for t in self.tickers if t in self._frames}
+            states = {t: self._states[t] for t in frames if t in self._states}
+        metadata, metadata_version = collect_company_metadata(list(frames), self.metadata_cache, self.max_workers,
+                                                              self.provider, self.timings)
+        with stage_timer(self.timings, 'panel'):
+            panel = MarketPanel.from_frames(frames, metadata, states, self.interval, metadata_version)
+        with self._lock:
+            self._panel, self._panel_count = panel, count
+        return panel
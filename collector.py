@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from bar_store import BarStore, DEFAULT_STORE_DIR
+from collection import collect_data_parallel, get_interval_for_period
+from constituent_registry import ConstituentRegistry, period_window_start
+from market_data import DEFAULT_PROVIDER_SPEC, provider_from_spec
+from metrics import StageTimings, logger
+from process_pool import shutdown_pools
+from snapshot_store import DEFAULT_SNAPSHOT_DIR, SnapshotStore
+
+# Périodes proposées par l'application
+DEFAULT_PERIODS = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "max"]
+
+def universe(provider, period, today=None):
+    """Symboles à collecter: univers de la source, à défaut membres du CAC 40 sur la fenêtre de la période"""
+    tickers = provider.list_tickers()
+    if tickers is None:
+        today = today or date.today()
+        tickers = ConstituentRegistry.load().members_between(period_window_start(period, today), today)
+    return list(tickers.values())
+
+def collect_snapshots(provider_spec, periods, tickers=None, max_workers=5, snapshot_root=DEFAULT_SNAPSHOT_DIR, bar_store_root=DEFAULT_STORE_DIR, compute_processes=None):
+    """Tâche d'un processus: collecte les périodes données (même intervalle) et écrit leurs instantanés.
+
+    Les périodes d'un même intervalle partagent les fichiers du stock local: elles sont
+    traitées l'une après l'autre dans le même processus. compute_processes: processus du
+    calcul des indicateurs (voir process_pool). Retourne un résumé par période.
+    """
+    provider = provider_from_spec(provider_spec)
+    store = SnapshotStore(snapshot_root)
+    bar_store = BarStore(bar_store_root) if bar_store_root and provider.name == "yfinance" else None
+    summaries = []
+    try:
+        for period in periods:
+            period_tickers = tickers or universe(provider, period)
+            timings = StageTimings()
+            start = time.perf_counter()
+            panel, errors = collect_data_parallel(period_tickers, period, max_workers, bar_store=bar_store,
+                                                  provider=provider, timings=timings, processes=compute_processes)
+            duration = time.perf_counter() - start
+            timings.record('collection', duration)
+            manifest = store.write(panel, provider_spec, period, errors, duration)
+            # Journal JSON seulement: chaque processus réécrirait le fichier Prometheus de l'application avec ses seules mesures
+            logger.info(json.dumps(timings.to_log(errors=len(errors), tickers=len(period_tickers), period=period,
+                                                  source=provider.name, snapshot=True), ensure_ascii=False, default=str))
+            summaries.append({
+                'period': period,
+                'tickers': len(period_tickers),
+                'collected': len(panel),
+                'bars': int(panel.row_counts().sum()),
+                'errors': len(errors),
+                'duration_s': duration,
+                'path': store.directory(provider_spec, period),
+                'created_at': manifest['created_at']
+            })
+    finally:
+        # Le pool de calcul de ce processus doit être arrêté: sinon le processus ne se termine pas
+        shutdown_pools()
+    return summaries
+
+def group_by_interval(periods):
+    """Périodes regroupées par intervalle de cotation (une tâche de processus par groupe)"""
+    groups = {}
+    for period in periods:
+        groups.setdefault(get_interval_for_period(period), []).append(period)
+    return list(groups.values())
+
+def parse_list(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Collecte hors de l'application (cron, worker): historiques, indicateurs et instantanés lus par CAC40 Tracker Pro"
+    )
+    parser.add_argument("--source", default=DEFAULT_PROVIDER_SPEC,
+                        help="source de données (yfinance, replay:<répertoire>, synthetic:tickers=<n>)")
+    parser.add_argument("--periods", default=",".join(DEFAULT_PERIODS), help="périodes yfinance, séparées par des virgules")
+    parser.add_argument("--tickers", default=None,
+                        help="symboles séparés par des virgules (par défaut: univers de la source ou composition du CAC 40)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="processus de collecte (par défaut: un par intervalle, dans la limite des processeurs)")
+    parser.add_argument("--workers", type=int, default=5, help="threads de collecte par processus")
+    parser.add_argument("--compute-processes", type=int, default=None,
+                        help="processus du calcul des indicateurs sur les grands univers "
+                             "(par défaut: CAC40_COMPUTE_PROCESSES; -1: tous les processeurs)")
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_DIR, help="répertoire des instantanés")
+    parser.add_argument("--bar-store", default=DEFAULT_STORE_DIR,
+                        help="stock local des cotations (Yahoo Finance); chaîne vide pour le désactiver")
+    args = parser.parse_args(argv)
+
+    tickers = parse_list(args.tickers) if args.tickers else None
+    groups = group_by_interval(parse_list(args.periods))
+    processes = args.processes or min(len(groups), os.cpu_count() or 1)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(processes, 1)) as executor:
+        futures = {
+            executor.submit(collect_snapshots, args.source, group, tickers, args.workers, args.output, args.bar_store,
+                            args.compute_processes): group
+            for group in groups
+        }
+        for future in as_completed(futures):
+            try:
+                summaries = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"{','.join(futures[future]):<12} échec: {e}", file=sys.stderr, flush=True)
+                continue
+            for summary in summaries:
+                print(f"{summary['period']:>4}  {summary['collected']:>4}/{summary['tickers']:<4} tickers  "
+                      f"{summary['bars']:>8} barres  {summary['errors']:>3} erreur(s)  "
+                      f"{summary['duration_s']:7.2f} s  -> {summary['path']}", flush=True)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import REGISTRY
+
+# Fichier de persistance du cache (surchargeable par variable d'environnement)
+DEFAULT_METADATA_FILE = os.environ.get(
+    "CAC40_METADATA_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "company_metadata.json")
+)
+
+# Durée de validité des informations entreprise (elles changent au plus une fois par jour)
+METADATA_TTL = 24 * 3600
+
+# Délai avant de retenter un ticker dont la récupération a échoué
+RETRY_DELAY = 300
+
+def default_metadata(ticker_symbol):
+    """Valeurs par défaut utilisées tant que les informations d'un ticker ne sont pas connues"""
+    return {
+        'Company_Name': ticker_symbol,
+        'Sector': 'Non spécifié',
+        'Market_Cap': None,
+        'Currency': 'EUR'
+    }
+
+def fetch_company_metadata(ticker_symbol):
+    """Récupère nom, secteur, capitalisation et devise d'un ticker via yfinance (appel lent)"""
+    # Import différé: yfinance n'est chargé qu'au premier appel réseau (démarrage à froid plus court)
+    import yfinance as yf
+    info = yf.Ticker(ticker_symbol).info
+    return {
+        'Company_Name': info.get('longName', info.get('shortName', ticker_symbol)),
+        'Sector': info.get('sector', 'Non spécifié'),
+        'Market_Cap': info.get('marketCap', None),
+        'Currency': info.get('currency', 'EUR')
+    }
+
+class MetadataCache:
+    """Cache des informations entreprise, partagé par toutes les sessions.
+
+    Les lectures ne bloquent jamais: une entrée absente ou expirée renvoie la
+    valeur connue (ou les valeurs par défaut) et déclenche un rafraîchissement
+    en arrière-plan. Le cache est persisté sur disque pour survivre aux redémarrages
+    (sauf avec path=None, pour les sources de données hors ligne).
+    """
+
+    def __init__(self, path=DEFAULT_METADATA_FILE, ttl=METADATA_TTL, fetcher=fetch_company_metadata, max_workers=4):
+        self.path = path
+        self.ttl = ttl
+        self.fetcher = fetcher
+        self._entries = {}
+        self._failures = {}
+        self._pending = set()
+        # Incrémenté à chaque information reçue (permet de reconstruire ce qui en dépend)
+        self.version = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata")
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            self._entries = {t: (e['metadata'], e['fetched_at']) for t, e in stored.items()}
+        except Exception:
+            self._entries = {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Verrou dédié pour que la dernière écriture reflète toujours l'état le plus récent
+            with self._save_lock:
+                with self._lock:
+                    stored = {t: {'metadata': m, 'fetched_at': ts} for t, (m, ts) in self._entries.items()}
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(stored, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+        except Exception:
+            # La persistance est facultative: le cache en mémoire reste utilisable
+            pass
+
+    def _needs_refresh(self, ticker_symbol, now):
+        entry = self._entries.get(ticker_symbol)
+        if entry is not None and now - entry[1] < self.ttl:
+            return False
+        if ticker_symbol in self._pending:
+            return False
+        return now - self._failures.get(ticker_symbol, 0) >= RETRY_DELAY
+
+    def _refresh(self, ticker_symbol):
+        start = time.perf_counter()
+        try:
+            metadata = self.fetcher(ticker_symbol)
+        except Exception:
+            with self._lock:
+                self._failures[ticker_symbol] = time.time()
+                self._pending.discard(ticker_symbol)
+            return
+        with self._lock:
+            self._entries[ticker_symbol] = (metadata, time.time())
+            self._failures.pop(ticker_symbol, None)
+            self._pending.discard(ticker_symbol)
+            self.version += 1
+        REGISTRY.observe_stage('info', time.perf_counter() - start, ticker_symbol)
+        self._save()
+
+    def prefetch(self, tickers):
+        """Programme en arrière-plan le rafraîchissement des tickers absents ou expirés"""
+        now = time.time()
+        with self._lock:
+            to_refresh = [t for t in tickers if self._needs_refresh(t, now)]
+            self._pending.update(to_refresh)
+        for ticker_symbol in to_refresh:
+            self._executor.submit(self._refresh, ticker_symbol)
+
+    def get(self, ticker_symbol):
+        """Retourne immédiatement les informations connues d'un ticker (défaut si inconnues)"""
+        self.prefetch([ticker_symbol])
+        with self._lock:
+            entry = self._entries.get(ticker_symbol)
+        return dict(entry[0]) if entry is not None else default_metadata(ticker_symbol)
+
+    def get_many(self, tickers):
+        """Retourne les informations connues d'une liste de tickers"""
+        self.prefetch(tickers)
+        with self._lock:
+            entries = {t: self._entries.get(t) for t in tickers}
+        return {t: dict(e[0]) if e is not None else default_metadata(t) for t, e in entries.items()}
+
+    def is_loading(self, tickers=None):
+        """Indique si des rafraîchissements sont en cours (pour les tickers donnés le cas échéant)"""
+        with self._lock:
+            if tickers is None:
+                return bool(self._pending)
+            return any(t in self._pending for t in tickers)
@@ -0,0 +1,175 @@
+import json
+import os
+from bisect import bisect_right
+from datetime import date
+import pandas as pd
+
+# Fichier versionné de la composition de l'indice (surchargeable par variable d'environnement)
+DEFAULT_CONSTITUENTS_FILE = os.environ.get(
+    "CAC40_CONSTITUENTS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cac40_constituents.json")
+)
+
+# Version du format de fichier prise en charge
+SCHEMA_VERSION = 1
+
+def _parse_date(value):
+    return None if value is None else date.fromisoformat(value)
+
+class Constituent:
+    """Valeur de l'indice: symboles Yahoo Finance par place et périodes d'appartenance [début, fin["""
+
+    def __init__(self, name, symbols, preferred_venue, memberships):
+        if preferred_venue not in symbols:
+            raise ValueError(f"{name}: place préférée {preferred_venue} sans symbole")
+        self.name = name
+        self.symbols = dict(symbols)
+        self.preferred_venue = preferred_venue
+        # Bornes None: membre depuis le début de l'historique / membre actuel
+        self.memberships = sorted(
+            ((_parse_date(m.get('start')), _parse_date(m.get('end'))) for m in memberships),
+            key=lambda m: m[0] or date.min
+        )
+        for start, end in self.memberships:
+            if start is not None and end is not None and end <= start:
+                raise ValueError(f"{name}: période d'appartenance vide ({start} -> {end})")
+
+    @property
+    def symbol(self):
+        """Symbole utilisé pour la collecte (place préférée)"""
+        return self.symbols[self.preferred_venue]
+
+    def is_member_between(self, start=None, end=None):
+        """Vrai si la valeur a appartenu à l'indice à un moment de [start, end] (bornes None: non limitées)"""
+        for member_start, member_end in self.memberships:
+            if (end is None or member_start is None or member_start <= end) and \
+               (start is None or member_end is None or member_end > start):
+                return True
+        return False
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['name'], data['symbols'], data['preferred_venue'], data.get('memberships') or [{}])
+
+class ConstituentRegistry:
+    """Composition historique de l'indice, chargée depuis un fichier JSON versionné.
+
+    Les dates d'entrée et de sortie sont ramenées à une liste triée de bornes;
+    la composition entre deux bornes consécutives est précalculée, si bien que
+    « membres à la date D » se résout par une recherche dichotomique.
+    L'historique n'est exhaustif (entrées et sorties) qu'à partir de complete_from:
+    les dates antérieures sont ramenées à cette borne, et sans elle (None) seule la
+    composition actuelle est fiable.
+    """
+
+    def __init__(self, constituents, revision=None, updated=None, index_name="CAC 40", complete_from=None):
+        self.constituents = list(constituents)
+        self.revision = revision
+        self.updated = updated
+        self.index_name = index_name
+        self.complete_from = complete_from
+
+        self._by_symbol = {}
+        for constituent in self.constituents:
+            for symbol in constituent.symbols.values():
+                if symbol in self._by_symbol and self._by_symbol[symbol] is not constituent:
+                    raise ValueError(f"Symbole {symbol} attribué à plusieurs valeurs")
+                self._by_symbol[symbol] = constituent
+
+        # Compositions successives: _snapshots[i] vaut entre _boundaries[i - 1] et _boundaries[i]
+        self._boundaries = sorted({
+            bound
+            for constituent in self.constituents
+            for membership in constituent.memberships
+            for bound in membership if bound is not None
+        })
+        self._snapshots = [
+            tuple(c for c in self.constituents if self._is_member_on(c, i))
+            for i in range(len(self._boundaries) + 1)
+        ]
+
+    def _is_member_on(self, constituent, snapshot):
+        # Un jour représentatif de l'intervalle: la borne qui l'ouvre (date.min pour le premier)
+        day = self._boundaries[snapshot - 1] if snapshot > 0 else date.min
+        return any(
+            (start is None or start <= day) and (end is None or day < end)
+            for start, end in constituent.memberships
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_CONSTITUENTS_FILE):
+        """Lit le fichier de composition (format décrit dans son champ description)"""
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f)
+        if document.get('schema') != SCHEMA_VERSION:
+            raise ValueError(f"{path}: version de format {document.get('schema')} non prise en charge")
+        return cls(
+            [Constituent.from_dict(c) for c in document['constituents']],
+            revision=document.get('revision'),
+            updated=document.get('updated'),
+            index_name=document.get('index', "CAC 40"),
+            complete_from=_parse_date(document.get('complete_from'))
+        )
+
+    def __len__(self):
+        return len(self.constituents)
+
+    def _window(self, start, end):
+        # Fenêtre [start, end] ramenée à la partie couverte par l'historique renseigné
+        start = pd.Timestamp(start).date() if start is not None else None
+        end = pd.Timestamp(end).date() if end is not None else None
+        floor = self.complete_from if self.complete_from is not None else (end or date.today())
+        return (floor if start is None or start < floor else start), end
+
+    def constituent(self, symbol):
+        """Valeur correspondant à un symbole, quelle qu'en soit la place (None si inconnu)"""
+        return self._by_symbol.get(symbol)
+
+    def members_as_of(self, as_of=None):
+        """Composition à la date donnée (aujourd'hui par défaut): {nom: symbole de la place préférée}
+
+        Une date antérieure à complete_from est ramenée à cette borne (composition actuelle sans elle).
+        """
+        as_of = pd.Timestamp(as_of or date.today()).date()
+        as_of = max(as_of, self.complete_from or date.today())
+        snapshot = self._snapshots[bisect_right(self._boundaries, as_of)]
+        return {c.name: c.symbol for c in snapshot}
+
+    def members_between(self, start=None, end=None):
+        """Valeurs ayant appartenu à l'indice à un moment de [start, end]: {nom: symbole}"""
+        start, end = self._window(start, end)
+        return {c.name: c.symbol for c in self.constituents if c.is_member_between(start, end)}
+
+    def filter_members(self, symbols, start=None, end=None):
+        """Sépare les symboles membres de l'indice sur [start, end] des autres.
+
+        Retourne (retenus, écartés); les symboles absents du registre sont retenus
+        (valeur ajoutée à la main, autre source de données).
+        """
+        start, end = self._window(start, end)
+        kept, skipped = [], []
+        for symbol in symbols:
+            constituent = self._by_symbol.get(symbol)
+            if constituent is None or constituent.is_member_between(start, end):
+                kept.append(symbol)
+            else:
+                skipped.append(symbol)
+        return kept, skipped
+
+def period_window_start(period, today=None):
+    """Début approximatif (calendaire) de la fenêtre couverte par une période yfinance; None pour 'max'"""
+    today = pd.Timestamp(today or date.today()).normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        start = today.replace(month=1, day=1)
+    elif period.endswith("mo"):
+        start = today - pd.DateOffset(months=int(period[:-2]))
+    elif period.endswith("y"):
+        start = today - pd.DateOffset(years=int(period[:-1]))
+    elif period.endswith("d"):
+        # Périodes en jours de bourse
+        start = today - pd.offsets.BDay(int(period[:-1]))
+    else:
+        return None
+    return start.date()
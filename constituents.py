@@ -0,0 +1,94 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from difflib import get_close_matches
+
+# Secteur attribué aux entreprises dont les informations ne sont pas (encore) connues
+UNKNOWN_SECTOR = 'Non spécifié'
+
+# Nombre maximal de propositions de la recherche approchée
+FUZZY_MATCHES = 5
+
+def normalize_name(text):
+    """Texte en minuscules sans accents, pour une recherche insensible à la casse et aux accents"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+class ConstituentIndex:
+    """Index des valeurs de l'univers (nom <-> ticker, secteur -> tickers, recherche par nom).
+
+    Construit une fois à partir de la liste des valeurs et des informations
+    entreprise connues; les recherches et filtres de la barre latérale ne
+    parcourent ensuite ni cette liste ni les données collectées.
+    """
+
+    def __init__(self, tickers_dict, metadata=None):
+        metadata = metadata or {}
+        # Ordre d'origine de la liste (ordre d'affichage)
+        self.names = list(tickers_dict)
+        self.name_to_ticker = dict(tickers_dict)
+        self.ticker_names = {ticker_symbol: name for name, ticker_symbol in tickers_dict.items()}
+
+        self.ticker_sector = {
+            ticker_symbol: (metadata.get(ticker_symbol) or {}).get('Sector') or UNKNOWN_SECTOR
+            for ticker_symbol in self.ticker_names
+        }
+        self.sector_tickers = {}
+        for ticker_symbol, sector in self.ticker_sector.items():
+            self.sector_tickers.setdefault(sector, []).append(ticker_symbol)
+        self.sectors = sorted(self.sector_tickers)
+
+        # Recherche par préfixe: noms complets et mots des noms, triés (bisect)
+        self._normalized = [normalize_name(name) for name in self.names]
+        self._prefixes = sorted(
+            (key, i)
+            for i, normalized in enumerate(self._normalized)
+            for key in {normalized, *re.findall(r'\w+', normalized)}
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def ticker(self, name, default=None):
+        return self.name_to_ticker.get(name, default)
+
+    def name(self, ticker_symbol, default=None):
+        return self.ticker_names.get(ticker_symbol, default)
+
+    def sector(self, ticker_symbol):
+        return self.ticker_sector.get(ticker_symbol, UNKNOWN_SECTOR)
+
+    def names_in_sectors(self, sectors):
+        """Noms des valeurs appartenant aux secteurs donnés"""
+        return {self.ticker_names[t] for sector in sectors for t in self.sector_tickers.get(sector, [])}
+
+    def _prefix_matches(self, term):
+        start = bisect_left(self._prefixes, (term, -1))
+        matches = set()
+        for key, i in self._prefixes[start:]:
+            if not key.startswith(term):
+                break
+            matches.add(i)
+        return matches
+
+    def search(self, term):
+        """Noms correspondant au texte recherché, les plus pertinents d'abord.
+
+        Ordre: début du nom, début d'un mot du nom, texte contenu dans le nom
+        (chaque groupe dans l'ordre de la liste); à défaut, noms approchants
+        (fautes de frappe). Sans texte, tous les noms dans l'ordre d'origine.
+        """
+        term = normalize_name(term.strip())
+        if not term:
+            return list(self.names)
+
+        word_matches = self._prefix_matches(term)
+        name_matches = sorted(i for i in word_matches if self._normalized[i].startswith(term))
+        ranked = name_matches + sorted(word_matches.difference(name_matches))
+        seen = set(ranked)
+        ranked += [i for i, normalized in enumerate(self._normalized) if i not in seen and term in normalized]
+        if ranked:
+            return [self.names[i] for i in ranked]
+
+        close = get_close_matches(term, self._normalized, n=FUZZY_MATCHES, cutoff=0.6)
+        return [self.names[self._normalized.index(match)] for match in close]
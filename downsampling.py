@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# Nombre maximal de points envoyés au navigateur par série d'un graphique
+DEFAULT_MAX_POINTS = 2000
+
+def _numeric_x(x):
+    """Abscisses en float64 (nanosecondes pour les dates) pour le calcul des aires"""
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return pd.DatetimeIndex(x).asi8.astype(np.float64)
+    return np.asarray(x, dtype=np.float64)
+
+def lttb_indices(x, y, n_out):
+    """Positions des points retenus par l'algorithme Largest-Triangle-Three-Buckets.
+
+    Le premier et le dernier point sont conservés; chaque intervalle intermédiaire
+    fournit le point formant le plus grand triangle avec le point retenu précédent
+    et la moyenne de l'intervalle suivant, ce qui préserve pics et creux.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 intervalles couvrant les points 1 à n - 2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+def downsample_xy(df, column, max_points=DEFAULT_MAX_POINTS, x_column='Date'):
+    """Abscisses et ordonnées d'une série réduites par LTTB (arguments x/y d'une trace Plotly).
+
+    Les valeurs manquantes (début des moyennes mobiles, etc.) sont écartées avant
+    la réduction; sans max_points ou sous le budget, la série est renvoyée entière.
+    """
+    x, y = df[x_column], df[column]
+    if not max_points or len(df) <= max_points:
+        return dict(x=x, y=y)
+    valid = y.notna().to_numpy()
+    x, y = x[valid], y[valid]
+    indices = lttb_indices(_numeric_x(x), y.to_numpy(dtype=np.float64), max_points)
+    return dict(x=x.iloc[indices], y=y.iloc[indices])
+
+def aggregate_ohlc(df, max_points=DEFAULT_MAX_POINTS):
+    """Regroupe les barres consécutives en au plus max_points bougies (ouverture, plus haut, plus bas, clôture, volume)"""
+    if not max_points or len(df) <= max_points:
+        return df
+    bucket = np.arange(len(df)) * max_points // len(df)
+    aggregations = {'Date': 'first', 'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    aggregations = {column: how for column, how in aggregations.items() if column in df.columns}
+    return df.groupby(bucket, sort=False).agg(aggregations).reset_index(drop=True)
+
+def slice_range(df, x_range, x_column='Date'):
+    """Barres comprises dans la plage (début, fin); les bornes sans fuseau prennent celui des données"""
+    if x_range is None or df.empty:
+        return df
+    dates = df[x_column]
+    tz = getattr(dates.dt, 'tz', None)
+    bounds = []
+    for bound in x_range:
+        bound = pd.Timestamp(bound)
+        if tz is not None and bound.tzinfo is None:
+            bound = bound.tz_localize(tz)
+        elif tz is None and bound.tzinfo is not None:
+            bound = bound.tz_localize(None)
+        bounds.append(bound)
+    return df.loc[dates.between(bounds[0], bounds[1]).to_numpy()]
@@ -0,0 +1,294 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from process_pool import map_column_chunks, use_process_pool
+
+# Indicateurs produits, dans l'ordre des colonnes ajoutées aux DataFrames
+INDICATOR_COLUMNS = [
+    'MA_10', 'MA_20', 'MA_50', 'RSI',
+    'MACD', 'MACD_Signal', 'MACD_Histogram',
+    'BB_Middle', 'BB_Upper', 'BB_Lower'
+]
+
+# Nombre minimal de barres pour qu'un indicateur soit calculé (mêmes seuils que add_technical_indicators)
+MIN_BARS = {
+    'MA_10': 10, 'MA_20': 20, 'MA_50': 50, 'RSI': 14,
+    'MACD': 26, 'MACD_Signal': 26, 'MACD_Histogram': 26,
+    'BB_Middle': 20, 'BB_Upper': 20, 'BB_Lower': 20
+}
+
+def stack_closes(frames):
+    """Empile les cours de clôture de chaque ticker en une matrice (position x ticker).
+
+    Chaque colonne contient les barres du ticker à partir de la ligne 0, complétées
+    par des NaN en fin de colonne: les calculs glissants d'un ticker ne voient donc
+    que ses propres barres, exactement comme sur son DataFrame individuel.
+    """
+    tickers = list(frames)
+    lengths = np.array([len(frames[t]) for t in tickers], dtype=int)
+    matrix = np.full((lengths.max() if len(tickers) else 0, len(tickers)), np.nan)
+    for j, ticker_symbol in enumerate(tickers):
+        matrix[:lengths[j], j] = frames[ticker_symbol]['Close'].to_numpy(dtype=np.float64)
+    return pd.DataFrame(matrix, columns=tickers), lengths
+
+def compute_indicators(close):
+    """Calcule tous les indicateurs en une passe vectorisée sur une matrice de clôtures (position x ticker)"""
+    indicators = {}
+
+    # Moyennes mobiles
+    indicators['MA_10'] = close.rolling(window=10, min_periods=1).mean()
+    indicators['MA_20'] = close.rolling(window=20, min_periods=1).mean()
+    indicators['MA_50'] = close.rolling(window=50, min_periods=1).mean()
+
+    # RSI (Relative Strength Index)
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14, min_periods=1).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14, min_periods=1).mean()
+    rs = np.where(loss == 0, np.inf, gain / loss)
+    indicators['RSI'] = pd.DataFrame(100 - (100 / (1 + rs)), columns=close.columns)
+
+    # MACD
+    exp1 = close.ewm(span=12, adjust=False).mean()
+    exp2 = close.ewm(span=26, adjust=False).mean()
+    indicators['MACD'] = exp1 - exp2
+    indicators['MACD_Signal'] = indicators['MACD'].ewm(span=9, adjust=False).mean()
+    indicators['MACD_Histogram'] = indicators['MACD'] - indicators['MACD_Signal']
+
+    # Bandes de Bollinger
+    indicators['BB_Middle'] = close.rolling(window=20).mean()
+    bb_std = close.rolling(window=20).std()
+    indicators['BB_Upper'] = indicators['BB_Middle'] + (bb_std * 2)
+    indicators['BB_Lower'] = indicators['BB_Middle'] - (bb_std * 2)
+
+    return indicators
+
+def indicator_arrays(close):
+    """Indicateurs d'une matrice de clôtures (ndarray position x ticker), empilés dans l'ordre de INDICATOR_COLUMNS"""
+    indicators = compute_indicators(pd.DataFrame(close))
+    return np.stack([indicators[name].to_numpy() for name in INDICATOR_COLUMNS])
+
+def add_indicators_to_frames(frames, processes=None):
+    """Ajoute les indicateurs techniques à un dict ticker -> DataFrame en un seul calcul vectorisé.
+
+    Sur les grands univers (nombre de tickers x profondeur d'historique), le calcul est
+    réparti par blocs de tickers entre `processes` processus (voir process_pool);
+    None reprend la valeur par défaut (CAC40_COMPUTE_PROCESSES).
+    """
+    eligible = {t: df for t, df in frames.items() if len(df) >= 2 and 'Close' in df.columns}
+    if not eligible:
+        return frames
+
+    close, lengths = stack_closes(eligible)
+    if use_process_pool(close.shape, processes):
+        indicators = dict(zip(INDICATOR_COLUMNS, map_column_chunks(
+            indicator_arrays, close.to_numpy(), len(INDICATOR_COLUMNS), processes)))
+    else:
+        indicators = {name: values.to_numpy() for name, values in compute_indicators(close).items()}
+
+    result = dict(frames)
+    for j, ticker_symbol in enumerate(eligible):
+        df = eligible[ticker_symbol]
+        length = lengths[j]
+        # Une seule concaténation par ticker plutôt qu'une insertion par colonne
+        columns = {
+            name: indicators[name][:length, j]
+            for name in INDICATOR_COLUMNS
+            if length >= MIN_BARS[name]
+        }
+        result[ticker_symbol] = pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+    return result
+
+# Profondeur d'historique nécessaire pour que tous les indicateurs existent
+STATE_MIN_BARS = max(MIN_BARS.values())
+
+class IndicatorState:
+    """État courant des indicateurs d'un ticker, avancé barre par barre en temps constant.
+
+    L'état conserve les moyennes exponentielles du MACD et de sa ligne de signal,
+    les sommes glissantes (et sommes des carrés) des moyennes mobiles et des bandes
+    de Bollinger, et les cumuls de hausses/baisses du RSI: le coût d'une mise à jour
+    ne dépend que du nombre de nouvelles barres, pas de la longueur de l'historique.
+    """
+
+    WINDOWS = (10, 20, 50)
+    RSI_WINDOW = 14
+    BB_WINDOW = 20
+    FAST_SPAN, SLOW_SPAN, SIGNAL_SPAN = 12, 26, 9
+
+    def __init__(self, closes, ema_fast, ema_slow, signal, last_date=None):
+        """closes: historique complet (ou au moins les STATE_MIN_BARS dernières clôtures et le nombre total)"""
+        closes = np.asarray(closes, dtype=np.float64)
+        self.count = len(closes)
+        self.last_date = last_date
+        self.window = deque(closes[-max(self.WINDOWS):].tolist(), maxlen=max(self.WINDOWS))
+        self.sums = {w: float(np.sum(closes[-w:])) for w in self.WINDOWS}
+        self.sum_squares = float(np.sum(closes[-self.BB_WINDOW:] ** 2))
+
+        # Hausses/baisses des RSI_WINDOW dernières barres (la première barre compte pour 0)
+        deltas = np.diff(closes[-(self.RSI_WINDOW + 1):])
+        if self.count <= self.RSI_WINDOW:
+            deltas = np.concatenate([[0.0], deltas])
+        self.gains = deque(np.where(deltas > 0, deltas, 0.0).tolist(), maxlen=self.RSI_WINDOW)
+        self.losses = deque(np.where(deltas < 0, -deltas, 0.0).tolist(), maxlen=self.RSI_WINDOW)
+        self.gain_sum = float(np.sum(self.gains))
+        self.loss_sum = float(np.sum(self.losses))
+
+        self.ema_fast = ema_fast
+        self.ema_slow = ema_slow
+        self.signal = signal
+
+    @staticmethod
+    def _alpha(span):
+        return 2.0 / (span + 1.0)
+
+    def copy(self):
+        """Copie indépendante de l'état"""
+        clone = IndicatorState.__new__(IndicatorState)
+        clone.__dict__.update(self.__dict__)
+        clone.window = deque(self.window, maxlen=self.window.maxlen)
+        clone.sums = dict(self.sums)
+        clone.gains = deque(self.gains, maxlen=self.gains.maxlen)
+        clone.losses = deque(self.losses, maxlen=self.losses.maxlen)
+        return clone
+
+    def push(self, close):
+        """Avance l'état d'une barre et retourne les valeurs des indicateurs pour cette barre"""
+        close = float(close)
+        previous_close = self.window[-1]
+
+        # Sommes glissantes: retrait de la barre qui sort de chaque fenêtre
+        for w in self.WINDOWS:
+            if len(self.window) >= w:
+                self.sums[w] -= self.window[-w]
+        if len(self.window) >= self.BB_WINDOW:
+            self.sum_squares -= self.window[-self.BB_WINDOW] ** 2
+        self.window.append(close)
+        for w in self.WINDOWS:
+            self.sums[w] += close
+        self.sum_squares += close ** 2
+        self.count += 1
+
+        # Cumuls du RSI
+        delta = close - previous_close
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        if len(self.gains) == self.RSI_WINDOW:
+            self.gain_sum -= self.gains[0]
+            self.loss_sum -= self.losses[0]
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.gain_sum += gain
+        self.loss_sum += loss
+
+        # Moyennes exponentielles (adjust=False)
+        self.ema_fast += self._alpha(self.FAST_SPAN) * (close - self.ema_fast)
+        self.ema_slow += self._alpha(self.SLOW_SPAN) * (close - self.ema_slow)
+        macd = self.ema_fast - self.ema_slow
+        self.signal += self._alpha(self.SIGNAL_SPAN) * (macd - self.signal)
+
+        values = {f'MA_{w}': self.sums[w] / min(self.count, w) for w in self.WINDOWS}
+
+        # Une fenêtre sans aucune baisse donne un RSI de 100, comme dans le calcul complet
+        if not any(self.losses):
+            values['RSI'] = 100.0
+        else:
+            rs = (self.gain_sum / len(self.gains)) / (self.loss_sum / len(self.losses))
+            values['RSI'] = 100 - (100 / (1 + rs))
+
+        values['MACD'] = macd
+        values['MACD_Signal'] = self.signal
+        values['MACD_Histogram'] = macd - self.signal
+
+        n = self.BB_WINDOW
+        middle = self.sums[n] / n
+        variance = max((self.sum_squares - self.sums[n] ** 2 / n) / (n - 1), 0.0)
+        values['BB_Middle'] = middle
+        values['BB_Upper'] = middle + 2 * np.sqrt(variance)
+        values['BB_Lower'] = middle - 2 * np.sqrt(variance)
+        return values
+
+def build_indicator_states(frames):
+    """Construit l'état incrémental de chaque ticker, arrêté à l'avant-dernière barre.
+
+    La dernière barre peut encore être en formation: elle est recalculée à chaque
+    mise à jour à partir de cet état. Les tickers trop courts ou comportant des
+    clôtures manquantes n'ont pas d'état (recalcul complet).
+    """
+    eligible = {
+        t: df for t, df in frames.items()
+        if len(df) > STATE_MIN_BARS and 'Close' in df.columns and df['Close'].notna().all()
+    }
+    if not eligible:
+        return {}
+
+    # Moyennes exponentielles de tous les tickers en une passe vectorisée
+    close, lengths = stack_closes(eligible)
+    ema_fast = close.ewm(span=IndicatorState.FAST_SPAN, adjust=False).mean().to_numpy()
+    ema_slow = close.ewm(span=IndicatorState.SLOW_SPAN, adjust=False).mean().to_numpy()
+    signal = (close.ewm(span=IndicatorState.FAST_SPAN, adjust=False).mean()
+              - close.ewm(span=IndicatorState.SLOW_SPAN, adjust=False).mean()
+              ).ewm(span=IndicatorState.SIGNAL_SPAN, adjust=False).mean().to_numpy()
+
+    states = {}
+    for j, ticker_symbol in enumerate(eligible):
+        df = eligible[ticker_symbol]
+        last = lengths[j] - 2
+        states[ticker_symbol] = IndicatorState(
+            df['Close'].to_numpy()[:last + 1],
+            ema_fast[last, j], ema_slow[last, j], signal[last, j],
+            last_date=df['Date'].iloc[last]
+        )
+    return states
+
+def extend_indicators(previous, new_frame, state):
+    """Complète les indicateurs de new_frame à partir du calcul précédent et de l'état incrémental.
+
+    previous: DataFrame déjà enrichi des indicateurs (colonne 'Date')
+    new_frame: nouvel historique brut, dont le début recouvre previous
+    Retourne (DataFrame enrichi, nouvel état) ou None si un recalcul complet est nécessaire.
+    """
+    if state is None or previous is None or previous.empty or new_frame.empty:
+        return None
+    if any(column not in previous.columns for column in INDICATOR_COLUMNS):
+        return None
+
+    dates = new_frame['Date']
+    head_mask = (dates <= state.last_date).to_numpy()
+    tail = new_frame[~head_mask]
+    if tail.empty or tail['Close'].isna().any():
+        return None
+
+    # La barre de référence doit être inchangée (sinon les cours ajustés ont été révisés)
+    previous_by_date = previous.set_index('Date')
+    if state.last_date not in previous_by_date.index or not (dates == state.last_date).any():
+        return None
+    reference_close = new_frame.loc[(dates == state.last_date).to_numpy(), 'Close'].iloc[0]
+    if not np.isclose(previous_by_date.at[state.last_date, 'Close'], reference_close, rtol=1e-4):
+        return None
+
+    # Barres déjà calculées: reprise des valeurs précédentes
+    head = new_frame[head_mask]
+    head_indicators = previous_by_date[INDICATOR_COLUMNS].reindex(head['Date'])
+    if head_indicators.isna().all(axis=1).any():
+        return None
+
+    # Nouvelles barres: avancement de l'état, la dernière barre restant provisoire
+    work = state.copy()
+    committed = state
+    rows = []
+    tail_closes = tail['Close'].to_numpy()
+    for i, close in enumerate(tail_closes):
+        if i == len(tail_closes) - 1:
+            committed = work.copy()
+            committed.last_date = tail['Date'].iloc[i - 1] if i > 0 else state.last_date
+        rows.append(work.push(close))
+
+    indicator_values = np.vstack([
+        head_indicators.to_numpy(dtype=np.float64),
+        pd.DataFrame(rows, columns=INDICATOR_COLUMNS).to_numpy(dtype=np.float64)
+    ])
+    frame = pd.concat(
+        [new_frame.reset_index(drop=True),
+         pd.DataFrame(indicator_values, columns=INDICATOR_COLUMNS)],
+        axis=1
+    )
+    return frame, committed
@@ -0,0 +1,365 @@
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+from bar_store import DEFAULT_STORE_DIR, select_period
+from company_metadata import default_metadata, fetch_company_metadata
+from market_panel import MARKET_TIMEZONE
+
+# Source utilisée par défaut (surchargeable par variable d'environnement, ex: "synthetic:tickers=500")
+DEFAULT_PROVIDER_SPEC = os.environ.get("CAC40_DATA_PROVIDER", "yfinance")
+
+# Colonnes renvoyées par toutes les sources, identiques à Ticker.history de yfinance
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Fin des séries synthétiques: fixe pour que deux exécutions produisent les mêmes barres
+SYNTHETIC_END = "2026-01-02 17:30"
+
+# Nombre maximal de barres synthétiques par intervalle (dates représentables par pandas)
+SYNTHETIC_MAX_BARS = {'1wk': 5200, '1mo': 1200}
+
+# Secteurs attribués aux tickers synthétiques
+SYNTHETIC_SECTORS = [
+    'Industrials', 'Financial Services', 'Consumer Cyclical', 'Healthcare', 'Technology',
+    'Energy', 'Basic Materials', 'Consumer Defensive', 'Utilities', 'Communication Services', 'Real Estate'
+]
+
+class MarketDataProvider(ABC):
+    """Source de cotations utilisée par la collecte.
+
+    history() renvoie l'historique OHLCV d'un symbole au format de Ticker.history
+    (auto_adjust=True), depuis start si donné, sinon sur la période demandée.
+    download() récupère un groupe de symboles en un seul aller-retour.
+    """
+
+    name = "provider"
+
+    @abstractmethod
+    def history(self, symbol, period, interval, start=None):
+        """Historique OHLCV d'un symbole (DataFrame vide s'il n'y a pas de données)"""
+
+    def download(self, symbols, period, interval, start=None, max_workers=5):
+        """Historiques d'un groupe de symboles: dict symbole -> DataFrame (symboles sans données absents)"""
+        histories = {}
+        for symbol in symbols:
+            data = self.history(symbol, period, interval, start)
+            if not data.empty:
+                histories[symbol] = data
+        return histories
+
+    def company_info(self, symbol):
+        """Nom, secteur, capitalisation et devise d'un symbole"""
+        return default_metadata(symbol)
+
+    def list_tickers(self):
+        """Univers propre à la source (nom -> symbole), None pour la liste CAC 40 habituelle"""
+        return None
+
+class YFinanceProvider(MarketDataProvider):
+    """Cotations Yahoo Finance via yfinance"""
+
+    name = "yfinance"
+
+    def history(self, symbol, period, interval, start=None):
+        import yfinance as yf
+        span = {'start': start} if start is not None else {'period': period}
+        return yf.Ticker(symbol).history(**span, interval=interval, auto_adjust=True, prepost=True)
+
+    def download(self, symbols, period, interval, start=None, max_workers=5):
+        import yfinance as yf
+        # Avec une date de début, seul le complément depuis cette date est demandé
+        span = {'start': start} if start is not None else {'period': period}
+        raw = yf.download(
+            symbols,
+            **span,
+            interval=interval,
+            group_by='ticker',
+            auto_adjust=True,
+            prepost=True,
+            actions=True,
+            ignore_tz=False,
+            threads=max_workers,
+            progress=False
+        )
+
+        histories = {}
+        if raw is None or raw.empty or not isinstance(raw.columns, pd.MultiIndex):
+            return histories
+
+        # Harmonisation du fuseau: un lot mêlant .PA et .AS est renvoyé en UTC
+        if raw.index.tz is not None:
+            raw.index = raw.index.tz_convert(MARKET_TIMEZONE)
+
+        available = set(raw.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol not in available:
+                continue
+            # Les lignes vides correspondent aux barres des autres tickers du lot
+            data = raw[symbol].dropna(subset=['Close'])
+            if not data.empty:
+                histories[symbol] = data
+
+        return histories
+
+    def company_info(self, symbol):
+        return fetch_company_metadata(symbol)
+
+class SimulatedLatency:
+    """Délai simulé d'un aller-retour réseau (latence fixe plus gigue aléatoire reproductible)"""
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.latency <= 0 and self.jitter <= 0:
+            return
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        time.sleep(delay)
+
+def _slice_bars(bars, period, start):
+    """Fenêtre d'un historique complet: depuis start si donné, sinon sur la période"""
+    if start is None or bars.empty:
+        return select_period(bars, period)
+    start = pd.Timestamp(start)
+    if bars.index.tz is not None:
+        start = start.tz_localize(bars.index.tz) if start.tzinfo is None else start.tz_convert(bars.index.tz)
+    return bars[bars.index >= start]
+
+def read_bars(path):
+    """Lit un fichier de barres Parquet ou CSV (première colonne: horodatage)"""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    bars = pd.read_csv(path, index_col=0)
+    try:
+        index = pd.to_datetime(bars.index)
+    except ValueError:
+        # Décalages horaires différents (changement d'heure): normalisation via UTC
+        index = pd.to_datetime(bars.index, utc=True)
+    bars.index = index.tz_localize(MARKET_TIMEZONE) if index.tz is None else index.tz_convert(MARKET_TIMEZONE)
+    bars.index.name = 'Date'
+    return bars
+
+class ReplayProvider(MarketDataProvider):
+    """Rejeu de barres enregistrées, sans réseau.
+
+    Les fichiers sont cherchés dans root/<intervalle>/<symbole>.parquet (disposition
+    du stock local BarStore, qui peut donc être rejoué tel quel), puis .csv, puis
+    directement dans root. Les informations entreprise sont lues dans
+    root/metadata.json (format du cache d'informations entreprise) s'il existe.
+    Chaque appel attend la latence simulée avant de répondre.
+    """
+
+    name = "replay"
+
+    def __init__(self, root=DEFAULT_STORE_DIR, latency=0.0, jitter=0.0, seed=0):
+        self.root = root
+        self.latency = SimulatedLatency(latency, jitter, seed)
+        self._bars = {}
+        self._lock = threading.Lock()
+        self._metadata = None
+
+    def _path(self, symbol, interval):
+        safe_symbol = symbol.replace("/", "_").replace("^", "_")
+        for directory in (os.path.join(self.root, interval), self.root):
+            for extension in (".parquet", ".csv"):
+                path = os.path.join(directory, safe_symbol + extension)
+                if os.path.exists(path):
+                    return path
+        return None
+
+    def _load(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key in self._bars:
+                return self._bars[key]
+        path = self._path(symbol, interval)
+        try:
+            bars = read_bars(path) if path is not None else pd.DataFrame(columns=OHLCV_COLUMNS)
+        except Exception:
+            bars = pd.DataFrame(columns=OHLCV_COLUMNS)
+        bars.attrs = {}
+        with self._lock:
+            self._bars[key] = bars
+        return bars
+
+    def history(self, symbol, period, interval, start=None):
+        self.latency.wait()
+        return _slice_bars(self._load(symbol, interval), period, start)
+
+    def download(self, symbols, period, interval, start=None, max_workers=5):
+        self.latency.wait()
+        histories = {}
+        for symbol in symbols:
+            data = _slice_bars(self._load(symbol, interval), period, start)
+            if not data.empty:
+                histories[symbol] = data
+        return histories
+
+    def _load_metadata(self):
+        if self._metadata is None:
+            try:
+                with open(os.path.join(self.root, "metadata.json"), encoding="utf-8") as f:
+                    stored = json.load(f)
+                self._metadata = {t: e.get('metadata', e) for t, e in stored.items()}
+            except Exception:
+                self._metadata = {}
+        return self._metadata
+
+    def company_info(self, symbol):
+        return dict(self._load_metadata().get(symbol) or default_metadata(symbol))
+
+    def list_tickers(self):
+        symbols = set()
+        for directory, _, files in os.walk(self.root):
+            symbols.update(os.path.splitext(f)[0] for f in files if f.endswith((".parquet", ".csv")))
+        metadata = self._load_metadata()
+        return {
+            (metadata.get(symbol) or {}).get('Company_Name', symbol): symbol
+            for symbol in sorted(symbols)
+        }
+
+def synthetic_index(interval, n_bars, end=SYNTHETIC_END):
+    """Horodatages de n_bars barres se terminant à end (séances de 9h à 17h30 en intraday)"""
+    end = pd.Timestamp(end)
+    if interval == '1wk':
+        return pd.date_range(end=end.normalize(), periods=n_bars, freq='W-MON', tz=MARKET_TIMEZONE)
+    if interval == '1mo':
+        return pd.date_range(end=end.normalize(), periods=n_bars, freq='MS', tz=MARKET_TIMEZONE)
+    if not interval.endswith(('m', 'h')):
+        return pd.bdate_range(end=end.normalize(), periods=n_bars, tz=MARKET_TIMEZONE)
+
+    step = pd.Timedelta(interval.replace('m', 'min'))
+    per_day = int(pd.Timedelta(hours=8, minutes=30) / step)
+    days = pd.bdate_range(end=end.normalize(), periods=n_bars // per_day + 2)
+    offsets = pd.Timedelta(hours=9) + pd.timedelta_range(0, periods=per_day, freq=step)
+    stamps = (days.values[:, None] + offsets.values[None, :]).ravel()
+    index = pd.DatetimeIndex(stamps).tz_localize(MARKET_TIMEZONE)
+    return index[index <= end.tz_localize(MARKET_TIMEZONE)][-n_bars:]
+
+class SyntheticProvider(MarketDataProvider):
+    """Cotations synthétiques (mouvement brownien géométrique), sans réseau.
+
+    Les séries sont déterministes: un même symbole, intervalle et graine donnent
+    toujours les mêmes barres, quel que soit le processus. Tous les symboles sont
+    acceptés; list_tickers() propose un univers de n_tickers valeurs.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, n_tickers=40, n_bars=5000, seed=0, end=SYNTHETIC_END,
+                 drift=0.05, volatility=0.25, latency=0.0, jitter=0.0):
+        self.n_tickers = n_tickers
+        self.n_bars = n_bars
+        self.seed = seed
+        self.end = end
+        self.drift = drift
+        self.volatility = volatility
+        self.latency = SimulatedLatency(latency, jitter, seed)
+
+    def _rng(self, symbol, *salt):
+        # crc32 plutôt que hash(): stable d'un processus à l'autre
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode())] + [zlib.crc32(s.encode()) for s in salt])
+
+    def generate(self, symbol, interval):
+        """Historique synthétique complet d'un symbole"""
+        n_bars = min(self.n_bars, SYNTHETIC_MAX_BARS.get(interval, self.n_bars))
+        index = synthetic_index(interval, n_bars, self.end)
+        n_bars = len(index)
+        rng = self._rng(symbol, interval)
+
+        # Durée d'une barre en années de bourse (252 séances de 8h30)
+        if interval.endswith(('m', 'h')):
+            dt = pd.Timedelta(interval.replace('m', 'min')) / pd.Timedelta(hours=8.5) / 252
+        else:
+            dt = {'1wk': 1 / 52, '1mo': 1 / 12}.get(interval, 1 / 252)
+
+        start_price = self._rng(symbol).uniform(10, 400)
+        returns = (self.drift - 0.5 * self.volatility ** 2) * dt + self.volatility * np.sqrt(dt) * rng.standard_normal(n_bars)
+        close = start_price * np.exp(np.cumsum(returns))
+        open_ = np.concatenate(([start_price], close[:-1])) * np.exp(rng.normal(0, 0.1 * self.volatility * np.sqrt(dt), n_bars))
+        spread = np.abs(rng.normal(0, 0.5 * self.volatility * np.sqrt(dt), n_bars))
+        bars = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread),
+            'Low': np.minimum(open_, close) * (1 - spread),
+            'Close': close,
+            'Volume': np.floor(rng.lognormal(12, 0.5, n_bars)),
+            'Dividends': 0.0,
+            'Stock Splits': 0.0
+        }, index=index)
+        bars.index.name = 'Datetime' if interval.endswith(('m', 'h')) else 'Date'
+        return bars
+
+    def history(self, symbol, period, interval, start=None):
+        self.latency.wait()
+        return _slice_bars(self.generate(symbol, interval), period, start)
+
+    def download(self, symbols, period, interval, start=None, max_workers=5):
+        self.latency.wait()
+        return {symbol: _slice_bars(self.generate(symbol, interval), period, start) for symbol in symbols}
+
+    def company_info(self, symbol):
+        rng = self._rng(symbol, 'info')
+        return {
+            'Company_Name': f"{symbol.split('.')[0]} Synthétique",
+            'Sector': SYNTHETIC_SECTORS[int(rng.integers(len(SYNTHETIC_SECTORS)))],
+            'Market_Cap': float(np.round(10 ** rng.uniform(9, 11.5), -6)),
+            'Currency': 'EUR'
+        }
+
+    def list_tickers(self):
+        width = len(str(self.n_tickers))
+        symbols = [f"SYN{i:0{width}d}.PA" for i in range(1, self.n_tickers + 1)]
+        return {f"Synthétique {symbol[3:-3]}": symbol for symbol in symbols}
+
+def parse_provider_spec(spec):
+    """Décompose une spécification de source ("replay:data/bars,latency=0.05") en (type, options)"""
+    kind, _, arguments = spec.partition(':')
+    options = {}
+    for argument in filter(None, arguments.split(',')):
+        key, separator, value = argument.partition('=')
+        if not separator:
+            # Argument positionnel: répertoire du rejeu
+            options['root'] = key
+        else:
+            options[key.strip()] = value.strip()
+    return kind.strip() or "yfinance", options
+
+def provider_from_spec(spec=DEFAULT_PROVIDER_SPEC):
+    """Crée la source décrite par la spécification.
+
+    - "yfinance"
+    - "replay[:<répertoire>][,latency=<s>][,jitter=<s>][,seed=<n>]"
+    - "synthetic[:tickers=<n>][,bars=<n>][,seed=<n>][,latency=<s>][,jitter=<s>]"
+    """
+    kind, options = parse_provider_spec(spec)
+    if kind == "yfinance":
+        return YFinanceProvider()
+    if kind == "replay":
+        return ReplayProvider(
+            root=options.get('root', DEFAULT_STORE_DIR),
+            latency=float(options.get('latency', 0)),
+            jitter=float(options.get('jitter', 0)),
+            seed=int(options.get('seed', 0))
+        )
+    if kind == "synthetic":
+        return SyntheticProvider(
+            n_tickers=int(options.get('tickers', 40)),
+            n_bars=int(options.get('bars', 5000)),
+            seed=int(options.get('seed', 0)),
+            latency=float(options.get('latency', 0)),
+            jitter=float(options.get('jitter', 0))
+        )
+    raise ValueError(f"Source de données inconnue: {kind}")
+
+# Source Yahoo Finance partagée, utilisée par défaut par les fonctions de collecte
+DEFAULT_PROVIDER = YFinanceProvider()
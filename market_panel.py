@@ -0,0 +1,148 @@
+from collections.abc import Mapping
+from itertools import count
+import numpy as np
+import pandas as pd
+
+# Fuseau commun des places Euronext (Paris, Amsterdam) pour aligner les tickers sur un même index
+MARKET_TIMEZONE = "Europe/Paris"
+
+# Colonnes d'informations entreprise, stockées une seule fois par ticker
+METADATA_COLUMNS = ['Company_Name', 'Sector', 'Market_Cap', 'Currency']
+
+# Compteur des panneaux construits dans le processus (version des données)
+_PANEL_VERSIONS = count(1)
+
+def metadata_table(metadata, tickers):
+    """Table des informations entreprise (une ligne par ticker) à partir d'un dict ticker -> informations"""
+    table = pd.DataFrame.from_dict(
+        {t: metadata.get(t, {}) for t in tickers},
+        orient='index'
+    ).reindex(index=list(tickers), columns=METADATA_COLUMNS)
+    table.index.name = 'Ticker'
+    return table
+
+def compact_frame(df):
+    """Convertit les colonnes numériques d'un DataFrame en float32"""
+    numeric = df.select_dtypes(include='number').columns
+    return df.astype({column: np.float32 for column in numeric})
+
+class MarketPanel(Mapping):
+    """Représentation compacte des données collectées.
+
+    - metadata: une ligne par ticker (nom, secteur, capitalisation, devise)
+    - bars: panneau float32 des prix et indicateurs, colonnes (champ, ticker)
+      sur un DatetimeIndex partagé par tous les tickers
+    - indicator_states: état incrémental des indicateurs par ticker (voir indicators.IndicatorState)
+    - metadata_version: version du cache d'informations entreprise lue à la construction
+      (None si les informations ne viennent pas du cache), voir with_metadata()
+
+    Le panneau se comporte comme un dictionnaire ticker -> DataFrame: chaque accès
+    reconstruit à la volée le DataFrame du ticker (avec une colonne 'Date').
+    Un panneau n'est jamais modifié après construction: son attribut version,
+    unique dans le processus, identifie les données (ex: clé de cache des graphiques).
+    Les tableaux qui en dérivent sont mémorisés par derived() pour toute sa durée de vie.
+    """
+
+    def __init__(self, bars, metadata, indicator_states=None, interval=None, metadata_version=None):
+        self.bars = bars
+        self.metadata = metadata
+        self.indicator_states = indicator_states or {}
+        self.interval = interval
+        self.metadata_version = metadata_version
+        self._tickers = list(metadata.index)
+        self.version = next(_PANEL_VERSIONS)
+        self._derived = {}
+
+    @classmethod
+    def from_frames(cls, frames, metadata=None, indicator_states=None, interval=None, metadata_version=None):
+        """Construit le panneau à partir de DataFrames par ticker et d'un dict ticker -> informations"""
+        metadata = metadata or {}
+        fields = []
+        series_by_ticker = {}
+        for ticker_symbol, df in frames.items():
+            if df.empty:
+                continue
+            df = df.set_index('Date') if 'Date' in df.columns else df
+            if getattr(df.index, 'tz', None) is not None:
+                df = df.tz_convert(MARKET_TIMEZONE)
+            df = df[~df.index.duplicated(keep='last')].select_dtypes(include='number')
+            series_by_ticker[ticker_symbol] = df
+            fields.extend(field for field in df.columns if field not in fields)
+
+        # Colonnes ordonnées par champ puis par ticker: bars['Close'] donne directement la matrice temps x ticker
+        columns = {
+            (field, ticker_symbol): df[field]
+            for field in fields
+            for ticker_symbol, df in series_by_ticker.items()
+            if field in df.columns
+        }
+        if columns:
+            bars = pd.concat(columns, axis=1).sort_index().astype(np.float32)
+        else:
+            bars = pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Field', 'Ticker']), dtype=np.float32)
+        bars.columns.names = ['Field', 'Ticker']
+        bars.index.name = 'Date'
+
+        return cls(bars, metadata_table(metadata, list(series_by_ticker)), indicator_states, interval, metadata_version)
+
+    def __getitem__(self, ticker_symbol):
+        if ticker_symbol not in self.metadata.index:
+            raise KeyError(ticker_symbol)
+        frame = self.bars.xs(ticker_symbol, axis=1, level='Ticker')
+        # Les lignes vides correspondent aux barres des autres tickers
+        frame = frame.dropna(how='all').reset_index()
+        frame.columns.name = None
+        return frame
+
+    def __iter__(self):
+        return iter(self._tickers)
+
+    def __len__(self):
+        return len(self._tickers)
+
+    def __contains__(self, ticker_symbol):
+        return ticker_symbol in self.metadata.index
+
+    def field(self, name):
+        """Matrice temps x ticker d'un champ (ex: 'Close', 'RSI')"""
+        return self.bars[name]
+
+    def meta(self, ticker_symbol, column, default=None):
+        """Information entreprise d'un ticker (valeur par défaut si absente)"""
+        try:
+            value = self.metadata.at[ticker_symbol, column]
+        except KeyError:
+            return default
+        return default if pd.isna(value) else value
+
+    def derived(self, key, build):
+        """Résultat mémorisé d'un calcul sur le panneau (build() n'est appelé qu'au premier accès à la clé)"""
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
+
+    def select(self, tickers):
+        """Panneau restreint aux tickers donnés, dans cet ordre (les tickers absents sont ignorés)"""
+        tickers = [t for t in tickers if t in self.metadata.index]
+        bars = self.bars.loc[:, self.bars.columns.get_level_values('Ticker').isin(tickers)].dropna(how='all')
+        states = {t: state for t, state in self.indicator_states.items() if t in tickers}
+        return MarketPanel(bars, self.metadata.loc[tickers], states, self.interval, self.metadata_version)
+
+    def with_metadata(self, metadata, metadata_version=None):
+        """Même panneau (barres et états partagés, sans copie) avec de nouvelles informations entreprise.
+
+        Le panneau retourné a sa propre version: les graphiques et tableaux qui
+        dépendent des informations (secteurs, capitalisations) sont recalculés.
+        """
+        return MarketPanel(self.bars, metadata_table(metadata, self._tickers), self.indicator_states,
+                           self.interval, metadata_version)
+
+    def row_counts(self):
+        """Nombre de barres par ticker"""
+        if self.bars.empty:
+            return pd.Series(0, index=self.metadata.index)
+        return self.bars['Close'].notna().sum()
+
+    def memory_usage(self):
+        """Empreinte mémoire du panneau en octets"""
+        return int(self.bars.memory_usage(deep=True).sum() + self.metadata.memory_usage(deep=True).sum())
@@ -0,0 +1,247 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+import pandas as pd
+
+# Fichier texte au format Prometheus (surchargeable par variable d'environnement, vide pour désactiver)
+DEFAULT_METRICS_FILE = os.environ.get(
+    "CAC40_METRICS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "metrics.prom")
+)
+
+# Intervalle minimal (secondes) entre deux réécritures du fichier Prometheus
+METRICS_WRITE_INTERVAL = float(os.environ.get("CAC40_METRICS_WRITE_INTERVAL", 15))
+
+# Exécutions journalisées en JSON (les rendus, un par relance du script, ne sont que cumulés)
+LOGGED_EVENTS = ("collection",)
+
+# Bornes (secondes) des histogrammes de durée par étape
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Journal structuré: une ligne JSON par collecte observée
+logger = logging.getLogger("cac40.metrics")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+class StageTimings:
+    """Durées mesurées pendant une exécution (collecte, rendu), par étape et par ticker.
+
+    Utilisable depuis plusieurs threads; chaque mesure est un tuple
+    (étape, ticker ou None, durée en secondes).
+    """
+
+    def __init__(self, kind="collection"):
+        self.kind = kind
+        self.records = []
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, stage, duration, ticker=None):
+        with self._lock:
+            self.records.append((stage, ticker, duration))
+
+    @contextmanager
+    def time(self, stage, ticker=None):
+        """Mesure la durée du bloc sous le nom d'étape donné"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, ticker)
+
+    def items(self):
+        """Copie des mesures (étape, ticker, durée)"""
+        with self._lock:
+            return list(self.records)
+
+    def frame(self):
+        """Mesures sous forme de DataFrame (Étape, Ticker, Durée (s))"""
+        return pd.DataFrame(self.items(), columns=['Étape', 'Ticker', 'Durée (s)'])
+
+    def summary(self):
+        """Synthèse par étape: nombre de mesures, durée totale et maximale, ticker le plus lent"""
+        df = self.frame()
+        if df.empty:
+            return pd.DataFrame(columns=['Étape', 'Mesures', 'Total (s)', 'Max (s)', 'Ticker le plus lent'])
+        slowest = df.loc[df.groupby('Étape')['Durée (s)'].idxmax(), ['Étape', 'Ticker']].set_index('Étape')['Ticker']
+        summary = df.groupby('Étape')['Durée (s)'].agg(['count', 'sum', 'max'])
+        summary.columns = ['Mesures', 'Total (s)', 'Max (s)']
+        summary['Ticker le plus lent'] = slowest
+        return summary.sort_values('Total (s)', ascending=False).reset_index()
+
+    def by_ticker(self):
+        """Durées par ticker (lignes) et par étape (colonnes), du ticker le plus lent au plus rapide"""
+        df = self.frame().dropna(subset=['Ticker'])
+        if df.empty:
+            return pd.DataFrame()
+        table = df.pivot_table(index='Ticker', columns='Étape', values='Durée (s)', aggfunc='sum')
+        return table.loc[table.sum(axis=1).sort_values(ascending=False).index]
+
+    def to_log(self, **extra):
+        """Représentation structurée (JSON) de l'exécution"""
+        summary = self.summary()
+        return {
+            'event': self.kind,
+            'started_at': self.started_at,
+            **extra,
+            'stages': {
+                row['Étape']: {
+                    'count': int(row['Mesures']),
+                    'total_s': round(float(row['Total (s)']), 6),
+                    'max_s': round(float(row['Max (s)']), 6),
+                    'slowest_ticker': row['Ticker le plus lent'] if pd.notna(row['Ticker le plus lent']) else None
+                }
+                for _, row in summary.iterrows()
+            }
+        }
+
+def stage_timer(timings, stage, ticker=None):
+    """Contexte de mesure d'une étape; sans effet si timings est None"""
+    return timings.time(stage, ticker) if timings is not None else nullcontext()
+
+class StageStats:
+    """Histogramme cumulé des durées d'une étape"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+    def observe(self, duration):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                self.buckets[i] += 1
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsRegistry:
+    """Métriques cumulées du processus, exportées au format texte Prometheus.
+
+    Chaque exécution observée est ajoutée aux histogrammes par étape; les collectes
+    sont de plus journalisées en JSON. Le fichier Prometheus (si un chemin est
+    configuré) est réécrit au plus une fois par write_interval secondes, et à l'arrêt
+    du processus: un rendu ne coûte alors aucune écriture disque.
+    """
+
+    def __init__(self, path=DEFAULT_METRICS_FILE, write_interval=METRICS_WRITE_INTERVAL):
+        self.path = path or None
+        self.write_interval = write_interval
+        self._last_write = 0.0
+        self._dirty = False
+        self._stages = {}
+        self._ticker_last = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _observe_locked(self, stage, duration, ticker):
+        self._stages.setdefault(stage, StageStats()).observe(duration)
+        if ticker is not None:
+            self._ticker_last[(stage, ticker)] = duration
+
+    def observe_stage(self, stage, duration, ticker=None):
+        """Ajoute une mesure isolée (ex: rafraîchissement en arrière-plan des informations entreprise)"""
+        with self._lock:
+            self._observe_locked(stage, duration, ticker)
+            self._dirty = True
+        self.write(force=False)
+
+    def observe(self, timings, errors=0, **extra):
+        """Ajoute toutes les mesures d'une exécution (journalisée s'il s'agit d'une collecte)"""
+        with self._lock:
+            for stage, ticker, duration in timings.items():
+                self._observe_locked(stage, duration, ticker)
+            self._counters[f"{timings.kind}s_total"] = self._counters.get(f"{timings.kind}s_total", 0) + 1
+            if errors:
+                self._counters[f"{timings.kind}_errors_total"] = self._counters.get(f"{timings.kind}_errors_total", 0) + errors
+            self._dirty = True
+        if timings.kind in LOGGED_EVENTS:
+            logger.info(json.dumps(timings.to_log(errors=errors, **extra), ensure_ascii=False, default=str))
+        self.write(force=False)
+
+    def snapshot(self):
+        """Synthèse cumulée par étape (DataFrame)"""
+        with self._lock:
+            rows = [
+                {'Étape': stage, 'Mesures': s.count, 'Total (s)': s.total,
+                 'Moyenne (s)': s.total / s.count if s.count else 0.0, 'Max (s)': s.max}
+                for stage, s in self._stages.items()
+            ]
+        return pd.DataFrame(rows, columns=['Étape', 'Mesures', 'Total (s)', 'Moyenne (s)', 'Max (s)'])
+
+    def to_prometheus(self):
+        """Métriques au format d'exposition texte de Prometheus"""
+        with self._lock:
+            lines = [
+                "# HELP cac40_stage_duration_seconds Durée des étapes de collecte et de rendu",
+                "# TYPE cac40_stage_duration_seconds histogram"
+            ]
+            for stage, s in sorted(self._stages.items()):
+                label = f'stage="{_escape(stage)}"'
+                for bound, count in zip(DURATION_BUCKETS, s.buckets):
+                    lines.append(f'cac40_stage_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'cac40_stage_duration_seconds_bucket{{{label},le="+Inf"}} {s.count}')
+                lines.append(f'cac40_stage_duration_seconds_sum{{{label}}} {s.total:.6f}')
+                lines.append(f'cac40_stage_duration_seconds_count{{{label}}} {s.count}')
+
+            lines += [
+                "# HELP cac40_stage_duration_max_seconds Durée maximale observée par étape",
+                "# TYPE cac40_stage_duration_max_seconds gauge"
+            ]
+            lines += [f'cac40_stage_duration_max_seconds{{stage="{_escape(stage)}"}} {s.max:.6f}'
+                      for stage, s in sorted(self._stages.items())]
+
+            lines += [
+                "# HELP cac40_ticker_last_duration_seconds Dernière durée mesurée par étape et par ticker",
+                "# TYPE cac40_ticker_last_duration_seconds gauge"
+            ]
+            lines += [f'cac40_ticker_last_duration_seconds{{stage="{_escape(stage)}",ticker="{_escape(ticker)}"}} {duration:.6f}'
+                      for (stage, ticker), duration in sorted(self._ticker_last.items())]
+
+            for name, value in sorted(self._counters.items()):
+                lines += [f"# TYPE cac40_{name} counter", f"cac40_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, force=True):
+        """Réécrit le fichier Prometheus de façon atomique (sans effet si aucun chemin n'est configuré).
+
+        Avec force=False, l'écriture n'a lieu que si de nouvelles mesures sont arrivées
+        et que la précédente date de plus de write_interval secondes.
+        """
+        if self.path is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not force and (not self._dirty or now - self._last_write < self.write_interval):
+                return
+            self._dirty = False
+            self._last_write = now
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._write_lock:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(self.to_prometheus())
+                os.replace(tmp_path, self.path)
+        except Exception:
+            # L'export est facultatif: une erreur d'écriture ne doit pas interrompre l'application
+            pass
+
+# Registre partagé par tout le processus (toutes les sessions)
+REGISTRY = MetricsRegistry()
+
+# Dernières mesures écrites à l'arrêt du processus, même si l'intervalle n'est pas écoulé
+atexit.register(REGISTRY.write)
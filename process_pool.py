@@ -0,0 +1,108 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+
+# Processus de calcul par défaut (0: calcul dans le processus courant), surchargeable par variable d'environnement
+DEFAULT_PROCESSES = int(os.environ.get("CAC40_COMPUTE_PROCESSES", 0))
+
+# Taille (barres x tickers) en deçà de laquelle le démarrage des tâches coûte plus que le calcul lui-même
+MIN_CELLS = int(os.environ.get("CAC40_COMPUTE_MIN_CELLS", 500_000))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def resolve_processes(processes=None):
+    """Nombre de processus effectif (None: valeur par défaut, négatif: tous les processeurs)"""
+    processes = DEFAULT_PROCESSES if processes is None else processes
+    return (os.cpu_count() or 1) if processes < 0 else processes
+
+def use_process_pool(shape, processes=None):
+    """Vrai si une matrice de cette forme (barres, tickers) mérite d'être répartie entre plusieurs processus"""
+    rows, columns = shape
+    return resolve_processes(processes) > 1 and columns > 1 and rows * columns >= MIN_CELLS
+
+def get_process_pool(processes):
+    """Pool de processus partagé par les appels de même taille (créé à la première utilisation).
+
+    Les processus sont lancés par forkserver (spawn hors Linux) plutôt que par fork:
+    le serveur Streamlit est multithreadé, et un fork pourrait copier un verrou tenu
+    par un autre thread.
+    """
+    with _pools_lock:
+        pool = _pools.get(processes)
+        if pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context(method))
+            _pools[processes] = pool
+        return pool
+
+def _discard_pool(processes):
+    # Pool cassé (processus tué, mémoire insuffisante): recréé au prochain appel
+    with _pools_lock:
+        pool = _pools.pop(processes, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_pools():
+    """Arrête les pools de processus (fin de tâche du collecteur, arrêt de l'application)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+atexit.register(shutdown_pools)
+
+def _run_chunk(func, input_name, output_name, shape, outputs, start, stop):
+    """Tâche d'un processus: applique func aux colonnes [start, stop[ et écrit le résultat en mémoire partagée"""
+    input_block = shared_memory.SharedMemory(name=input_name)
+    output_block = shared_memory.SharedMemory(name=output_name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=input_block.buf)
+        result = np.ndarray((outputs, *shape), dtype=np.float64, buffer=output_block.buf)
+        result[:, :, start:stop] = func(matrix[:, start:stop])
+        # Les vues doivent disparaître avant la fermeture des blocs
+        del matrix, result
+    finally:
+        input_block.close()
+        output_block.close()
+
+def map_column_chunks(func, matrix, outputs, processes=None):
+    """Applique func à des blocs de colonnes de matrix répartis entre plusieurs processus.
+
+    func: fonction de module (transmise par son nom) qui reçoit une matrice
+    (barres x tickers du bloc) et retourne un tableau (outputs, barres, tickers du bloc);
+    le calcul de chaque colonne ne doit dépendre que de cette colonne.
+    La matrice et les résultats transitent par deux blocs de mémoire partagée: seuls
+    leurs noms et les bornes des blocs de colonnes sont sérialisés, jamais les données.
+    Retourne un tableau (outputs, barres, tickers).
+    """
+    processes = resolve_processes(processes)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    shape = matrix.shape
+    input_block = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    output_block = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes * outputs, 1))
+    try:
+        np.ndarray(shape, dtype=np.float64, buffer=input_block.buf)[:] = matrix
+        bounds = np.linspace(0, shape[1], min(processes, shape[1]) + 1, dtype=int)
+        pool = get_process_pool(processes)
+        futures = [
+            pool.submit(_run_chunk, func, input_block.name, output_block.name, shape, outputs, start, stop)
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except BrokenProcessPool:
+            _discard_pool(processes)
+            raise
+        return np.ndarray((outputs, *shape), dtype=np.float64, buffer=output_block.buf).copy()
+    finally:
+        for block in (input_block, output_block):
+            block.close()
+            block.unlink()
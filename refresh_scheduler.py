@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Une tâche non consultée pendant ce nombre d'intervalles (session fermée) est supprimée
+IDLE_INTERVALS = 3
+
+class RefreshJob:
+    """Tâche d'actualisation périodique et son dernier résultat"""
+
+    def __init__(self, key, func, interval, signature=None, initial=None):
+        self.key = key
+        self.func = func
+        self.interval = interval
+        self.signature = signature
+        self.value = initial
+        self.version = 0
+        self.error = None
+        self.running = False
+        self.finished_at = None
+        self.next_run = time.time() + interval
+        self.last_seen = time.time()
+
+class RefreshScheduler:
+    """Planificateur d'actualisation en arrière-plan, partagé par toutes les sessions.
+
+    Un thread unique attend l'échéance de la prochaine tâche et confie son exécution
+    à un petit pool: aucun thread de script n'est bloqué pendant l'attente. Chaque
+    tâche reçoit son résultat précédent (utile pour les calculs incrémentaux) et les
+    sessions viennent relever les nouveaux résultats par version.
+    """
+
+    def __init__(self, max_workers=4):
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self._thread = threading.Thread(target=self._run, name="refresh-scheduler", daemon=True)
+        self._thread.start()
+
+    def schedule(self, key, func, interval, signature=None, initial=None):
+        """Programme (ou conserve) la tâche key; retourne True si une nouvelle tâche a été créée"""
+        with self._condition:
+            job = self._jobs.get(key)
+            if job is not None and job.signature == signature and job.interval == interval:
+                job.last_seen = time.time()
+                return False
+            self._jobs[key] = RefreshJob(key, func, interval, signature, initial)
+            self._condition.notify()
+            return True
+
+    def cancel(self, key):
+        """Supprime la tâche key si elle existe"""
+        with self._condition:
+            self._jobs.pop(key, None)
+
+    def poll(self, key, seen_version=0):
+        """Relève l'état de la tâche key: (version, résultat, erreur, fin, prochaine exécution) ou None"""
+        with self._condition:
+            job = self._jobs.get(key)
+            if job is None:
+                return None
+            job.last_seen = time.time()
+            value = job.value if job.version > seen_version else None
+            return job.version, value, job.error, job.finished_at, job.next_run
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = time.time()
+                for key, job in list(self._jobs.items()):
+                    if now - job.last_seen > job.interval * IDLE_INTERVALS:
+                        del self._jobs[key]
+                    elif not job.running and job.next_run <= now:
+                        job.running = True
+                        self._executor.submit(self._execute, job)
+                pending = [job.next_run for job in self._jobs.values() if not job.running]
+                timeout = max(min(pending) - now, 0.1) if pending else None
+                self._condition.wait(timeout)
+
+    def _execute(self, job):
+        try:
+            value = job.func(job.value)
+            error = None
+        except Exception as e:
+            value = None
+            error = str(e)
+        with self._condition:
+            if error is None:
+                job.value = value
+                job.version += 1
+            job.error = error
+            job.running = False
+            job.finished_at = time.time()
+            job.next_run = job.finished_at + job.interval
+            self._condition.notify()
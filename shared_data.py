@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# Durée pendant laquelle une donnée partagée est servie sans nouveau téléchargement
+SHARED_DATA_TTL = 60
+
+# Une donnée qu'aucune session n'a demandée depuis ce délai est libérée
+SHARED_DATA_IDLE_TTL = 30 * 60
+
+# Nombre maximal de vues (panneaux assemblés) conservées
+MAX_VIEWS = 32
+
+class SharedEntry:
+    """Donnée partagée et ses informations de fraîcheur"""
+
+    def __init__(self, value, version):
+        self.value = value
+        self.version = version
+        self.fetched_at = time.time()
+        self.last_access = self.fetched_at
+
+class SharedMarketData:
+    """Couche de données de marché partagée par toutes les sessions du processus.
+
+    Les entrées sont indexées par (ticker, intervalle, période). Les demandes
+    simultanées d'une même clé sont dédupliquées: une seule session télécharge,
+    les autres attendent son résultat. Les entrées inutilisées sont libérées
+    après SHARED_DATA_IDLE_TTL. Les vues assemblées à partir de ces entrées
+    (ex: un MarketPanel pour une sélection) sont mémorisées pour que des sessions
+    ayant la même sélection partagent le même objet au lieu d'en garder une copie.
+    """
+
+    def __init__(self, ttl=SHARED_DATA_TTL, idle_ttl=SHARED_DATA_IDLE_TTL, max_views=MAX_VIEWS):
+        self.ttl = ttl
+        self.idle_ttl = idle_ttl
+        self.max_views = max_views
+        self._entries = {}
+        self._inflight = {}
+        self._views = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        for key in [k for k, e in self._entries.items() if now - e.last_access > self.idle_ttl]:
+            del self._entries[key]
+
+    def get(self, keys, loader, max_age=None):
+        """Retourne (valeurs, erreurs, jeton) pour les clés demandées.
+
+        loader(clés_manquantes, valeurs_précédentes) doit retourner (valeurs, erreurs),
+        deux dicts indexés par clé; il n'est appelé que pour les clés absentes ou
+        expirées qu'aucune autre session n'est déjà en train de charger. Le jeton
+        identifie les versions servies et s'utilise avec view().
+        """
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        values, errors, versions = {}, {}, {}
+        to_load, previous, waits = [], {}, {}
+
+        with self._lock:
+            self._evict(now)
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is not None and now - entry.fetched_at <= max_age:
+                    entry.last_access = now
+                    values[key] = entry.value
+                    versions[key] = entry.version
+                elif key in self._inflight:
+                    waits[key] = self._inflight[key]
+                else:
+                    self._inflight[key] = Future()
+                    to_load.append(key)
+                    if entry is not None:
+                        previous[key] = entry.value
+
+        if to_load:
+            results = {}
+            try:
+                try:
+                    loaded, load_errors = loader(to_load, previous)
+                except Exception as e:
+                    loaded, load_errors = {}, {key: str(e) for key in to_load}
+
+                with self._lock:
+                    for key in to_load:
+                        if key in loaded:
+                            self._version += 1
+                            self._entries[key] = SharedEntry(loaded[key], self._version)
+                            results[key] = (loaded[key], self._version, None)
+                        elif key in self._entries:
+                            # Échec du rechargement: la donnée précédente reste servie
+                            entry = self._entries[key]
+                            entry.last_access = now
+                            results[key] = (entry.value, entry.version, None)
+                        else:
+                            results[key] = (None, None, load_errors.get(key, "Aucune donnée disponible"))
+            finally:
+                # Chargement interrompu (BaseException: arrêt ou relance du script, Ctrl+C):
+                # les clés sont tout de même libérées pour ne pas bloquer les autres sessions
+                with self._lock:
+                    futures = {key: self._inflight.pop(key) for key in to_load}
+                for key, future in futures.items():
+                    if key in results:
+                        future.set_result(results[key])
+                    else:
+                        future.set_exception(RuntimeError("Chargement interrompu"))
+            waits.update(futures)
+
+        for key, future in waits.items():
+            try:
+                value, version, error = future.result()
+            except Exception as e:
+                value, version, error = None, None, str(e)
+            if error is None:
+                values[key] = value
+                versions[key] = version
+            else:
+                errors[key] = error
+
+        token = tuple((key, versions[key]) for key in keys if key in versions)
+        return values, errors, token
+
+    def view(self, token, build):
+        """Retourne la vue mémorisée pour le jeton donné, construite par build() si nécessaire"""
+        with self._lock:
+            view = self._views.get(token)
+            if view is not None:
+                self._views.move_to_end(token)
+                return view
+        view = build()
+        with self._lock:
+            self._views[token] = view
+            self._views.move_to_end(token)
+            while len(self._views) > self.max_views:
+                self._views.popitem(last=False)
+        return view
+
+    def stats(self):
+        """Statistiques de la couche partagée (entrées, chargements en cours, vues)"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'inflight': len(self._inflight),
+                'views': len(self._views)
+            }
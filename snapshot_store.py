@@ -0,0 +1,112 @@
+import glob
+import json
+import os
+import re
+import threading
+import time
+import pandas as pd
+from market_panel import MarketPanel
+
+# Répertoire des instantanés écrits par collector.py (surchargeable par variable d'environnement)
+DEFAULT_SNAPSHOT_DIR = os.environ.get(
+    "CAC40_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "snapshots")
+)
+
+# Âge maximal (secondes) d'un instantané servi à l'application
+DEFAULT_MAX_AGE = float(os.environ.get("CAC40_SNAPSHOT_MAX_AGE", 900))
+
+# Version du format du manifeste
+SCHEMA_VERSION = 1
+
+def source_key(provider_spec):
+    """Nom de répertoire d'une source ("replay:data/bars,latency=0.05" -> "replay_data_bars_latency_0.05")"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", provider_spec).strip("_") or "default"
+
+class SnapshotStore:
+    """Instantanés de collectes précalculées: un panneau complet par source et par période.
+
+    Chaque instantané est écrit dans root/<source>/<période>/: barres et informations
+    entreprise en Parquet (fichiers horodatés), puis manifest.json qui les désigne.
+    Le manifeste est remplacé en dernier et de façon atomique: un lecteur voit
+    toujours un instantané complet. Les panneaux lus sont conservés en mémoire tant
+    que le manifeste ne change pas (même version de panneau pour toutes les sessions).
+    """
+
+    def __init__(self, root=DEFAULT_SNAPSHOT_DIR):
+        self.root = root
+        self._panels = {}
+        self._lock = threading.Lock()
+
+    def directory(self, provider_spec, period):
+        return os.path.join(self.root, source_key(provider_spec), period)
+
+    def write(self, panel, provider_spec, period, errors=(), duration=None):
+        """Écrit l'instantané d'une collecte et retourne son manifeste"""
+        directory = self.directory(provider_spec, period)
+        os.makedirs(directory, exist_ok=True)
+        created_at = time.time()
+        stamp = f"{int(created_at * 1000)}-{os.getpid()}"
+        bars_file, metadata_file = f"bars-{stamp}.parquet", f"metadata-{stamp}.parquet"
+        panel.bars.to_parquet(os.path.join(directory, bars_file))
+        panel.metadata.to_parquet(os.path.join(directory, metadata_file))
+
+        manifest = {
+            'schema': SCHEMA_VERSION,
+            'source': provider_spec,
+            'period': period,
+            'interval': panel.interval,
+            'created_at': created_at,
+            'duration_s': duration,
+            'tickers': list(panel),
+            'errors': [[ticker, error] for ticker, error in errors],
+            'bars_file': bars_file,
+            'metadata_file': metadata_file
+        }
+        manifest_path = os.path.join(directory, "manifest.json")
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, manifest_path)
+        self._prune(directory, keep={bars_file, metadata_file})
+        return manifest
+
+    def _prune(self, directory, keep):
+        # L'instantané précédent est conservé: un lecteur peut être en train de le charger
+        for prefix in ("bars-", "metadata-"):
+            files = sorted(os.path.basename(p) for p in glob.glob(os.path.join(directory, f"{prefix}*.parquet")))
+            older = [f for f in files if f not in keep]
+            for name in older[:-1]:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def manifest(self, provider_spec, period):
+        """Manifeste du dernier instantané (None s'il n'existe pas ou est illisible)"""
+        try:
+            with open(os.path.join(self.directory(provider_spec, period), "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get('schema') == SCHEMA_VERSION else None
+
+    def read(self, provider_spec, period, max_age=DEFAULT_MAX_AGE):
+        """Dernier instantané (MarketPanel, manifeste); None s'il est absent, illisible ou plus ancien que max_age secondes"""
+        manifest = self.manifest(provider_spec, period)
+        if manifest is None or (max_age is not None and time.time() - manifest['created_at'] > max_age):
+            return None
+        directory = self.directory(provider_spec, period)
+        with self._lock:
+            cached = self._panels.get(directory)
+            if cached is not None and cached[0] == manifest['created_at']:
+                return cached[1], manifest
+        try:
+            bars = pd.read_parquet(os.path.join(directory, manifest['bars_file']))
+            metadata = pd.read_parquet(os.path.join(directory, manifest['metadata_file']))
+        except Exception:
+            return None
+        panel = MarketPanel(bars, metadata, interval=manifest['interval'])
+        with self._lock:
+            self._panels[directory] = (manifest['created_at'], panel)
+        return panel, manifest
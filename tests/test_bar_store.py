@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bar_store import BarStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.store_full('AC.PA', '1d', make_bars(pd.date_range("2024-01-01", periods=10, freq="D")), "1mo")
+    return store
+
+def make_bars(index, close=None):
+    close = np.arange(100.0, 100.0 + len(index)) if close is None else np.asarray(close, dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1000.0}, index=index)
+
+def test_merge_delta_appends_from_matching_overlap(store):
+    stored = store.load('AC.PA', '1d')
+    # Complément à partir de l'avant-dernière barre stockée (même cours), dernière barre révisée
+    delta = make_bars(pd.date_range(stored.index[-2], periods=5, freq="D"), [108.0, 120.0, 121.0, 122.0, 123.0])
+
+    merged = store.merge_delta('AC.PA', '1d', delta)
+
+    assert len(merged) == 13
+    assert merged['Close'].iloc[9] == 120.0
+    assert store.load('AC.PA', '1d').equals(merged)
+
+def test_merge_delta_rejects_overlap_mismatch(store):
+    stored = store.load('AC.PA', '1d')
+    # Cours ajustés révisés (dividende, division): la barre de recouvrement ne correspond plus
+    delta = make_bars(pd.date_range(stored.index[-2], periods=3, freq="D"), [54.0, 55.0, 56.0])
+
+    assert store.merge_delta('AC.PA', '1d', delta) is None
+    assert store.load('AC.PA', '1d').equals(stored)
+
+def test_merge_delta_rejects_missing_overlap(store):
+    stored = store.load('AC.PA', '1d')
+    # Trou dans l'historique: le complément commence après la barre de recouvrement
+    delta = make_bars(pd.date_range(stored.index[-1] + pd.Timedelta(days=2), periods=3, freq="D"))
+
+    assert store.merge_delta('AC.PA', '1d', delta) is None
+    assert store.load('AC.PA', '1d').equals(stored)
+
+def test_merge_delta_rejects_empty_delta(store):
+    assert store.merge_delta('AC.PA', '1d', make_bars(pd.DatetimeIndex([]))) is None
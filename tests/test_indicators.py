@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indicators import INDICATOR_COLUMNS, add_indicators_to_frames, build_indicator_states, extend_indicators
+
+def make_bars(n_bars, seed=0):
+    """Historique brut (colonne 'Date') d'une marche aléatoire"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    return pd.DataFrame({
+        'Date': pd.date_range("2024-01-01", periods=n_bars, freq="h", tz="Europe/Paris"),
+        'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+        'Volume': rng.integers(1_000, 10_000, n_bars).astype(float)
+    })
+
+def full_recompute(frame):
+    return add_indicators_to_frames({'T': frame})['T']
+
+def assert_same_indicators(extended, expected):
+    assert list(extended['Date']) == list(expected['Date'])
+    for column in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(extended[column].to_numpy(), expected[column].to_numpy(),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
+
+@pytest.mark.parametrize("new_bars", [1, 7, 120])
+def test_extend_matches_full_recompute(new_bars):
+    bars = make_bars(300 + new_bars)
+    previous = full_recompute(bars.iloc[:300])
+    state = build_indicator_states({'T': bars.iloc[:300]})['T']
+
+    extended, _ = extend_indicators(previous, bars, state)
+
+    assert_same_indicators(extended, full_recompute(bars))
+
+def test_successive_extensions_match_full_recompute():
+    bars = make_bars(400, seed=1)
+    frame = full_recompute(bars.iloc[:200])
+    state = build_indicator_states({'T': bars.iloc[:200]})['T']
+    for stop in (230, 231, 290, 400):
+        frame, state = extend_indicators(frame, bars.iloc[:stop], state)
+
+    assert_same_indicators(frame, full_recompute(bars))
+
+def test_revised_last_bar_is_recomputed():
+    # La dernière barre de la collecte précédente était en formation: sa clôture a changé depuis
+    bars = make_bars(260, seed=2)
+    previous = full_recompute(bars.iloc[:250])
+    state = build_indicator_states({'T': bars.iloc[:250]})['T']
+    bars.loc[249, 'Close'] *= 1.05
+
+    extended, _ = extend_indicators(previous, bars, state)
+
+    assert_same_indicators(extended, full_recompute(bars))
+
+def test_revised_reference_bar_requires_full_recompute():
+    # Cours ajustés révisés (dividende): la barre de référence de l'état ne correspond plus
+    bars = make_bars(260, seed=3)
+    previous = full_recompute(bars.iloc[:250])
+    state = build_indicator_states({'T': bars.iloc[:250]})['T']
+    bars['Close'] *= 0.98
+
+    assert extend_indicators(previous, bars, state) is None
@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+from collection import collect_data_shared
+from company_metadata import MetadataCache
+from market_data import SyntheticProvider
+from shared_data import SharedMarketData
+
+KEY = ('AC.PA', '1d', '1mo')
+
+def test_get_loads_each_key_once():
+    shared = SharedMarketData()
+    calls = []
+
+    def loader(keys, previous):
+        calls.append(list(keys))
+        return {key: f"bars {key[0]}" for key in keys}, {}
+
+    first = shared.get([KEY], loader)
+    second = shared.get([KEY], loader)
+
+    assert calls == [[KEY]]
+    assert first[0] == second[0] == {KEY: "bars AC.PA"}
+    assert first[2] == second[2]
+
+def test_failed_load_releases_keys():
+    shared = SharedMarketData()
+
+    def failing_loader(keys, previous):
+        raise ConnectionError("réseau indisponible")
+
+    values, errors, _ = shared.get([KEY], failing_loader)
+
+    assert values == {} and errors == {KEY: "réseau indisponible"}
+    assert not shared._inflight
+    # La clé n'est pas restée réservée: une nouvelle demande la recharge
+    values, errors, _ = shared.get([KEY], lambda keys, previous: ({KEY: "bars"}, {}))
+    assert values == {KEY: "bars"} and errors == {}
+
+def test_interrupted_load_releases_keys_for_waiting_sessions():
+    shared = SharedMarketData()
+    loading = threading.Event()
+    interrupt = threading.Event()
+
+    def interrupted_loader(keys, previous):
+        loading.set()
+        interrupt.wait(5)
+        # Relance du script Streamlit ou Ctrl+C pendant le téléchargement
+        raise KeyboardInterrupt
+
+    def interrupted_session():
+        with pytest.raises(KeyboardInterrupt):
+            shared.get([KEY], interrupted_loader)
+
+    def waiting_loader(keys, previous):
+        raise AssertionError("la seconde session doit attendre le chargement en cours")
+
+    waiting_result = {}
+    first = threading.Thread(target=interrupted_session)
+    first.start()
+    assert loading.wait(5)
+    second = threading.Thread(target=lambda: waiting_result.update(result=shared.get([KEY], waiting_loader)))
+    second.start()
+    # Laisse la seconde session trouver la clé en cours de chargement avant l'interruption
+    time.sleep(0.2)
+    interrupt.set()
+    first.join(5)
+    second.join(5)
+
+    values, errors, _ = waiting_result['result']
+    assert values == {} and errors == {KEY: "Chargement interrompu"}
+    assert not shared._inflight
+
+def test_shared_panel_picks_up_metadata_received_later():
+    provider = SyntheticProvider(n_tickers=3, n_bars=200)
+    tickers = list(provider.list_tickers().values())
+    release = threading.Event()
+
+    def slow_fetcher(ticker_symbol):
+        release.wait(5)
+        return provider.company_info(ticker_symbol)
+
+    metadata_cache = MetadataCache(path=None, fetcher=slow_fetcher)
+    shared = SharedMarketData()
+
+    # Cache froid: le panneau est construit avec les valeurs par défaut
+    panel, errors = collect_data_shared(shared, tickers, "1mo", metadata_cache=metadata_cache, provider=provider)
+    assert errors == []
+    assert {panel.meta(t, 'Sector') for t in tickers} == {'Non spécifié'}
+
+    release.set()
+    deadline = time.time() + 5
+    while metadata_cache.is_loading(tickers) and time.time() < deadline:
+        time.sleep(0.01)
+
+    refreshed, _ = collect_data_shared(shared, tickers, "1mo", metadata_cache=metadata_cache, provider=provider)
+    assert [refreshed.meta(t, 'Sector') for t in tickers] == [provider.company_info(t)['Sector'] for t in tickers]
+    assert refreshed.metadata_version == metadata_cache.version
+    # Mêmes barres, sans copie ni nouveau téléchargement; nouvelle version pour les graphiques mémorisés
+    assert refreshed.bars is panel.bars
+    assert refreshed.version != panel.version
+    # Les sessions suivantes partagent le panneau reconstruit
+    again, _ = collect_data_shared(shared, tickers, "1mo", metadata_cache=metadata_cache, provider=provider)
+    assert again is refreshed